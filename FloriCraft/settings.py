@@ -6,6 +6,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 import dj_database_url 
+from django.core.exceptions import ImproperlyConfigured
 
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -20,6 +21,49 @@ ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost').split(',')
 POSIFLORA_URL = os.getenv('POSIFLORA_URL', 'https://floricraft.posiflora.com/api/v1')
 POSIFLORA_USER = os.getenv('POSIFLORA_USER')
 POSIFLORA_PASSWORD = os.getenv('POSIFLORA_PASSWORD')
+POSIFLORA_POOL_SIZE = int(os.getenv('POSIFLORA_POOL_SIZE', '10'))
+POSIFLORA_CONNECT_TIMEOUT = float(os.getenv('POSIFLORA_CONNECT_TIMEOUT', '3.05'))
+POSIFLORA_READ_TIMEOUT = float(os.getenv('POSIFLORA_READ_TIMEOUT', '30'))
+# Бюджет чтения по эндпоинтам; остальные запросы используют POSIFLORA_READ_TIMEOUT
+POSIFLORA_ENDPOINT_TIMEOUTS = {
+    'sessions': float(os.getenv('POSIFLORA_SESSIONS_TIMEOUT', '10')),
+    'specification': float(os.getenv('POSIFLORA_SPECIFICATION_TIMEOUT', '5')),
+    'specifications': float(os.getenv('POSIFLORA_SPECIFICATIONS_TIMEOUT', '15')),
+    'categories': float(os.getenv('POSIFLORA_CATEGORIES_TIMEOUT', '10')),
+    'bouquets': float(os.getenv('POSIFLORA_BOUQUETS_TIMEOUT', '15')),
+}
+POSIFLORA_BREAKER_FAILURES = int(os.getenv('POSIFLORA_BREAKER_FAILURES', '5'))
+POSIFLORA_BREAKER_WINDOW = int(os.getenv('POSIFLORA_BREAKER_WINDOW', '30'))
+POSIFLORA_BREAKER_OPEN_SECONDS = int(os.getenv('POSIFLORA_BREAKER_OPEN_SECONDS', '30'))
+POSIFLORA_TOKEN_REFRESHER_ENABLED = os.getenv('POSIFLORA_TOKEN_REFRESHER_ENABLED', 'False') == 'True'
+POSIFLORA_TOKEN_REFRESH_INTERVAL = int(os.getenv('POSIFLORA_TOKEN_REFRESH_INTERVAL', '300'))
+POSIFLORA_TOKEN_REFRESH_MARGIN_MINUTES = int(os.getenv('POSIFLORA_TOKEN_REFRESH_MARGIN_MINUTES', '60'))
+POSIFLORA_WARMUP_ENABLED = os.getenv('POSIFLORA_WARMUP_ENABLED', 'False') == 'True'
+POSIFLORA_WARMUP_ATTEMPTS = int(os.getenv('POSIFLORA_WARMUP_ATTEMPTS', '3'))
+POSIFLORA_WARMUP_RETRY_DELAY = int(os.getenv('POSIFLORA_WARMUP_RETRY_DELAY', '5'))
+POSIFLORA_WARMUP_TIMEOUT = int(os.getenv('POSIFLORA_WARMUP_TIMEOUT', '60'))
+POSIFLORA_FETCH_CONCURRENCY = int(os.getenv('POSIFLORA_FETCH_CONCURRENCY', '4'))
+POSIFLORA_BATCH_CONCURRENCY = int(os.getenv('POSIFLORA_BATCH_CONCURRENCY', '4'))
+POSIFLORA_CATALOG_TTL = int(os.getenv('POSIFLORA_CATALOG_TTL', '300'))
+POSIFLORA_CATALOG_STALE_TTL = int(os.getenv('POSIFLORA_CATALOG_STALE_TTL', '86400'))
+POSIFLORA_SYNC_INTERVAL = int(os.getenv('POSIFLORA_SYNC_INTERVAL', '300'))
+POSIFLORA_UPDATED_SINCE_FILTER = os.getenv('POSIFLORA_UPDATED_SINCE_FILTER', 'filter[updatedAt][gte]')
+POSIFLORA_WEBHOOK_SECRET = os.getenv('POSIFLORA_WEBHOOK_SECRET')
+POSIFLORA_PRODUCT_INDEX_TTL = int(os.getenv('POSIFLORA_PRODUCT_INDEX_TTL', '600'))
+POSIFLORA_PRODUCT_INDEX_NEGATIVE_TTL = int(os.getenv('POSIFLORA_PRODUCT_INDEX_NEGATIVE_TTL', '300'))
+POSIFLORA_COALESCE_TTL = int(os.getenv('POSIFLORA_COALESCE_TTL', '5'))
+POSIFLORA_COALESCE_WAIT = float(os.getenv('POSIFLORA_COALESCE_WAIT', '10'))
+# Сколько секунд ведомые воркеры получают ошибку ведущего вместо своего запроса
+POSIFLORA_COALESCE_FAILURE_TTL = int(os.getenv('POSIFLORA_COALESCE_FAILURE_TTL', '1'))
+POSIFLORA_HTTP_MAX_AGE = int(os.getenv('POSIFLORA_HTTP_MAX_AGE', '60'))
+POSIFLORA_HTTP_STALE_WHILE_REVALIDATE = int(os.getenv('POSIFLORA_HTTP_STALE_WHILE_REVALIDATE', '600'))
+POSIFLORA_IMAGE_PROXY_ENABLED = os.getenv('POSIFLORA_IMAGE_PROXY_ENABLED', 'False') == 'True'
+POSIFLORA_IMAGE_CACHE_DIR = os.getenv('POSIFLORA_IMAGE_CACHE_DIR', '/tmp/floricraft_images')
+POSIFLORA_IMAGE_CACHE_MAX_BYTES = int(os.getenv('POSIFLORA_IMAGE_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+POSIFLORA_IMAGE_EVICTION_INTERVAL = int(os.getenv('POSIFLORA_IMAGE_EVICTION_INTERVAL', '300'))
+POSIFLORA_IMAGE_HOSTS = os.getenv('POSIFLORA_IMAGE_HOSTS', 'cdn.posiflora.online').split(',')
+POSIFLORA_LOG_SAMPLE_RATE = float(os.getenv('POSIFLORA_LOG_SAMPLE_RATE', '0'))
+POSIFLORA_CAPTURE_DIR = os.getenv('POSIFLORA_CAPTURE_DIR')
 
 # YooKassa settings
 YOOKASSA_SHOP_ID = os.getenv('YOOKASSA_SHOP_ID')
@@ -123,6 +167,38 @@ DATABASES = {
     )
 }
 
+# Корзины: db - таблицы Cart/CartItem, cache - Django cache с отложенной записью в БД
+# (при cache нужен Redis (REDIS_URL) и должен работать manage.py flush_cart_store --loop)
+CART_STORE = os.getenv('CART_STORE', 'db')
+CART_CACHE_TTL = int(os.getenv('CART_CACHE_TTL', str(30 * 24 * 3600)))
+CART_FLUSH_INTERVAL = int(os.getenv('CART_FLUSH_INTERVAL', '5'))
+CART_FLUSH_BATCH_SIZE = int(os.getenv('CART_FLUSH_BATCH_SIZE', '100'))
+
+# Cache: общий для всех gunicorn-воркеров. Блокировки (cache_lock), счетчики circuit
+# breaker'а и обновление сессии Posiflora опираются на атомарные add/incr, которые есть
+# только у Redis, поэтому без DEBUG нужен REDIS_URL. Файловый кэш - только для локальной
+# разработки: в нем add и incr не атомарны, а при переполнении удаляется треть записей.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', '/tmp/floricraft_cache'),
+            # Снимки каталога, блокировки и корзины не должны вытесняться случайной очисткой
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '100000'))},
+        }
+    }
+else:
+    raise ImproperlyConfigured('REDIS_URL is required when DEBUG is off')
+
 
 TELEGRAM_BOT_API_URL = os.environ.get('TELEGRAM_BOT_API_URL', 'http://localhost:8000')
 TELEGRAM_BOT_API_KEY = os.environ.get('TELEGRAM_BOT_API_KEY', '')
@@ -203,7 +279,7 @@ LOGGING = {
     'loggers': {
         'apps.posiflora.services.products': {
             'handlers': ['console'],
-            'level': 'INFO',
+            'level': os.getenv('POSIFLORA_LOG_LEVEL', 'INFO'),
             'propagate': False,
         },
     },
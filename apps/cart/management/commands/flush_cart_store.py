@@ -0,0 +1,44 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.cart.services import get_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Запись измененных корзин из кэша в БД (для CART_STORE=cache)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, повторяя запись через --interval секунд',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'CART_FLUSH_INTERVAL', 5),
+            help='Интервал между проходами в секундах (по умолчанию settings.CART_FLUSH_INTERVAL или 5)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Корзин в одной транзакции (по умолчанию settings.CART_FLUSH_BATCH_SIZE или 100)',
+        )
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+
+        if not options['loop']:
+            flushed = store.flush_dirty(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Записано корзин: {flushed}'))
+            return
+
+        self.stdout.write(f'Запись корзин в БД каждые {options["interval"]} секунд')
+        while True:
+            close_old_connections()
+            flushed = store.flush_dirty(options['batch_size'])
+            if flushed:
+                self.stdout.write(f'Записано корзин: {flushed}')
+            time.sleep(options['interval'])
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.2 on 2026-10-16 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def start_history(apps, schema_editor):
+    # У существующих корзин нет истории изменений: дельта возможна только от текущей версии
+    Cart = apps.get_model('cart', 'Cart')
+    Cart.objects.update(reset_version=models.F('version'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0006_cart_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='reset_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CartItemRemoval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.CharField(max_length=64)),
+                ('size', models.CharField(blank=True, default='', max_length=1)),
+                ('version', models.PositiveIntegerField()),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='removals', to='cart.cart')),
+            ],
+            options={
+                'unique_together': {('cart', 'product_id', 'size')},
+            },
+        ),
+        migrations.RunPython(start_history, migrations.RunPython.noop),
+    ]
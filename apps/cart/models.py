@@ -10,6 +10,10 @@ class Cart(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Увеличивается при каждом изменении корзины (оптимистичная блокировка)
+    version = models.PositiveIntegerField(default=0)
+    # Версия последней очистки корзины: изменения до нее не хранятся, дельта невозможна
+    reset_version = models.PositiveIntegerField(default=0)
 
 
 class CartItem(models.Model):
@@ -30,6 +34,23 @@ class CartItem(models.Model):
     size = models.CharField(max_length=1, choices=SIZE_CHOICES, default='', blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.CharField(max_length=500)
+    # Версия корзины, в которой строка изменилась последний раз
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('cart', 'product_id', 'size')
+
+
+class CartItemRemoval(models.Model):
+    """Удаленная строка корзины: нужна, чтобы отдать удаление в дельте ?since="""
+    cart = models.ForeignKey(
+        Cart,
+        on_delete=models.CASCADE,
+        related_name='removals'
+    )
+    product_id = models.CharField(max_length=64)
+    size = models.CharField(max_length=1, default='', blank=True)
+    version = models.PositiveIntegerField()
 
     class Meta:
         unique_together = ('cart', 'product_id', 'size')
\ No newline at end of file
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.cart.models import CartItem
+from apps.cart.services.operations import OP_ADD, OP_CHOICES, OP_REMOVE, OP_SET
 
 
 class CartItemSerializer(serializers.ModelSerializer):
@@ -8,9 +9,46 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ('product_id', 'title', 'size', 'price', 'image')
 
 
+class CartLineSerializer(CartItemSerializer):
+    """Товар корзины с результатом сверки с каталогом (поля есть, если корзина сверена)"""
+    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, allow_null=True)
+    available = serializers.BooleanField(read_only=True)
+    price_changed = serializers.BooleanField(read_only=True)
+
+    class Meta(CartItemSerializer.Meta):
+        fields = CartItemSerializer.Meta.fields + ('current_price', 'available', 'price_changed')
+
+
 class CartItemInputSerializer(serializers.Serializer):
     product_id = serializers.CharField(max_length=64)
     title = serializers.CharField(max_length=255)
     size = serializers.ChoiceField(choices=['S', 'M', 'L', ''], required=False, allow_blank=True, allow_null=True)
     price = serializers.DecimalField(max_digits=10, decimal_places=2)
-    image = serializers.CharField(max_length=500)
\ No newline at end of file
+    image = serializers.CharField(max_length=500)
+
+
+class CartOperationSerializer(serializers.Serializer):
+    op = serializers.ChoiceField(choices=OP_CHOICES)
+    product_id = serializers.CharField(max_length=64, required=False)
+    title = serializers.CharField(max_length=255, required=False)
+    size = serializers.ChoiceField(choices=['S', 'M', 'L', ''], required=False, allow_blank=True, allow_null=True)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    image = serializers.CharField(max_length=500, required=False)
+    items = CartItemInputSerializer(many=True, required=False)
+
+    REQUIRED_FIELDS = {
+        OP_ADD: ('product_id', 'title', 'price', 'image'),
+        OP_REMOVE: ('product_id',),
+        OP_SET: ('items',),
+    }
+
+    def validate(self, attrs):
+        missing = [field for field in self.REQUIRED_FIELDS[attrs['op']] if field not in attrs]
+        if missing:
+            raise serializers.ValidationError({field: 'Обязательное поле для этой операции' for field in missing})
+        return attrs
+
+
+class CartPatchSerializer(serializers.Serializer):
+    operations = CartOperationSerializer(many=True, allow_empty=False, max_length=200)
+    expected_version = serializers.IntegerField(min_value=0, required=False)
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.exceptions import ImproperlyConfigured
+
+CART_STORE_DB = 'db'
+CART_STORE_CACHE = 'cache'
+
+
+def get_cart_store():
+    """
+    Хранилище корзин по настройке CART_STORE
+
+    db - таблицы Cart/CartItem; cache - корзины в Django cache с отложенной
+    записью в БД (flush_cart_store). Оба модуля реализуют get_items, get_cart,
+    get_cart_delta, add_item, remove_item, apply_operations, clear_items,
+    discard_cache, flush и flush_dirty.
+
+    Хранилище cache работает только с Redis: множество измененных корзин
+    ведется атомарными SADD/SPOP.
+    """
+    if getattr(settings, 'CART_STORE', CART_STORE_DB) == CART_STORE_CACHE:
+        if not isinstance(caches['default'], RedisCache):
+            raise ImproperlyConfigured('CART_STORE=cache requires a Redis cache (REDIS_URL)')
+        from . import cache_cart
+        return cache_cart
+
+    from . import db_cart
+    return db_cart
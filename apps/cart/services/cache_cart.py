@@ -0,0 +1,293 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from apps.cart.models import Cart, CartItem, CartItemRemoval
+from apps.common.cache_lock import wait_cache_lock
+from apps.custom_auth.models import CustomUser
+from . import db_cart
+from .operations import (
+    OP_ADD, OP_REMOVE, CartVersionConflict, apply_operations as apply_to_items, delta_possible, item_key,
+    stamp_changes,
+)
+
+logger = logging.getLogger(__name__)
+
+DIRTY_KEY = 'cart:dirty'
+
+LOCK_WAIT_SECONDS = 2
+
+
+def _cart_key(user_id) -> str:
+    return f'cart:{user_id}'
+
+
+def _cart_ttl() -> int:
+    # Должен быть намного больше интервала flush_cart_store: несброшенная корзина не должна истечь
+    return getattr(settings, 'CART_CACHE_TTL', 30 * 24 * 3600)
+
+
+def _load_cart(user_id) -> Dict:
+    """
+    Корзина из кэша; при промахе - из БД одним запросом
+
+    История удалений из БД не читается: дельта ?since= возможна
+    только от версии, с которой корзина попала в кэш.
+
+    Returns:
+        {"version": версия, "reset_version": версия начала истории,
+         "items": {item_key: товар}, "removed": {item_key: удаленная строка}}
+    """
+    state = cache.get(_cart_key(user_id))
+    if state is not None:
+        return state
+
+    items, version = db_cart.get_cart(user_id)
+    state = {
+        'version': version,
+        'reset_version': version,
+        'items': {item_key(item['product_id'], item['size']): item for item in items},
+        'removed': {},
+    }
+    # add: не затираем корзину, которую другой воркер уже положил и изменил
+    if not cache.add(_cart_key(user_id), state, _cart_ttl()):
+        state = cache.get(_cart_key(user_id), state)
+    return state
+
+
+def _save_cart(user_id, state: Dict) -> None:
+    state['version'] += 1
+    cache.set(_cart_key(user_id), state, _cart_ttl())
+
+
+def _dirty_set():
+    """Клиент Redis и ключ множества измененных корзин (атомарные SADD/SPOP)"""
+    return cache._cache.get_client(DIRTY_KEY, write=True), cache.make_and_validate_key(DIRTY_KEY)
+
+
+def _mark_dirty(*user_ids) -> None:
+    client, key = _dirty_set()
+    client.sadd(key, *(str(user_id) for user_id in user_ids))
+
+
+def _pop_dirty(count: int) -> List[str]:
+    client, key = _dirty_set()
+    return [user_id.decode() for user_id in client.spop(key, count) or []]
+
+
+def get_items(user_id) -> List[Dict]:
+    return list(_load_cart(user_id)['items'].values())
+
+
+def get_cart(user_id) -> Tuple[List[Dict], int]:
+    state = _load_cart(user_id)
+    return list(state['items'].values()), state['version']
+
+
+def get_cart_delta(user_id, since: int) -> Optional[Dict]:
+    """Изменения корзины после версии since (формат как у db_cart.get_cart_delta)"""
+    state = _load_cart(user_id)
+    version = state['version']
+    if since == version:
+        return None
+
+    if not delta_possible(since, version, state['reset_version']):
+        return {'version': version, 'full': True, 'items': list(state['items'].values()), 'removed': []}
+
+    return {
+        'version': version,
+        'full': False,
+        'items': [item for item in state['items'].values() if item['version'] > since],
+        'removed': [
+            {'product_id': item['product_id'], 'size': item['size']}
+            for item in state['removed'].values()
+            if item['version'] > since
+        ],
+    }
+
+
+def add_item(user, item_data: dict):
+    apply_operations(user.id, [{'op': OP_ADD, **item_data}])
+
+
+def remove_item(user, item_data: dict):
+    apply_operations(user.id, [{'op': OP_REMOVE, **item_data}])
+
+
+def apply_operations(user_id, operations, expected_version=None):
+    """
+    Применить пакет операций add/remove/set к корзине в кэше
+
+    Корзина меняется под блокировкой пользователя и записывается в БД
+    при следующем flush_dirty (одним bulk_create и одним DELETE).
+    Версия увеличивается, только если что-то изменилось.
+
+    Returns:
+        (список товаров, новая версия)
+
+    Raises:
+        CartVersionConflict: expected_version не совпал с текущей версией
+        CacheLockTimeout: корзину слишком долго меняет другой запрос
+    """
+    with wait_cache_lock(f'{_cart_key(user_id)}:lock', timeout=10, wait=LOCK_WAIT_SECONDS):
+        state = _load_cart(user_id)
+        if expected_version is not None and expected_version != state['version']:
+            raise CartVersionConflict(list(state['items'].values()), state['version'])
+
+        result = apply_to_items(state['items'], operations)
+        changed, removed = stamp_changes(state['items'], result, state['version'] + 1)
+        if not changed and not removed:
+            return list(result.values()), state['version']
+
+        for item in changed:
+            state['removed'].pop(item_key(item['product_id'], item['size']), None)
+        for item in removed:
+            state['removed'][item_key(item['product_id'], item['size'])] = item
+        state['items'] = result
+        _save_cart(user_id, state)
+        # Внутри блокировки: падение между записью в кэш и пометкой потеряло бы изменение
+        _mark_dirty(user_id)
+    return list(state['items'].values()), state['version']
+
+
+def _lock_carts(user_ids) -> Dict[int, Cart]:
+    """
+    Создать недостающие строки Cart и заблокировать их до конца транзакции
+
+    Блокировка строки Cart упорядочивает запись корзины из кэша и очистку
+    корзины при оформлении заказа.
+    """
+    Cart.objects.bulk_create([Cart(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+    return {
+        cart.user_id: cart
+        for cart in Cart.objects.select_for_update().filter(user_id__in=user_ids).order_by('pk')
+    }
+
+
+def clear_items(user):
+    """
+    Очистить корзину после оформления заказа
+
+    Под блокировкой корзины (как в apply_operations) корзина в кэше сразу
+    заменяется пустой с новой версией: добавление, ожидающее блокировку,
+    применится уже к пустой корзине. Версия в БД становится той же, поэтому
+    запись старого состояния из кэша (flush_dirty) пропускается. Если
+    транзакция заказа откатится, вызывающий сбрасывает кэш (discard_cache).
+    """
+    with wait_cache_lock(f'{_cart_key(user.id)}:lock', timeout=10, wait=LOCK_WAIT_SECONDS):
+        with transaction.atomic():
+            cart = _lock_carts([user.id])[user.id]
+            state = cache.get(_cart_key(user.id))
+            version = max(cart.version, state['version'] if state else 0) + 1
+
+            CartItem.objects.filter(cart=cart).delete()
+            CartItemRemoval.objects.filter(cart=cart).delete()
+            Cart.objects.filter(pk=cart.pk).update(version=version, reset_version=version)
+
+        cache.set(
+            _cart_key(user.id),
+            {'version': version, 'reset_version': version, 'items': {}, 'removed': {}},
+            _cart_ttl(),
+        )
+
+
+def discard_cache(user_id) -> None:
+    """
+    Забыть корзину в кэше: следующее чтение загрузит ее из БД
+
+    Нужен после отката транзакции заказа, в которой корзина была очищена
+    (clear_items): в БД корзина осталась прежней, а в кэше - пустая.
+    """
+    with wait_cache_lock(f'{_cart_key(user_id)}:lock', timeout=10, wait=LOCK_WAIT_SECONDS):
+        cache.delete(_cart_key(user_id))
+
+
+def _write_cart(cart: Cart, state: Dict) -> bool:
+    """
+    Привести заблокированную корзину в БД к содержимому корзины из кэша
+
+    Returns:
+        False, если в БД уже та же или более новая версия (например, корзина
+        очищена при оформлении заказа) и записывать нечего
+    """
+    if cart.version >= state['version']:
+        return False
+
+    items = state['items']
+    Cart.objects.filter(pk=cart.pk).update(version=state['version'], reset_version=state['reset_version'])
+
+    if items:
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, **item) for item in items.values()],
+            update_conflicts=True,
+            unique_fields=['cart', 'product_id', 'size'],
+            update_fields=['title', 'price', 'image', 'version'],
+        )
+
+    CartItemRemoval.objects.filter(cart=cart).delete()
+    if state['removed']:
+        CartItemRemoval.objects.bulk_create(
+            [CartItemRemoval(cart=cart, **item) for item in state['removed'].values()]
+        )
+
+    keep = Q()
+    for item in items.values():
+        keep |= Q(product_id=item['product_id'], size=item['size'])
+    stale = CartItem.objects.filter(cart=cart)
+    if items:
+        stale = stale.exclude(keep)
+    stale.delete()
+    return True
+
+
+def flush(user_id) -> None:
+    """Синхронно записать корзину пользователя в БД (перед оформлением заказа)"""
+    with transaction.atomic():
+        cart = _lock_carts([user_id])[user_id]
+        # Кэш читается после блокировки строки: очистка корзины уже закоммичена или ждет нас
+        state = cache.get(_cart_key(user_id))
+        if state is not None:
+            _write_cart(cart, state)
+
+
+def flush_dirty(batch_size: Optional[int] = None) -> int:
+    """
+    Записать измененные корзины в БД
+
+    Пользователи снимаются с учета (SPOP) до чтения корзины, поэтому
+    изменение, сделанное во время записи, снова помечает корзину и попадет
+    в следующий проход. Корзины читаются из кэша после блокировки их строк
+    Cart, а устаревшие (версия в БД не меньше версии в кэше) пропускаются.
+    Корзины записываются пачками по batch_size в одной транзакции; при
+    ошибке пачка возвращается в множество.
+
+    Returns:
+        Количество записанных корзин
+    """
+    batch_size = batch_size or getattr(settings, 'CART_FLUSH_BATCH_SIZE', 100)
+    flushed = 0
+
+    while True:
+        batch = _pop_dirty(batch_size)
+        if not batch:
+            return flushed
+
+        try:
+            # Корзины удаленных пользователей не записываются
+            existing = list(CustomUser.objects.filter(id__in=batch).values_list('id', flat=True))
+            written = 0
+            with transaction.atomic():
+                carts = _lock_carts(existing)
+                states = cache.get_many([_cart_key(user_id) for user_id in existing])
+                for user_id in existing:
+                    state = states.get(_cart_key(user_id))
+                    # Корзины нет в кэше - она уже очищена при оформлении заказа
+                    if state is not None and _write_cart(carts[user_id], state):
+                        written += 1
+        except Exception as e:
+            logger.error(f'[CART] Failed to flush {len(batch)} carts: {e}')
+            _mark_dirty(*batch)
+            return flushed
+        flushed += written
@@ -1,4 +1,12 @@
-from apps.cart.models import Cart, CartItem
+from django.db import transaction
+from django.db.models import F, Q
+from apps.cart.models import Cart, CartItem, CartItemRemoval
+from .operations import (
+    OP_ADD, OP_REMOVE, CartVersionConflict, apply_operations as apply_to_items, delta_possible, item_key,
+    stamp_changes,
+)
+
+ITEM_FIELDS = ('product_id', 'title', 'size', 'price', 'image', 'version')
 
 
 def get_or_create_cart(user):
@@ -6,31 +14,161 @@ def get_or_create_cart(user):
     return cart
 
 
-def get_items(user):
-    cart = get_or_create_cart(user)
-    return cart.items.all()
+def get_items(user_id):
+    """
+    Товары корзины пользователя одним запросом (JOIN по cart.user_id)
 
+    Чтение не создает пустую корзину: у пользователя без корзины
+    просто нет товаров.
+    """
+    return CartItem.objects.filter(cart__user_id=user_id).order_by('id')
 
-def add_item(user, item_data: dict):
-    cart = get_or_create_cart(user)
-
-    CartItem.objects.update_or_create(
-        cart=cart,
-        product_id=item_data['product_id'],
-        size=item_data.get('size'),
-        defaults={
-            'title': item_data['title'],
-            'price': item_data['price'],
-            'image': item_data['image'],
-        }
+
+def get_cart(user_id):
+    """
+    Товары и версия корзины одним запросом (LEFT JOIN cart -> items)
+
+    Returns:
+        (список товаров, версия); у пользователя без корзины - ([], 0)
+    """
+    rows = (
+        Cart.objects
+        .filter(user_id=user_id)
+        .values('version', *(f'items__{field}' for field in ITEM_FIELDS))
+        .order_by('items__id')
     )
 
+    items = []
+    version = 0
+    for row in rows:
+        version = row['version']
+        if row['items__product_id'] is not None:
+            items.append({field: row[f'items__{field}'] for field in ITEM_FIELDS})
+    return items, version
+
+
+def get_cart_delta(user_id, since: int):
+    """
+    Изменения корзины после версии since
+
+    Если версия не изменилась - один запрос. Строки читаются после версии,
+    поэтому могут оказаться новее нее; повторное применение строк клиентом
+    безопасно.
+
+    Returns:
+        None, если корзина не изменилась, иначе
+        {"version", "full", "items", "removed"}; full=True - вся корзина
+        вместо дельты (since старше последней очистки или неизвестен)
+    """
+    row = Cart.objects.filter(user_id=user_id).values('version', 'reset_version').first()
+    version, reset_version = (row['version'], row['reset_version']) if row else (0, 0)
+    if since == version:
+        return None
+
+    if not delta_possible(since, version, reset_version):
+        items, version = get_cart(user_id)
+        return {'version': version, 'full': True, 'items': items, 'removed': []}
+
+    items = list(
+        CartItem.objects
+        .filter(cart__user_id=user_id, version__gt=since)
+        .order_by('id')
+        .values(*ITEM_FIELDS)
+    )
+    removed = list(
+        CartItemRemoval.objects
+        .filter(cart__user_id=user_id, version__gt=since)
+        .values('product_id', 'size')
+    )
+    return {'version': version, 'full': False, 'items': items, 'removed': removed}
+
+
+def add_item(user, item_data: dict):
+    apply_operations(user.id, [{'op': OP_ADD, **item_data}])
+
 
 def remove_item(user, item_data: dict):
-    CartItem.objects.filter(
-        cart__user=user,
-        product_id=item_data['product_id'],
-        size=item_data.get('size'),
-    ).delete()
+    apply_operations(user.id, [{'op': OP_REMOVE, **item_data}])
+
+
+def apply_operations(user_id, operations, expected_version=None):
+    """
+    Применить пакет операций add/remove/set в одной транзакции
+
+    Корзина блокируется (SELECT ... FOR UPDATE), изменения записываются
+    одним bulk_create(update_conflicts=True) и одним DELETE, версия
+    корзины увеличивается на 1, если что-то изменилось. Измененные строки
+    получают новую версию, удаленные сохраняются для дельты ?since=.
+
+    Returns:
+        (список товаров, новая версия)
+
+    Raises:
+        CartVersionConflict: expected_version не совпал с текущей версией
+    """
+    with transaction.atomic():
+        cart, _ = Cart.objects.select_for_update().get_or_create(user_id=user_id)
+
+        current = {
+            item_key(item['product_id'], item['size']): item
+            for item in cart.items.order_by('id').values(*ITEM_FIELDS)
+        }
+        if expected_version is not None and expected_version != cart.version:
+            raise CartVersionConflict(list(current.values()), cart.version)
+
+        result = apply_to_items(current, operations)
+        changed, removed = stamp_changes(current, result, cart.version + 1)
+        if changed or removed:
+            _write_items(cart, changed, removed)
+            cart.version += 1
+            cart.save(update_fields=['version', 'updated_at'])
+
+    return list(result.values()), cart.version
+
+
+def _keys_condition(items) -> Q:
+    condition = Q()
+    for item in items:
+        condition |= Q(product_id=item['product_id'], size=item['size'])
+    return condition
+
+
+def _write_items(cart, changed, removed):
+    """Записать измененные и удаленные строки: по одному upsert и DELETE на каждый вид"""
+    if changed:
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, **item) for item in changed],
+            update_conflicts=True,
+            unique_fields=['cart', 'product_id', 'size'],
+            update_fields=['title', 'price', 'image', 'version'],
+        )
+        # Снова добавленный товар больше не считается удаленным
+        CartItemRemoval.objects.filter(cart=cart).filter(_keys_condition(changed)).delete()
+
+    if removed:
+        CartItem.objects.filter(cart=cart).filter(_keys_condition(removed)).delete()
+        CartItemRemoval.objects.bulk_create(
+            [CartItemRemoval(cart=cart, **item) for item in removed],
+            update_conflicts=True,
+            unique_fields=['cart', 'product_id', 'size'],
+            update_fields=['version'],
+        )
+
+
+def clear_items(user):
+    """Очистить корзину; история удалений не нужна - дельта от прежних версий невозможна"""
+    CartItem.objects.filter(cart__user=user).delete()
+    CartItemRemoval.objects.filter(cart__user=user).delete()
+    Cart.objects.filter(user=user).update(version=F('version') + 1, reset_version=F('version') + 1)
+
+
+def discard_cache(user_id):
+    """Кэша корзин нет - сбрасывать нечего"""
+
+
+def flush(user_id):
+    """Корзина и так хранится в БД - записывать нечего"""
 
 
+def flush_dirty(batch_size=None):
+    return 0
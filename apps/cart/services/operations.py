@@ -0,0 +1,91 @@
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+OP_ADD = 'add'
+OP_REMOVE = 'remove'
+OP_SET = 'set'
+OP_CHOICES = (OP_ADD, OP_REMOVE, OP_SET)
+
+
+class CartVersionConflict(Exception):
+    """Корзина изменилась после версии, на которую рассчитывал клиент"""
+
+    def __init__(self, items: List[Dict], version: int):
+        super().__init__(f'Cart version is {version}')
+        self.items = items
+        self.version = version
+
+
+def item_key(product_id: str, size: Optional[str]) -> str:
+    return f'{product_id}|{size or ""}'
+
+
+def item_from_data(item_data: dict) -> Dict:
+    """Товар корзины в едином для хранилищ виде"""
+    return {
+        'product_id': item_data['product_id'],
+        'title': item_data['title'],
+        'size': item_data.get('size') or '',
+        'price': Decimal(item_data['price']),
+        'image': item_data['image'],
+    }
+
+
+def apply_operations(items: Dict[str, Dict], operations: List[dict]) -> Dict[str, Dict]:
+    """
+    Применить операции к содержимому корзины по порядку
+
+    Операции:
+        add - добавить товар или обновить его title/price/image;
+        remove - удалить товар по product_id и size;
+        set - заменить содержимое корзины списком items.
+
+    Returns:
+        Новое содержимое корзины {item_key: товар}; исходный словарь не меняется
+    """
+    result = dict(items)
+    for operation in operations:
+        if operation['op'] == OP_SET:
+            previous, result = result, {}
+            for item_data in operation['items']:
+                _put(result, item_from_data(item_data), previous)
+        elif operation['op'] == OP_ADD:
+            _put(result, item_from_data(operation), result)
+        elif operation['op'] == OP_REMOVE:
+            result.pop(item_key(operation['product_id'], operation.get('size')), None)
+    return result
+
+
+def _put(result: Dict[str, Dict], item: Dict, previous: Dict[str, Dict]) -> None:
+    # Неизмененный товар остается прежним объектом со своей версией
+    key = item_key(item['product_id'], item['size'])
+    current = previous.get(key)
+    if current is not None and all(current[field] == value for field, value in item.items()):
+        item = current
+    result[key] = item
+
+
+def stamp_changes(current: Dict[str, Dict], result: Dict[str, Dict], version: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Проставить версию измененным товарам и собрать удаленные
+
+    Returns:
+        (измененные товары, удаленные строки {"product_id", "size", "version"})
+    """
+    changed = []
+    for item in result.values():
+        if 'version' not in item:
+            item['version'] = version
+            changed.append(item)
+
+    removed = [
+        {'product_id': item['product_id'], 'size': item['size'], 'version': version}
+        for key, item in current.items()
+        if key not in result
+    ]
+    return changed, removed
+
+
+def delta_possible(since: int, version: int, reset_version: int) -> bool:
+    """Можно ли отдать изменения после since, а не всю корзину"""
+    return reset_version <= since <= version
@@ -0,0 +1,52 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from apps.posiflora.services.price_index import get_price_index
+
+
+def revalidate_lines(
+    lines: Iterable[Tuple[str, Optional[str], Decimal]],
+    build: bool = False,
+) -> Optional[List[Dict]]:
+    """
+    Сверить строки корзины или заказа с индексом цен каталога
+
+    Один проход по строкам с поиском в словаре: без запросов в Posiflora
+    и без обращения к БД, пока снимки каталога есть в кэше.
+
+    Args:
+        lines: (ID товара, размер, цена из корзины) для каждой строки
+        build: Построить отсутствующие снимки каталога (см. get_price_index)
+
+    Returns:
+        Для каждой строки {"current_price", "available", "price_changed"};
+        None, если каталога нет и сверить не с чем
+    """
+    index = get_price_index(build=build)
+    if index is None:
+        return None
+
+    result = []
+    for product_id, size, price in lines:
+        current = index.price(product_id, size)
+        result.append({
+            'current_price': current,
+            'available': current is not None,
+            'price_changed': current is not None and Decimal(price) != current,
+        })
+    return result
+
+
+def annotate_items(items: List[Dict]) -> bool:
+    """
+    Дополнить товары корзины полями current_price, available и price_changed
+
+    Returns:
+        True, если корзина сверена с каталогом
+    """
+    checks = revalidate_lines((item['product_id'], item['size'], item['price']) for item in items)
+    if checks is None:
+        return False
+
+    for item, check in zip(items, checks):
+        item.update(check)
+    return True
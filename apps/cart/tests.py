@@ -0,0 +1,152 @@
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import skipUnless
+from django.core.signing import Signer
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from apps.cart.models import Cart, CartItem
+from apps.cart.services.db_cart import get_cart
+from apps.custom_auth.models import CustomUser
+
+CART_URL = '/api/cart/'
+
+
+def signed(user_id) -> str:
+    return Signer(salt='user-auth').sign(str(user_id))
+
+
+@override_settings(
+    CART_STORE='db',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class CartReadQueriesTests(TestCase):
+    """Чтение корзины (CartView.get) - один SQL-запрос и без создания корзины"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(phone='+70000000001', name='Cart')
+        cart = Cart.objects.create(user=cls.user, version=3, reset_version=0)
+        CartItem.objects.bulk_create([
+            CartItem(
+                cart=cart,
+                product_id=f'product-{n}',
+                title=f'Букет {n}',
+                size='M',
+                price=1000 + n,
+                image='https://cdn.example.com/image.jpg',
+                version=n + 1,
+            )
+            for n in range(3)
+        ])
+
+    def test_cart_read_is_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(CART_URL, {'user_id': signed(self.user.id)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 3)
+        self.assertEqual(
+            [item['product_id'] for item in response.data['items']],
+            ['product-0', 'product-1', 'product-2'],
+        )
+
+    def test_empty_cart_read_does_not_create_cart(self):
+        user = CustomUser.objects.create(phone='+70000000002', name='Empty')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(CART_URL, {'user_id': signed(user.id)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['items'], [])
+        self.assertEqual(response.data['version'], 0)
+        self.assertFalse(Cart.objects.filter(user=user).exists())
+
+    def test_unchanged_delta_is_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(CART_URL, {'user_id': signed(self.user.id), 'since': 3})
+
+        self.assertEqual(response.status_code, 304)
+
+
+def legacy_read(user_id):
+    """Прежний путь CartView.get: пользователь, get_or_create корзины, товары"""
+    user = CustomUser.objects.get(id=user_id)
+    cart, _ = Cart.objects.get_or_create(user=user)
+    return list(cart.items.all())
+
+
+def current_read(user_id):
+    items, _ = get_cart(user_id)
+    return items
+
+
+@skipUnless(os.environ.get('CART_BENCHMARK'), 'set CART_BENCHMARK=1 to run the cart read benchmark')
+class CartReadBenchmark(TransactionTestCase):
+    """
+    Замер чтения корзины при параллельной нагрузке на тестовой БД
+
+    Запуск: CART_BENCHMARK=1 python manage.py test apps.cart.tests.CartReadBenchmark
+    Параметры: CART_BENCHMARK_USERS, CART_BENCHMARK_ITEMS, CART_BENCHMARK_THREADS,
+    CART_BENCHMARK_REQUESTS. Данные создаются только в тестовой БД.
+    """
+
+    def setUp(self):
+        users_count = int(os.environ.get('CART_BENCHMARK_USERS', 50))
+        items_count = int(os.environ.get('CART_BENCHMARK_ITEMS', 5))
+        self.threads = int(os.environ.get('CART_BENCHMARK_THREADS', 8))
+        self.requests = int(os.environ.get('CART_BENCHMARK_REQUESTS', 2000))
+
+        CustomUser.objects.bulk_create([
+            CustomUser(phone=f'+7{i:010d}', name='Benchmark')
+            for i in range(users_count)
+        ])
+        users = list(CustomUser.objects.order_by('id'))
+        Cart.objects.bulk_create([Cart(user=user) for user in users])
+        CartItem.objects.bulk_create([
+            CartItem(
+                cart=cart,
+                product_id=f'product-{n}',
+                title=f'Букет {n}',
+                size='M',
+                price=1000 + n,
+                image='https://cdn.example.com/image.jpg',
+            )
+            for cart in Cart.objects.all()
+            for n in range(items_count)
+        ])
+        self.user_ids = [user.id for user in users]
+
+    def _measure(self, reader):
+        def timed(index):
+            started = time.perf_counter()
+            reader(self.user_ids[index % len(self.user_ids)])
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            timings = list(executor.map(timed, range(self.requests)))
+            # Барьер раздает задачу закрытия соединения каждому рабочему потоку
+            barrier = threading.Barrier(self.threads)
+            list(executor.map(lambda _: (barrier.wait(), connections.close_all()), range(self.threads)))
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        return (
+            self.requests / elapsed,
+            statistics.median(timings) * 1000,
+            timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+        )
+
+    def test_cart_read_throughput(self):
+        user_id = self.user_ids[0]
+        self.assertEqual(len(current_read(user_id)), len(legacy_read(user_id)))
+
+        for name, reader in (('legacy', legacy_read), ('current', current_read)):
+            throughput, p50, p95 = self._measure(reader)
+            print(
+                f'\n{name}: {throughput:.0f} чтений/с при {self.threads} потоках, '
+                f'p50 {p50:.2f} мс, p95 {p95:.2f} мс'
+            )
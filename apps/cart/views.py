@@ -3,8 +3,11 @@ from drf_spectacular.types import OpenApiTypes
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.core.signing import Signer, BadSignature
-from .services.db_cart import get_items, add_item, remove_item
-from apps.cart.serializers import CartItemSerializer, CartItemInputSerializer
+from .services import get_cart_store
+from .services.operations import CartVersionConflict
+from .services.revalidation import annotate_items
+from apps.cart.serializers import CartItemSerializer, CartItemInputSerializer, CartLineSerializer, CartPatchSerializer
+from apps.common.cache_lock import CacheLockTimeout
 from apps.custom_auth.models import CustomUser
 
 
@@ -19,13 +22,27 @@ def unsign_user_id(signed_user_id):
         return None
 
 
+def busy_response() -> Response:
+    """503, если корзину в этот момент меняет другой запрос и блокировку не дождались"""
+    response = Response({'error': 'Cart is busy, retry later'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
 class CartView(APIView):
     authentication_classes = []
     permission_classes = []
 
     @extend_schema(
         summary="Получить корзину",
-        description="Возвращает список всех товаров в корзине пользователя",
+        description=(
+            "Возвращает список всех товаров в корзине пользователя. Если в кэше есть снимок "
+            "каталога, каждый товар сверяется с ним: current_price - текущая цена, "
+            "available - товар в этом размере есть в каталоге, price_changed - цена изменилась. "
+            "С параметром since возвращает 304, если версия корзины не изменилась, или только "
+            "измененные (items) и удаленные (removed) строки; full=true означает, что дельту "
+            "построить нельзя и items содержит всю корзину"
+        ),
         parameters=[
             OpenApiParameter(
                 name='user_id',
@@ -33,6 +50,13 @@ class CartView(APIView):
                 location=OpenApiParameter.QUERY,
                 description='ID пользователя (опционально, для совместимости). Должен совпадать с ID аутентифицированного пользователя.',
                 required=False
+            ),
+            OpenApiParameter(
+                name='since',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='Версия корзины, которая уже есть у клиента',
+                required=False
             )
         ],
         responses={
@@ -48,12 +72,30 @@ class CartView(APIView):
                                 'id': {'type': 'integer', 'example': 1},
                                 'product_id': {'type': 'string', 'example': 'prod-123'},
                                 'quantity': {'type': 'integer', 'example': 2},
-                                'added_at': {'type': 'string', 'format': 'date-time'}
+                                'added_at': {'type': 'string', 'format': 'date-time'},
+                                'current_price': {'type': 'string', 'nullable': True, 'example': '2500.00'},
+                                'available': {'type': 'boolean', 'example': True},
+                                'price_changed': {'type': 'boolean', 'example': False}
+                            }
+                        }
+                    },
+                    'version': {'type': 'integer', 'example': 3},
+                    'revalidated': {'type': 'boolean', 'example': True},
+                    'full': {'type': 'boolean', 'description': 'Только при since', 'example': False},
+                    'removed': {
+                        'type': 'array',
+                        'description': 'Только при since: строки, удаленные после этой версии',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'product_id': {'type': 'string', 'example': 'prod-456'},
+                                'size': {'type': 'string', 'example': 'S'}
                             }
                         }
                     }
                 }
             },
+            304: {'description': 'Корзина не изменилась после версии since'},
             401: {
                 'type': 'object',
                 'properties': {
@@ -110,16 +152,146 @@ class CartView(APIView):
         if not user_id:
             return Response({'error': 'user_id required or invalid signature'}, status=400)
 
-        try:
-            user = CustomUser.objects.get(id=user_id)
-        except CustomUser.DoesNotExist:
+        since = request.GET.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                since = -1
+            if since < 0:
+                return Response({'error': 'since must be a non-negative integer'}, status=400)
+
+        # Подпись гарантирует, что user_id выдан сервером: отдельный SELECT
+        # пользователя не нужен, корзина удаленного пользователя пуста (CASCADE)
+        if since is None:
+            items, version = get_cart_store().get_cart(user_id)
+            delta = None
+        else:
+            delta = get_cart_store().get_cart_delta(user_id, since)
+            if delta is None:
+                return Response(status=304)
+            items, version = delta['items'], delta['version']
+
+        # Копии: товары из хранилища не должны получить поля сверки
+        items = [dict(item) for item in items]
+        revalidated = annotate_items(items)
+        serializer = CartLineSerializer(items, many=True)
+
+        data = {
+            'items': serializer.data,
+            'version': version,
+            'revalidated': revalidated,
+        }
+        if delta is not None:
+            data['full'] = delta['full']
+            data['removed'] = delta['removed']
+        return Response(data)
+
+    @extend_schema(
+        summary="Изменить корзину пакетом операций",
+        description=(
+            "Применяет список операций add/remove/set в одной транзакции и возвращает "
+            "итоговую корзину с новой версией. Если передан expected_version и корзина "
+            "уже изменилась, возвращается 409 с текущей корзиной"
+        ),
+        parameters=[
+            OpenApiParameter(
+                name='user_id',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description='ID пользователя',
+                required=True
+            )
+        ],
+        request=CartPatchSerializer,
+        responses={
+            200: {
+                'type': 'object',
+                'properties': {
+                    'items': {'type': 'array', 'items': {'type': 'object'}},
+                    'version': {'type': 'integer', 'example': 3}
+                }
+            },
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'}
+                }
+            },
+            404: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'example': 'User not found'}
+                }
+            },
+            409: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'example': 'Cart version conflict'},
+                    'items': {'type': 'array', 'items': {'type': 'object'}},
+                    'version': {'type': 'integer', 'example': 4}
+                }
+            },
+            503: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string', 'example': 'Cart is busy, retry later'}
+                }
+            }
+        },
+        tags=['Cart'],
+        examples=[
+            OpenApiExample(
+                'Синхронизация корзины после входа',
+                value={
+                    'expected_version': 2,
+                    'operations': [
+                        {
+                            'op': 'add',
+                            'product_id': 'prod-123',
+                            'title': 'Букет роз',
+                            'size': 'M',
+                            'price': 2500.00,
+                            'image': 'https://example.com/image.jpg'
+                        },
+                        {'op': 'remove', 'product_id': 'prod-456', 'size': 'S'}
+                    ]
+                },
+                request_only=True
+            )
+        ]
+    )
+    def patch(self, request):
+        signed_user_id = request.GET.get('user_id')
+        user_id = unsign_user_id(signed_user_id)
+        if not user_id:
+            return Response({'error': 'user_id required or invalid signature'}, status=400)
+
+        serializer = CartPatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': serializer.errors}, status=400)
+
+        if not CustomUser.objects.filter(id=user_id).exists():
             return Response({'error': 'User not found'}, status=404)
 
-        items = get_items(user)
-        serializer = CartItemSerializer(items, many=True)
+        try:
+            items, version = get_cart_store().apply_operations(
+                user_id,
+                serializer.validated_data['operations'],
+                expected_version=serializer.validated_data.get('expected_version'),
+            )
+        except CartVersionConflict as e:
+            return Response({
+                'error': 'Cart version conflict',
+                'items': CartItemSerializer(e.items, many=True).data,
+                'version': e.version,
+            }, status=409)
+        except CacheLockTimeout:
+            return busy_response()
 
         return Response({
-            'items': serializer.data
+            'items': CartItemSerializer(items, many=True).data,
+            'version': version,
         })
 
 
@@ -202,7 +374,10 @@ class CartItemView(APIView):
         if not serializer.is_valid():
             return Response({'error': serializer.errors}, status=400)
 
-        add_item(user, serializer.validated_data)
+        try:
+            get_cart_store().add_item(user, serializer.validated_data)
+        except CacheLockTimeout:
+            return busy_response()
         return Response({'status': 'ok'})
 
     @extend_schema(
@@ -285,5 +460,8 @@ class CartItemView(APIView):
             'product_id': product_id,
             'size': request.data.get('size'),
         }
-        remove_item(user, item_data)
+        try:
+            get_cart_store().remove_item(user, item_data)
+        except CacheLockTimeout:
+            return busy_response()
         return Response({'status': 'ok'})
\ No newline at end of file
@@ -0,0 +1,78 @@
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from django.core.cache import cache
+
+
+@contextmanager
+def cache_lock(key: str, timeout: int = 30):
+    """
+    Неблокирующая блокировка между воркерами через Django cache
+
+    Захват делается cache.add и видят его все gunicorn-воркеры с общим
+    кэшем. Взаимное исключение гарантирует только Redis, где add атомарен
+    (SET NX); в файловом кэше (локальная разработка, см. CACHES в settings)
+    add - это has_key и set, и блокировку могут захватить двое.
+
+    Args:
+        key: Ключ блокировки в кэше
+        timeout: Время жизни блокировки в секундах (на случай падения владельца)
+
+    Yields:
+        True, если блокировка захвачена текущим процессом
+    """
+    token = uuid.uuid4().hex
+    acquired = cache.add(key, token, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+class CacheLockTimeout(RuntimeError):
+    """Блокировку не удалось захватить за отведенное время"""
+
+    def __init__(self, key: str):
+        super().__init__(f'Lock {key} is busy')
+        self.key = key
+
+
+@contextmanager
+def wait_cache_lock(key: str, timeout: int = 30, wait: float = 5, poll_interval: float = 0.01):
+    """
+    Блокировка cache_lock с ожиданием освобождения
+
+    Для коротких операций чтение-изменение-запись: без блокировки они
+    затирают друг друга, поэтому при занятой блокировке вызывающий ждет,
+    а не продолжает без нее.
+
+    Args:
+        key: Ключ блокировки в кэше
+        timeout: Время жизни блокировки в секундах
+        wait: Сколько секунд ждать освобождения
+
+    Raises:
+        CacheLockTimeout: Блокировка не освободилась за wait секунд
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        with cache_lock(key, timeout) as acquired:
+            if acquired:
+                yield
+                return
+        if time.monotonic() >= deadline:
+            raise CacheLockTimeout(key)
+        time.sleep(poll_interval)
+
+
+@asynccontextmanager
+async def acache_lock(key: str, timeout: int = 30):
+    """Асинхронный вариант cache_lock (через cache.aadd)"""
+    token = uuid.uuid4().hex
+    acquired = await cache.aadd(key, token, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and await cache.aget(key) == token:
+            await cache.adelete(key)
@@ -20,7 +20,8 @@ from apps.orders.serializers import (
 )
 from apps.orders.services import YooKassaService
 from apps.orders.telegram_service import TelegramNotificationService
-from apps.cart.models import Cart
+from apps.cart.services import get_cart_store
+from apps.cart.services.revalidation import revalidate_lines
 from apps.custom_auth.models import CustomUser
 from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
@@ -40,6 +41,56 @@ def unsign_user_id(signed_user_id):
         return None
 
 
+def check_order_prices(validated_data):
+    """
+    Сверить цены заказа с каталогом и суммы заказа между собой
+
+    Returns:
+        Ответ с ошибкой или None, если заказ можно создавать
+    """
+    cart_items = validated_data['cartItems']
+
+    cart_price = sum((item['price'] for item in cart_items), Decimal('0'))
+    if cart_price != validated_data['cartPrice']:
+        return Response({'cartPrice': f'Summa tovarov {cart_price}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    delivery_price = validated_data['deliveryPrice'] if validated_data.get('deliveryType') != 'pickup' else Decimal('0')
+    if validated_data['fullPrice'] != cart_price + delivery_price:
+        return Response({'fullPrice': f'Polnaya summa {cart_price + delivery_price}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    checks = revalidate_lines(
+        ((item['productId'], item.get('size'), item['price']) for item in cart_items),
+        build=True,
+    )
+    if checks is None:
+        # Каталога нет ни в кэше, ни в БД, ни в Posiflora - заказ с несверенными ценами не создаем
+        logger.warning("[ORDERS] Catalog is unavailable, order prices cannot be revalidated")
+        response = Response(
+            {'error': 'Katalog vremenno nedostupen, poprobuyte pozzhe'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Retry-After'] = '30'
+        return response
+
+    outdated = [
+        {
+            'productId': item['productId'],
+            'size': item.get('size', ''),
+            'price': str(item['price']),
+            'currentPrice': str(check['current_price'].quantize(Decimal('0.01'))) if check['available'] else None,
+            'available': check['available'],
+        }
+        for item, check in zip(cart_items, checks)
+        if not check['available'] or check['price_changed']
+    ]
+    if outdated:
+        return Response(
+            {'error': 'Ceny ili nalichie tovarov izmenilis', 'items': outdated},
+            status=status.HTTP_409_CONFLICT
+        )
+    return None
+
+
 class CreateOrderView(APIView):
     authentication_classes = []
     permission_classes = []
@@ -59,7 +110,9 @@ class CreateOrderView(APIView):
             201: PaymentResponseSerializer,
             400: OpenApiResponse(description="Oshibka validacii"),
             404: OpenApiResponse(description="Polzovatel ne nayden"),
-            500: OpenApiResponse(description="Oshibka sozdaniya platezha")
+            409: OpenApiResponse(description="Ceny ili nalichie tovarov izmenilis"),
+            500: OpenApiResponse(description="Oshibka sozdaniya platezha"),
+            503: OpenApiResponse(description="Katalog vremenno nedostupen")
         },
         tags=['Orders']
     )
@@ -76,7 +129,18 @@ class CreateOrderView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+        error_response = check_order_prices(serializer.validated_data)
+        if error_response is not None:
+            return error_response
+
+        cart_store = get_cart_store()
+        cart_cleared = False
+
         try:
+            if user is not None:
+                # Корзина из кэша записывается в БД до создания заказа
+                cart_store.flush(user.id)
+
             with transaction.atomic():
                 validated_data = serializer.validated_data
 
@@ -143,11 +207,9 @@ class CreateOrderView(APIView):
                 ]
                 OrderItem.objects.bulk_create(order_items)
 
-                try:
-                    cart = Cart.objects.get(user=user)
-                    cart.items.all().delete()
-                except (Cart.DoesNotExist, TypeError):
-                    pass
+                if user is not None:
+                    cart_store.clear_items(user)
+                    cart_cleared = True
 
                 yookassa_service = YooKassaService()
                 return_url = request.data.get('return_url', 'https://floricraft.ru/thank-you')
@@ -174,6 +236,12 @@ class CreateOrderView(APIView):
 
         except Exception as e:
             logger.error(f"Oshibka pri sozdanii zakaza: {type(e).__name__}: {str(e)}", exc_info=True)
+            if cart_cleared:
+                # Очистка корзины откатилась вместе с заказом, а кэш уже пустой
+                try:
+                    cart_store.discard_cache(user.id)
+                except Exception as discard_error:
+                    logger.error(f"[ORDERS] Failed to discard cached cart of user {user.id}: {discard_error}")
             return Response(
                 {'error': 'Ne udalos sozdat zakaz', 'detail': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
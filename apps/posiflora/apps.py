@@ -1,4 +1,5 @@
 import logging
+import os
 import sys
 from django.apps import AppConfig
 from django.conf import settings
@@ -6,6 +7,23 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 
+# Процессы, которые обслуживают HTTP-запросы; celery, shell, тесты и скрипты сюда не входят
+SERVER_COMMANDS = ('gunicorn', 'uvicorn', 'daphne', 'hypercorn')
+
+
+def _is_server_process() -> bool:
+    """Процесс обслуживает HTTP-запросы (gunicorn/uvicorn или runserver), а не команду или скрипт"""
+    command = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if command == '__main__.py':
+        # python -m gunicorn: argv[0] - путь к gunicorn/__main__.py
+        command = os.path.basename(os.path.dirname(sys.argv[0]))
+
+    server_commands = getattr(settings, 'POSIFLORA_SERVER_COMMANDS', SERVER_COMMANDS)
+    if command in server_commands:
+        return True
+    return command == 'manage.py' and 'runserver' in sys.argv and os.environ.get('RUN_MAIN') == 'true'
+
+
 class PosifloraConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.posiflora'
@@ -20,6 +38,8 @@ class PosifloraConfig(AppConfig):
         # Импортируем здесь, чтобы избежать циклических импортов
         from .services.tokens import get_session
 
+        warmup_enabled = getattr(settings, 'POSIFLORA_WARMUP_ENABLED', False) and _is_server_process()
+
         try:
             username = getattr(settings, 'POSIFLORA_USER', None)
             password = getattr(settings, 'POSIFLORA_PASSWORD', None)
@@ -31,9 +51,21 @@ class PosifloraConfig(AppConfig):
                 )
                 return
 
-            # get_session() автоматически создаст/обновит сессию при необходимости
-            get_session()
-            logger.info('Posiflora session is ready')
+            if warmup_enabled:
+                # Сессия и каталог готовятся в фоне, старт воркера не ждет Posiflora
+                from .services.warmup import start_catalog_warmup
+                start_catalog_warmup()
+                logger.info('Posiflora catalog warm-up started')
+            else:
+                # get_session() автоматически создаст/обновит сессию при необходимости
+                get_session()
+                logger.info('Posiflora session is ready')
 
         except Exception as e:
             logger.error(f'Failed to initialize Posiflora session: {e}')
+
+        # Фоновое продление токена, чтобы запросы пользователей не ждали refresh
+        if getattr(settings, 'POSIFLORA_TOKEN_REFRESHER_ENABLED', False) and _is_server_process():
+            from .services.token_refresher import start_token_refresher
+            start_token_refresher()
+            logger.info('Posiflora token refresher started')
@@ -0,0 +1,143 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from .services.async_products import get_async_product_service
+from .services.catalog_cache import CatalogBuildTimeout, bouquets_cache, find_in_snapshots, specifications_cache
+from .services.catalog_query import get_query_index
+from .services.catalog_store import load_product
+from .services.circuit_breaker import CircuitOpenError
+from .services.products import ProductNotFound
+from .http_cache import (
+    conditional_response,
+    data_etag,
+    rendered_response,
+    set_cache_headers,
+    snapshot_etag,
+)
+from .serializers import (
+    CategoryProductSerializer,
+    BouquetSerializer,
+    CategorizedProductsSerializer,
+    CatalogQuerySerializer,
+    PaginatedProductsSerializer,
+)
+from .views import UPSTREAM_RETRY_AFTER, is_catalog_query
+
+
+def _json(data, status: int = 200) -> JsonResponse:
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+def _unavailable(error: Exception) -> JsonResponse:
+    response = _json({'error': 'Posiflora is temporarily unavailable', 'detail': str(error)}, status=503)
+    response['Retry-After'] = str(getattr(error, 'retry_after', UPSTREAM_RETRY_AFTER))
+    return response
+
+
+class AsyncProductDetailView(View):
+    """
+    Async-вариант ProductDetailView для запуска под ASGI (uvicorn)
+    """
+
+    async def get(self, request, product_id):
+        try:
+            product = await sync_to_async(load_product)(product_id)
+            built_at = None
+            if product is None:
+                service = get_async_product_service()
+                try:
+                    product = await service.get_specification_by_id(product_id)
+                except ProductNotFound:
+                    raise
+                except Exception as e:
+                    found = await sync_to_async(find_in_snapshots)(product_id)
+                    if found is None:
+                        return _unavailable(e)
+                    product, built_at = found
+
+            etag = data_etag(product)
+            not_modified = conditional_response(request, etag, built_at)
+            if not_modified is not None:
+                return not_modified
+
+            serializer = CategoryProductSerializer(product)
+            return set_cache_headers(_json(serializer.data), etag, built_at)
+
+        except Exception as e:
+            return _json({'error': 'Product not found', 'detail': str(e)}, status=404)
+
+
+class AsyncBouquetListView(View):
+    """
+    Async-вариант BouquetListView для запуска под ASGI (uvicorn)
+    """
+
+    async def get(self, request):
+        try:
+            snapshot = await bouquets_cache.aget_snapshot()
+
+            etag = snapshot_etag(snapshot['version'])
+            not_modified = conditional_response(request, etag, snapshot['built_at'])
+            if not_modified is not None:
+                return not_modified
+
+            response = rendered_response(request, snapshot)
+            if response is None:
+                response = _json(BouquetSerializer(snapshot['data'], many=True).data)
+
+            return set_cache_headers(response, etag, snapshot['built_at'])
+
+        except (CircuitOpenError, CatalogBuildTimeout) as e:
+            return _unavailable(e)
+
+        except Exception as e:
+            return _json({'error': 'Failed to fetch bouquets', 'detail': str(e)}, status=500)
+
+
+class AsyncProductsInStock(View):
+    """
+    Async-вариант ProductsInStock для запуска под ASGI (uvicorn)
+    """
+
+    async def get(self, request):
+        try:
+            snapshot = await specifications_cache.aget_snapshot()
+
+            if is_catalog_query(request.GET):
+                return self._get_page(request, snapshot)
+
+            etag = snapshot_etag(snapshot['version'])
+            not_modified = conditional_response(request, etag, snapshot['built_at'])
+            if not_modified is not None:
+                return not_modified
+
+            response = rendered_response(request, snapshot)
+            if response is None:
+                response = _json(CategorizedProductsSerializer(snapshot['data']).data)
+
+            return set_cache_headers(response, etag, snapshot['built_at'])
+
+        except (CircuitOpenError, CatalogBuildTimeout) as e:
+            return _unavailable(e)
+
+        except Exception as e:
+            return _json({'error': 'Failed to fetch specifications', 'detail': str(e)}, status=500)
+
+    def _get_page(self, request, snapshot):
+        query = CatalogQuerySerializer(data=request.GET)
+        if not query.is_valid():
+            return _json({'error': query.errors}, status=400)
+
+        etag = data_etag({'version': snapshot['version'], 'query': query.validated_data})
+        not_modified = conditional_response(request, etag, snapshot['built_at'])
+        if not_modified is not None:
+            return not_modified
+
+        page = get_query_index(specifications_cache.name, snapshot).query(**query.validated_data)
+        serializer = PaginatedProductsSerializer(page)
+        return set_cache_headers(_json(serializer.data), etag, snapshot['built_at'])
@@ -0,0 +1,112 @@
+import time
+from typing import Dict, Optional
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from .services.catalog_cache import CatalogCache
+from .services.rendering import ENCODING_BROTLI, ENCODING_GZIP, ENCODING_IDENTITY
+
+
+def snapshot_etag(version: str) -> str:
+    """ETag по версии снимка каталога (хэш содержимого)"""
+    return quote_etag(version)
+
+
+def data_etag(data) -> str:
+    """ETag по содержимому данных (для ответов вне снимков каталога)"""
+    return quote_etag(CatalogCache.compute_version(data))
+
+
+def conditional_response(request, etag: str, last_modified: Optional[float] = None):
+    """
+    Ответ 304 Not Modified, если у клиента актуальная версия
+
+    Проверка выполняется до сериализации, поэтому повторные запросы
+    с If-None-Match / If-Modified-Since не запускают сериализаторы.
+
+    Returns:
+        HttpResponseNotModified или None, если нужно отдать полный ответ
+    """
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified) if last_modified is not None else None,
+    )
+    if response is not None:
+        set_cache_headers(response, etag, last_modified)
+    return response
+
+
+def set_cache_headers(response, etag: str, last_modified: Optional[float] = None):
+    """Проставить ETag, Last-Modified и Cache-Control каталога"""
+    # Сжатое представление не побайтово равно исходному, поэтому ETag слабый
+    if response.has_header('Content-Encoding') and not etag.startswith('W/'):
+        etag = f'W/{etag}'
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+        set_staleness_header(response, last_modified)
+
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, 'POSIFLORA_HTTP_MAX_AGE', 60),
+        stale_while_revalidate=getattr(settings, 'POSIFLORA_HTTP_STALE_WHILE_REVALIDATE', 600),
+    )
+    return response
+
+
+def set_staleness_header(response, built_at: float):
+    """
+    X-Catalog-Stale: возраст данных в секундах, если снимок старше POSIFLORA_CATALOG_TTL
+
+    Так отмечаются ответы из устаревшего снимка, пока Posiflora недоступна
+    или снимок обновляется в фоне.
+    """
+    age = int(time.time() - built_at)
+    if age >= getattr(settings, 'POSIFLORA_CATALOG_TTL', 300):
+        response['X-Catalog-Stale'] = str(age)
+    return response
+
+
+def negotiate_encoding(request, available: Dict[str, bytes]) -> str:
+    """Выбрать кодировку ответа по Accept-Encoding (br, затем gzip, иначе identity)"""
+    accepted = {}
+    for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = part.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+
+    for encoding in (ENCODING_BROTLI, ENCODING_GZIP):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return ENCODING_IDENTITY
+
+
+def rendered_response(request, snapshot: Dict) -> Optional[HttpResponse]:
+    """
+    Ответ из готовых байтов снимка без сериализации
+
+    Returns:
+        HttpResponse или None, если снимок построен без renderer'а
+    """
+    rendered = snapshot.get('rendered')
+    if not rendered:
+        return None
+
+    encoding = negotiate_encoding(request, rendered)
+    response = HttpResponse(rendered[encoding], content_type='application/json')
+    if encoding != ENCODING_IDENTITY:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,128 @@
+import logging
+import time
+from django.core.management.base import BaseCommand
+from apps.posiflora.services.products import PosifloraProductService
+
+
+def build_payload(specs_count: int, images_per_spec: int = 3) -> dict:
+    """Синтетический ответ /specifications в формате JSON:API"""
+    data = []
+    included = []
+    categories = [
+        {"type": "categories", "id": f"cat-{i}", "attributes": {"title": f"Категория {i}"}}
+        for i in range(6)
+    ]
+    included.extend(categories)
+
+    for n in range(specs_count):
+        spec_id = f"spec-{n}"
+        images = [{"type": "images", "id": f"{spec_id}-img-{i}"} for i in range(images_per_spec)]
+        spec_variants = []
+
+        for size in ("S", "M", "L"):
+            sv_id = f"{spec_id}-sv-{size}"
+            price_id = f"{sv_id}-price"
+            variant_id = f"variant-{size}"
+            spec_variants.append({"type": "specVariants", "id": sv_id})
+            included.append({
+                "type": "specVariants",
+                "id": sv_id,
+                "relationships": {
+                    "variant": {"data": {"type": "variants", "id": variant_id}},
+                    "specVariantPrices": {"data": [{"type": "specVariantPrices", "id": price_id}]},
+                },
+            })
+            included.append({
+                "type": "specVariantPrices",
+                "id": price_id,
+                "attributes": {"status": "on", "priceValue": 1000 + n + len(spec_variants) * 500},
+            })
+
+        for image in images:
+            included.append({
+                "type": "images",
+                "id": image["id"],
+                "attributes": {"file": f"https://cdn.example.com/{image['id']}.jpg"},
+            })
+
+        data.append({
+            "type": "specifications",
+            "id": spec_id,
+            "attributes": {"title": f"Букет {n}", "description": "", "minPrice": 1000},
+            "relationships": {
+                "category": {"data": {"type": "categories", "id": f"cat-{n % len(categories)}"}},
+                "logo": {"data": images[-1]},
+                "images": {"data": images},
+                "specVariants": {"data": spec_variants},
+            },
+        })
+
+    included.extend(
+        {"type": "variants", "id": f"variant-{size}", "attributes": {"title": size}}
+        for size in ("S", "M", "L")
+    )
+
+    return {
+        "data": data,
+        "included": included,
+        "meta": {"total": specs_count},
+    }
+
+
+class Command(BaseCommand):
+    # Только разбор в памяти: ни БД, ни кэш, ни индекс товаров не изменяются
+    help = 'Замер времени разбора ответа /specifications на синтетическом payload'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--specs',
+            type=int,
+            default=100,
+            help='Количество спецификаций в payload (по умолчанию 100)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Количество повторов замера (по умолчанию 20)',
+        )
+
+    def handle(self, *args, **options):
+        specs_count = options['specs']
+        repeat = max(1, options['repeat'])
+
+        payload = build_payload(specs_count)
+        categories_payload = {
+            "data": [item for item in payload["included"] if item["type"] == "categories"]
+        }
+        service = PosifloraProductService()
+
+        # Логи разбора отключаются, чтобы замерялся только сам парсинг
+        products_logger = logging.getLogger('apps.posiflora.services.products')
+        previous_level = products_logger.level
+        products_logger.setLevel(logging.WARNING)
+
+        try:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                service._build_specifications(categories_payload, [payload], update_index=False)
+                timings.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            for spec in payload["data"]:
+                service._parse_product_response({"data": spec, "included": payload["included"]})
+            single_elapsed = time.perf_counter() - started
+        finally:
+            products_logger.setLevel(previous_level)
+
+        best = min(timings)
+        self.stdout.write(f'Спецификаций: {specs_count}, included: {len(payload["included"])}')
+        self.stdout.write(
+            f'Каталог: лучшее {best * 1000:.2f} мс, '
+            f'среднее {sum(timings) / len(timings) * 1000:.2f} мс, '
+            f'{best / specs_count * 1_000_000:.1f} мкс на товар'
+        )
+        self.stdout.write(
+            f'Карточка товара: {single_elapsed / specs_count * 1_000_000:.1f} мкс на товар'
+        )
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from apps.posiflora.models import PosifloraSession
+from apps.posiflora.services.token_refresher import get_refresh_metrics
 
 
 class Command(BaseCommand):
@@ -45,5 +46,16 @@ class Command(BaseCommand):
                     f'\n✓ Токен действителен. Осталось: {hours_left} часов'
                 ))
 
+            metrics = get_refresh_metrics()
+            self.stdout.write('\nФоновое обновление токена:')
+            self.stdout.write(f'  Последняя проверка: {metrics["last_checked_at"]}')
+            self.stdout.write(f'  Успешных обновлений: {metrics["success_count"]}')
+            self.stdout.write(f'  Ошибок: {metrics["failure_count"]}')
+            self.stdout.write(f'  Длительность последнего обновления: {metrics["last_latency_ms"]} мс')
+            if metrics['last_error']:
+                self.stdout.write(self.style.WARNING(
+                    f'  Последняя ошибка ({metrics["last_failure_at"]}): {metrics["last_error"]}'
+                ))
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f'Ошибка: {e}'))
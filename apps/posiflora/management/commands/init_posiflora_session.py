@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from django.utils import timezone
 from apps.posiflora.models import PosifloraSession
+from apps.posiflora.services.client import get_client
 
 
 class Command(BaseCommand):
@@ -51,7 +52,7 @@ class Command(BaseCommand):
 
         try:
             # Делаем запрос на получение токенов
-            response = requests.post(
+            response = get_client().post(
                 sessions_url,
                 headers={
                     'Content-Type': 'application/vnd.api+json',
@@ -1,6 +1,6 @@
 from django.core.management.base import BaseCommand, CommandError
 from apps.posiflora.models import PosifloraSession
-from apps.posiflora.services.tokens import refresh_session
+from apps.posiflora.services.tokens import get_session
 
 
 class Command(BaseCommand):
@@ -19,8 +19,8 @@ class Command(BaseCommand):
             self.stdout.write('Обновление токена...')
             self.stdout.write(f'Текущий токен истекает: {session.expires_at}')
 
-            # Обновляем сессию
-            updated_session = refresh_session(session)
+            # Обновляем сессию под межпроцессной блокировкой
+            updated_session = get_session(force_refresh=True)
 
             self.stdout.write(self.style.SUCCESS('\n✓ Токен успешно обновлен!'))
             self.stdout.write(f'  Новый токен истекает: {updated_session.expires_at}')
@@ -0,0 +1,57 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.posiflora.services.token_refresher import get_refresh_metrics, refresh_if_needed
+
+
+class Command(BaseCommand):
+    help = 'Проактивное обновление токена Posiflora (разово или в цикле)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, проверяя сессию через --interval секунд',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'POSIFLORA_TOKEN_REFRESH_INTERVAL', 300),
+            help='Интервал проверки в секундах (по умолчанию settings.POSIFLORA_TOKEN_REFRESH_INTERVAL или 300)',
+        )
+        parser.add_argument(
+            '--margin',
+            type=int,
+            default=None,
+            help='Обновлять, если до истечения осталось меньше N минут '
+                 '(по умолчанию settings.POSIFLORA_TOKEN_REFRESH_MARGIN_MINUTES или 60)',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            failures_before = get_refresh_metrics()['failure_count']
+            refreshed = refresh_if_needed(margin_minutes=options['margin'])
+            metrics = get_refresh_metrics()
+
+            if refreshed:
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ Токен обновлен за {metrics["last_latency_ms"]} мс'
+                ))
+            elif metrics['failure_count'] > failures_before:
+                self.stdout.write(self.style.ERROR(
+                    f'✗ Не удалось обновить токен: {metrics["last_error"]}'
+                ))
+            else:
+                self.stdout.write('Обновление не требуется')
+
+            self.stdout.write(
+                f'  Успешных обновлений: {metrics["success_count"]}, '
+                f'ошибок: {metrics["failure_count"]}'
+            )
+
+            if not options['loop']:
+                return
+
+            time.sleep(options['interval'])
@@ -0,0 +1,110 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from apps.common.cache_lock import CacheLockTimeout
+from apps.posiflora.models import CatalogSync
+from apps.posiflora.services.catalog_sync import (
+    get_parked_changes,
+    process_pending_changes,
+    sync_catalog,
+    sync_changed_specifications,
+)
+
+
+class Command(BaseCommand):
+    help = 'Синхронизация каталога Posiflora в локальные таблицы (разово или в цикле)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, повторяя синхронизацию через --interval секунд',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=getattr(settings, 'POSIFLORA_SYNC_INTERVAL', 300),
+            help='Интервал между синхронизациями в секундах (по умолчанию settings.POSIFLORA_SYNC_INTERVAL или 300)',
+        )
+        parser.add_argument(
+            '--max-removal-ratio',
+            type=float,
+            default=0.5,
+            help='Максимальная доля товаров, которую можно снять с витрины за одну синхронизацию (по умолчанию 0.5)',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Загружать только спецификации, измененные после последней синхронизации, '
+                 'и обрабатывать очередь уведомлений Posiflora',
+        )
+        parser.add_argument(
+            '--full-every',
+            type=int,
+            default=12,
+            help='В режиме --incremental --loop выполнять полную синхронизацию каждые N циклов '
+                 '(по умолчанию 12; снимает с витрины удаленные товары)',
+        )
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            try:
+                if options['incremental']:
+                    syncs = self._run_incremental()
+                else:
+                    syncs = [self._run_once(options['max_removal_ratio'])]
+            except CacheLockTimeout:
+                raise CommandError('Другая синхронизация каталога не завершилась, попробуйте позже')
+
+            failed = [sync for sync in syncs if sync.status != CatalogSync.STATUS_SUCCESS]
+            if failed:
+                raise CommandError(f'Синхронизация не удалась: {failed[0].error}')
+            return
+
+        self.stdout.write(f'Запуск синхронизации каталога каждые {options["interval"]} секунд')
+        cycle = 0
+        while True:
+            close_old_connections()
+            try:
+                if options['incremental'] and cycle % max(1, options['full_every']):
+                    self._run_incremental()
+                else:
+                    self._run_once(options['max_removal_ratio'])
+            except CacheLockTimeout:
+                # Все режимы синхронизации выполняются по очереди (sync_lock)
+                self.stdout.write(self.style.WARNING('Другая синхронизация каталога еще идет, цикл пропущен'))
+            cycle += 1
+            time.sleep(options['interval'])
+
+    def _run_incremental(self) -> list:
+        self.stdout.write('Инкрементальная синхронизация каталога Posiflora...')
+        syncs = process_pending_changes()
+        syncs.append(sync_changed_specifications())
+        for sync in syncs:
+            self._report(sync)
+        parked = get_parked_changes()
+        if parked:
+            self.stdout.write(self.style.WARNING(
+                f'Отложено после неудачных попыток: {len(parked)} спецификаций'
+            ))
+        return syncs
+
+    def _run_once(self, max_removal_ratio: float) -> CatalogSync:
+        self.stdout.write('Синхронизация каталога Posiflora...')
+        sync = sync_catalog(max_removal_ratio=max_removal_ratio)
+        self._report(sync)
+        return sync
+
+    def _report(self, sync: CatalogSync) -> None:
+        if sync.status == CatalogSync.STATUS_SUCCESS:
+            self.stdout.write(self.style.SUCCESS(f'✓ Синхронизация #{sync.id} завершена'))
+            for kind, stats in sync.stats.items():
+                self.stdout.write(
+                    f'  {kind}: добавлено {stats["added"]}, '
+                    f'обновлено {stats["updated"]}, снято {stats["removed"]}'
+                )
+        else:
+            self.stdout.write(self.style.ERROR(
+                f'✗ Синхронизация #{sync.id} не удалась, каталог не изменен: {sync.error}'
+            ))
@@ -0,0 +1,102 @@
+# Generated by Django 6.0.2 on 2026-10-16 10:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posiflora', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogCategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posiflora_id', models.CharField(blank=True, default='', max_length=64)),
+                ('title', models.CharField(max_length=255, unique=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Категория каталога',
+                'verbose_name_plural': 'Категории каталога',
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posiflora_id', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('specification', 'Спецификация'), ('bouquet', 'Букет')], max_length=16)),
+                ('title', models.CharField(max_length=500)),
+                ('description', models.TextField(blank=True, default='')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='posiflora.catalogcategory')),
+            ],
+            options={
+                'verbose_name': 'Товар каталога',
+                'verbose_name_plural': 'Товары каталога',
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=1000)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='posiflora.catalogproduct')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogSync',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('success', 'Успешно'), ('failed', 'Ошибка')], default='running', max_length=16)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('diff', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'verbose_name': 'Синхронизация каталога',
+                'verbose_name_plural': 'Синхронизации каталога',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['status', '-started_at'], name='posiflora_c_status_8354fe_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CatalogVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.CharField(max_length=16)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='posiflora.catalogproduct')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='catalogproduct',
+            index=models.Index(fields=['kind', 'is_active'], name='posiflora_c_kind_c7f4c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogproduct',
+            index=models.Index(fields=['category', 'is_active'], name='posiflora_c_categor_7fc2f3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='catalogproduct',
+            unique_together={('posiflora_id', 'kind')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='catalogvariant',
+            unique_together={('product', 'size')},
+        ),
+    ]
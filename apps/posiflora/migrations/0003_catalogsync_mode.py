@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posiflora', '0002_catalogcategory_catalogproduct_catalogimage_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogsync',
+            name='mode',
+            field=models.CharField(choices=[('full', 'Полная'), ('incremental', 'Инкрементальная')], default='full', max_length=16),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-16 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posiflora', '0003_catalogsync_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogimage',
+            name='medium_url',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='catalogimage',
+            name='thumb_url',
+            field=models.URLField(blank=True, default='', max_length=1000),
+        ),
+    ]
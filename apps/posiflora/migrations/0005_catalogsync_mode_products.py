@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-16 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posiflora', '0004_catalogimage_sizes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='catalogsync',
+            name='mode',
+            field=models.CharField(choices=[('full', 'Полная'), ('incremental', 'Инкрементальная'), ('products', 'По уведомлению')], default='full', max_length=16),
+        ),
+    ]
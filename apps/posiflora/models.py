@@ -24,3 +24,135 @@ class PosifloraSession(models.Model):
         """Время до истечения в минутах"""
         delta = self.time_until_expiry()
         return int(delta.total_seconds() / 60)
+
+
+class CatalogCategory(models.Model):
+    """Категория каталога, синхронизированная из Posiflora"""
+
+    posiflora_id = models.CharField(max_length=64, blank=True, default='')
+    title = models.CharField(max_length=255, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Категория каталога"
+        verbose_name_plural = "Категории каталога"
+
+    def __str__(self):
+        return self.title
+
+
+class CatalogProduct(models.Model):
+    """Товар каталога (спецификация или букет), синхронизированный из Posiflora"""
+
+    KIND_SPECIFICATION = 'specification'
+    KIND_BOUQUET = 'bouquet'
+
+    KIND_CHOICES = [
+        (KIND_SPECIFICATION, 'Спецификация'),
+        (KIND_BOUQUET, 'Букет'),
+    ]
+
+    posiflora_id = models.CharField(max_length=64)
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    category = models.ForeignKey(
+        CatalogCategory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='products'
+    )
+    title = models.CharField(max_length=500)
+    description = models.TextField(blank=True, default='')
+    price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    content_hash = models.CharField(max_length=64)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Товар каталога"
+        verbose_name_plural = "Товары каталога"
+        unique_together = ('posiflora_id', 'kind')
+        indexes = [
+            models.Index(fields=['kind', 'is_active']),
+            models.Index(fields=['category', 'is_active']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.kind})"
+
+
+class CatalogVariant(models.Model):
+    """Вариант размера товара каталога"""
+
+    product = models.ForeignKey(
+        CatalogProduct,
+        on_delete=models.CASCADE,
+        related_name='variants'
+    )
+    size = models.CharField(max_length=16)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ('product', 'size')
+
+
+class CatalogImage(models.Model):
+    """Изображение товара каталога"""
+
+    product = models.ForeignKey(
+        CatalogProduct,
+        on_delete=models.CASCADE,
+        related_name='images'
+    )
+    url = models.URLField(max_length=1000)
+    medium_url = models.URLField(max_length=1000, blank=True, default='')
+    thumb_url = models.URLField(max_length=1000, blank=True, default='')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['position']
+
+
+class CatalogSync(models.Model):
+    """Журнал синхронизаций каталога с Posiflora"""
+
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCESS = 'success'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_SUCCESS, 'Успешно'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    MODE_FULL = 'full'
+    MODE_INCREMENTAL = 'incremental'
+    MODE_PRODUCTS = 'products'
+
+    MODE_CHOICES = [
+        (MODE_FULL, 'Полная'),
+        (MODE_INCREMENTAL, 'Инкрементальная'),
+        (MODE_PRODUCTS, 'По уведомлению'),
+    ]
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    mode = models.CharField(max_length=16, choices=MODE_CHOICES, default=MODE_FULL)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    stats = models.JSONField(default=dict, blank=True)
+    diff = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        verbose_name = "Синхронизация каталога"
+        verbose_name_plural = "Синхронизации каталога"
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['status', '-started_at']),
+        ]
+
+    def __str__(self):
+        return f"Sync #{self.id} ({self.mode}, {self.status})"
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .services.catalog_query import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, SORT_CHOICES, SORT_DEFAULT
 
 
 class ProductSerializer(serializers.Serializer):
@@ -18,6 +19,14 @@ class ProductSerializer(serializers.Serializer):
     price_max = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True, required=False)
 
 
+class ImageSerializer(serializers.Serializer):
+    """Serializer для изображения во всех размерах"""
+
+    thumb = serializers.URLField(max_length=1000)
+    medium = serializers.URLField(max_length=1000)
+    full = serializers.URLField(max_length=1000)
+
+
 class BouquetSerializer(serializers.Serializer):
     """Serializer для букетов"""
 
@@ -28,6 +37,7 @@ class BouquetSerializer(serializers.Serializer):
         child=serializers.URLField(max_length=1000),
         allow_empty=True
     )
+    images = ImageSerializer(many=True, required=False)
     price = serializers.IntegerField()
 
 
@@ -48,6 +58,7 @@ class CategoryProductSerializer(serializers.Serializer):
         child=serializers.URLField(max_length=1000),
         allow_empty=True
     )
+    images = ImageSerializer(many=True, required=False)
     variants = ProductVariantSerializer(many=True, required=False)
     price = serializers.IntegerField(required=False, allow_null=True)
 
@@ -64,3 +75,67 @@ class CategorizedProductsSerializer(serializers.Serializer):
     """Serializer для всех продуктов, сгруппированных по категориям"""
 
     categories = CategorySerializer(many=True)
+
+
+class CatalogQuerySerializer(serializers.Serializer):
+    """Параметры фильтрации, сортировки и пагинации каталога"""
+
+    category = serializers.CharField(required=False, help_text='ID категории')
+    price_min = serializers.IntegerField(required=False, min_value=0)
+    price_max = serializers.IntegerField(required=False, min_value=0)
+    size = serializers.ChoiceField(choices=['S', 'M', 'L'], required=False)
+    sort = serializers.ChoiceField(choices=SORT_CHOICES, default=SORT_DEFAULT)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, default=DEFAULT_PAGE_SIZE)
+
+    def validate(self, attrs):
+        price_min = attrs.get('price_min')
+        price_max = attrs.get('price_max')
+        if price_min is not None and price_max is not None and price_min > price_max:
+            raise serializers.ValidationError({'price_min': 'price_min не может быть больше price_max'})
+        return attrs
+
+
+class PaginatedProductsSerializer(serializers.Serializer):
+    """Serializer для страницы отфильтрованных продуктов"""
+
+    count = serializers.IntegerField()
+    page = serializers.IntegerField()
+    page_size = serializers.IntegerField()
+    num_pages = serializers.IntegerField()
+    products = CategoryProductSerializer(many=True)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Параметры поиска по каталогу"""
+
+    q = serializers.CharField(max_length=200)
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_PAGE_SIZE, default=DEFAULT_PAGE_SIZE)
+
+
+class SearchResultsSerializer(serializers.Serializer):
+    """Serializer для результатов поиска"""
+
+    query = serializers.CharField()
+    count = serializers.IntegerField()
+    products = CategoryProductSerializer(many=True)
+
+
+MAX_BATCH_SIZE = 100
+
+
+class ProductBatchRequestSerializer(serializers.Serializer):
+    """Список ID для пакетного получения товаров"""
+
+    ids = serializers.ListField(
+        child=serializers.CharField(max_length=100),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+    )
+
+
+class ProductBatchSerializer(serializers.Serializer):
+    """Serializer для результата пакетного получения товаров"""
+
+    products = CategoryProductSerializer(many=True)
+    missing = serializers.ListField(child=serializers.CharField())
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import weakref
+from typing import Optional
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from .circuit_breaker import get_breaker
+from .client import breaker_name, endpoint_read_timeout, is_upstream_failure
+from .tokens import get_access_token, token_holder
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPosifloraClient:
+    """
+    Асинхронный HTTP-клиент Posiflora на httpx с пулом keep-alive соединений
+
+    Используется async-представлениями каталога: один воркер uvicorn может
+    ждать множество медленных ответов Posiflora одновременно.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+    ):
+        pool_size = pool_size or getattr(settings, 'POSIFLORA_POOL_SIZE', 10)
+        self.connect_timeout = connect_timeout or getattr(settings, 'POSIFLORA_CONNECT_TIMEOUT', 3.05)
+        self.read_timeout = read_timeout or getattr(settings, 'POSIFLORA_READ_TIMEOUT', 30)
+        timeout = httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+            ),
+            timeout=timeout,
+            headers={'Accept-Encoding': 'gzip, deflate'},
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Асинхронный PosifloraClient.request: бюджет эндпоинта и circuit breaker"""
+        kwargs.setdefault('timeout', httpx.Timeout(
+            endpoint_read_timeout(url, self.read_timeout),
+            connect=self.connect_timeout,
+        ))
+
+        breaker = get_breaker(breaker_name(url))
+        probe = await breaker.abefore_request()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            await breaker.arecord_failure(probe)
+            raise
+
+        if is_upstream_failure(response.status_code):
+            await breaker.arecord_failure(probe)
+        else:
+            await breaker.arecord_success(probe)
+        return response
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+# httpx.AsyncClient привязан к event loop, поэтому клиент создается на каждый loop
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncPosifloraClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> AsyncPosifloraClient:
+    """Получить асинхронный клиент Posiflora для текущего event loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncPosifloraClient()
+        _clients[loop] = client
+    return client
+
+
+async def aget_access_token(force_refresh: bool = False, stale_token: Optional[str] = None) -> str:
+    """Асинхронный get_access_token: токен из памяти без потока, иначе сессия из БД"""
+    if not force_refresh:
+        access_token = token_holder.get()
+        if access_token:
+            return access_token
+
+    return await sync_to_async(get_access_token)(
+        force_refresh=force_refresh,
+        stale_token=stale_token,
+    )
+
+
+async def amake_request_with_retry(
+    method: str,
+    url: str,
+    headers: dict = None,
+    **kwargs
+) -> httpx.Response:
+    """
+    Асинхронный make_request_with_retry: refresh токена при 401 и повтор запроса
+
+    Raises:
+        httpx.HTTPStatusError: Если API вернул ошибку после retry
+    """
+    access_token = await aget_access_token()
+
+    if headers is None:
+        headers = {}
+    headers['Authorization'] = f'Bearer {access_token}'
+
+    client = get_async_client()
+    response = await client.request(method, url, headers=headers, **kwargs)
+
+    if response.status_code == 401:
+        logger.info('Токен истек во время запроса, обновляем сессию...')
+
+        token_holder.clear()
+        access_token = await aget_access_token(force_refresh=True, stale_token=access_token)
+        headers['Authorization'] = f'Bearer {access_token}'
+
+        response = await client.request(method, url, headers=headers, **kwargs)
+
+    response.raise_for_status()
+    return response
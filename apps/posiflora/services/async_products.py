@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import math
+from typing import Dict, List, Optional
+import httpx
+from django.conf import settings
+from .async_client import aget_access_token, amake_request_with_retry
+from .diagnostics import capture_payload
+from .product_index import product_index
+from .single_flight import async_single_flight
+from .products import (
+    BOUQUETS_PARAMS,
+    BOUQUETS_URL,
+    SPECIFICATIONS_INCLUDE,
+    SPECIFICATIONS_PARAMS,
+    PosifloraProductService,
+    ProductNotFound,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPosifloraProductService:
+    """
+    Асинхронный сервис товаров Posiflora
+
+    Сетевые запросы выполняются через httpx, а разбор ответов полностью
+    переиспользует PosifloraProductService, поэтому формат данных совпадает
+    с синхронными представлениями.
+    """
+
+    def __init__(self):
+        self.parser = PosifloraProductService()
+
+    async def _get_json(self, url: str, params: Optional[Dict] = None) -> Dict:
+        response = await amake_request_with_retry(
+            'GET',
+            url,
+            headers=self.parser._get_headers(),
+            params=params
+        )
+        return response.json()
+
+    async def fetch_bouquets(self) -> List[Dict]:
+        """Асинхронный аналог PosifloraProductService.fetch_bouquets"""
+        payload = await self._get_json(BOUQUETS_URL, BOUQUETS_PARAMS)
+        capture_payload("bouquets", payload)
+        return self.parser._build_bouquets(payload)
+
+    async def fetch_specifications(self) -> Dict:
+        """
+        Асинхронный аналог PosifloraProductService.fetch_specifications
+
+        /categories и первая страница запрашиваются одновременно, остальные
+        страницы - параллельно с ограничением POSIFLORA_FETCH_CONCURRENCY.
+        """
+        categories_url = self.parser._build_url("/categories")
+        url = self.parser._build_url("/specifications")
+        page_size = SPECIFICATIONS_PARAMS["page[size]"]
+
+        await aget_access_token()
+
+        semaphore = asyncio.Semaphore(max(1, getattr(settings, 'POSIFLORA_FETCH_CONCURRENCY', 4)))
+
+        async def fetch_page(page_number: int) -> Dict:
+            async with semaphore:
+                return await self._get_json(url, {**SPECIFICATIONS_PARAMS, "page[number]": page_number})
+
+        categories_payload, first_page = await asyncio.gather(
+            self._get_json(categories_url),
+            fetch_page(1),
+        )
+        page_payloads = [first_page]
+
+        meta = first_page.get("meta", {})
+        total = meta.get("total") or meta.get("count")
+
+        if total is not None:
+            pages_count = max(1, math.ceil(int(total) / page_size))
+            # gather сохраняет порядок страниц независимо от порядка завершения
+            page_payloads.extend(await asyncio.gather(
+                *(fetch_page(page_number) for page_number in range(2, pages_count + 1))
+            ))
+        else:
+            page_number = 1
+            while len(page_payloads[-1].get("data", [])) >= page_size:
+                page_number += 1
+                page_payloads.append(await fetch_page(page_number))
+
+        capture_payload("specifications", {"categories": categories_payload, "pages": page_payloads})
+        return self.parser._build_specifications(categories_payload, page_payloads)
+
+    async def get_specification_by_id(self, product_id: str) -> Dict:
+        """Асинхронный аналог PosifloraProductService.get_specification_by_id"""
+        if product_index.is_missing(product_id):
+            raise ProductNotFound(product_id)
+
+        return await async_single_flight.do(
+            f"specification:{product_id}",
+            lambda: self._load_specification_by_id(product_id),
+            wait=self.parser._specification_read_timeout(product_id),
+        )
+
+    async def fetch_specification_payload(self, product_id: str) -> Optional[Dict]:
+        """Асинхронный аналог PosifloraProductService.fetch_specification_payload"""
+        url = self.parser._build_url(f"/specifications/{product_id}")
+        try:
+            payload = await self._get_json(url, {"include": SPECIFICATIONS_INCLUDE})
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            raise
+
+        capture_payload("specification", payload, key=product_id)
+        return payload if payload.get("data") else None
+
+    async def _load_specification_by_id(self, product_id: str) -> Dict:
+        payload = await self.fetch_specification_payload(product_id)
+        if payload is None:
+            return await self._find_bouquet_by_id(product_id)
+        return self.parser._parse_product_response(payload)
+
+    async def _find_bouquet_by_id(self, product_id: str) -> Dict:
+        product = product_index.get(product_id, product_index.SOURCE_BOUQUETS)
+
+        if product is None and not product_index.is_fresh(product_index.SOURCE_BOUQUETS):
+            await self.fetch_bouquets()
+            product = product_index.get(product_id, product_index.SOURCE_BOUQUETS)
+
+        if product is None:
+            product_index.mark_missing(product_id)
+            raise ProductNotFound(product_id)
+
+        return product
+
+
+def get_async_product_service() -> AsyncPosifloraProductService:
+    """Получить экземпляр асинхронного сервиса продуктов"""
+    return AsyncPosifloraProductService()
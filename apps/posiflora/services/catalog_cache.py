@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from apps.common.cache_lock import acache_lock, cache_lock
+from .circuit_breaker import CircuitOpenError
+from .rendering import encode_body, render_bouquets, render_specifications
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogBuildTimeout(RuntimeError):
+    """Снимка нет, а его построение другим воркером не завершилось за отведенное время"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f'Catalog snapshot "{name}" is being built, retry after {retry_after}s')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CatalogCache:
+    """
+    Общий для всех воркеров кэш снимка каталога Posiflora
+
+    Снимок хранится в Django cache в виде:
+        {
+            "version": "хэш содержимого",
+            "built_at": 1700000000.0,
+            "data": {...},
+            "rendered": {"identity": b"...", "gzip": b"...", "br": b"..."}
+        }
+
+    Если задан renderer, снимок хранит и готовые JSON-байты ответа (в том
+    числе сжатые), чтобы представления не сериализовали неизменные данные.
+
+    Пока снимок свежий (fresh_ttl), он отдается как есть. Устаревший снимок
+    продолжает отдаваться (stale-while-revalidate), а обновление запускается
+    в фоне только одним воркером, захватившим блокировку.
+    """
+
+    BUILD_WAIT_SECONDS = 15
+    BUILD_POLL_INTERVAL = 0.2
+    BUILD_POLL_MAX_INTERVAL = 2
+    BUILD_RETRY_AFTER = 5
+
+    def __init__(
+        self,
+        name: str,
+        builder: Callable[[], Any],
+        fresh_ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        async_builder: Optional[Callable[[], Awaitable[Any]]] = None,
+        renderer: Optional[Callable[[Any], bytes]] = None,
+    ):
+        self.name = name
+        self.builder = builder
+        self.async_builder = async_builder
+        self.renderer = renderer
+        self._fresh_ttl = fresh_ttl
+        self._stale_ttl = stale_ttl
+        self._local_refresh = threading.Lock()
+
+    @property
+    def fresh_ttl(self) -> int:
+        if self._fresh_ttl is not None:
+            return self._fresh_ttl
+        return getattr(settings, 'POSIFLORA_CATALOG_TTL', 300)
+
+    @property
+    def stale_ttl(self) -> int:
+        if self._stale_ttl is not None:
+            return self._stale_ttl
+        return getattr(settings, 'POSIFLORA_CATALOG_STALE_TTL', 86400)
+
+    @property
+    def cache_key(self) -> str:
+        return f'posiflora:catalog:{self.name}'
+
+    @property
+    def lock_key(self) -> str:
+        return f'posiflora:catalog:{self.name}:lock'
+
+    @staticmethod
+    def compute_version(data: Any) -> str:
+        """Версия снимка - хэш канонического JSON представления данных"""
+        raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+    def is_fresh(self, snapshot: Dict) -> bool:
+        return time.time() - snapshot['built_at'] < self.fresh_ttl
+
+    def get(self) -> Any:
+        """Получить данные каталога из снимка"""
+        return self.get_snapshot()['data']
+
+    def get_snapshot(self) -> Dict:
+        """
+        Получить снимок каталога
+
+        Returns:
+            Снимок с ключами version, built_at, data
+
+        Raises:
+            Исключение builder'а, если снимка нет и построить его не удалось
+            CatalogBuildTimeout: Снимок строит другой воркер и не успел за BUILD_WAIT_SECONDS
+        """
+        snapshot = cache.get(self.cache_key)
+
+        if snapshot is None:
+            return self._build_cold()
+
+        if not self.is_fresh(snapshot):
+            self._revalidate_in_background()
+
+        return snapshot
+
+    async def aget(self) -> Any:
+        """Асинхронно получить данные каталога из снимка"""
+        return (await self.aget_snapshot())['data']
+
+    async def aget_snapshot(self) -> Dict:
+        """
+        Асинхронный get_snapshot для ASGI-представлений
+
+        Холодное построение выполняется async_builder'ом (если он задан),
+        фоновое обновление устаревшего снимка - тем же потоком, что и в get_snapshot.
+        """
+        snapshot = await cache.aget(self.cache_key)
+
+        if snapshot is None:
+            return await self._abuild_cold()
+
+        if not self.is_fresh(snapshot):
+            self._revalidate_in_background()
+
+        return snapshot
+
+    async def arefresh(self) -> Dict:
+        if self.async_builder is None:
+            return await sync_to_async(self.refresh)()
+        data = await self.async_builder()
+        return await sync_to_async(self.store)(data)
+
+    def peek(self) -> Optional[Dict]:
+        """Снимок из кэша без построения и обновления"""
+        return cache.get(self.cache_key)
+
+    def refresh(self) -> Dict:
+        """Принудительно перестроить снимок (для фоновых задач)"""
+        return self.store(self.builder())
+
+    def store(self, data: Any) -> Dict:
+        """Сохранить готовые данные как новый снимок"""
+        snapshot = {
+            'version': self.compute_version(data),
+            'built_at': time.time(),
+            'data': data,
+        }
+        if self.renderer is not None:
+            snapshot['rendered'] = encode_body(self.renderer(data))
+        cache.set(self.cache_key, snapshot, self.fresh_ttl + self.stale_ttl)
+        logger.info(f'[CATALOG CACHE {self.name}] Stored snapshot version {snapshot["version"]}')
+        return snapshot
+
+    def invalidate(self) -> None:
+        cache.delete(self.cache_key)
+
+    def _build_cold(self) -> Dict:
+        """
+        Построить снимок при пустом кэше; остальные воркеры ждут результат
+
+        Ожидающие воркеры сами не строят снимок: они перепроверяют кэш с
+        растущим интервалом и пробуют захватить блокировку (если владелец
+        упал или построение не удалось). Если снимок так и не появился,
+        запрос завершается CatalogBuildTimeout, а не еще одной выгрузкой
+        каталога.
+        """
+        deadline = time.monotonic() + self.BUILD_WAIT_SECONDS
+        delay = self.BUILD_POLL_INTERVAL
+        while True:
+            with cache_lock(self.lock_key, timeout=self.BUILD_WAIT_SECONDS * 4) as acquired:
+                if acquired:
+                    # Снимок мог появиться, пока блокировку держал другой воркер
+                    snapshot = cache.get(self.cache_key)
+                    return snapshot if snapshot is not None else self.refresh()
+
+            if time.monotonic() >= deadline:
+                logger.warning(f'[CATALOG CACHE {self.name}] Timed out waiting for snapshot')
+                raise CatalogBuildTimeout(self.name, self.BUILD_RETRY_AFTER)
+
+            time.sleep(delay)
+            delay = min(delay * 2, self.BUILD_POLL_MAX_INTERVAL)
+            snapshot = cache.get(self.cache_key)
+            if snapshot is not None:
+                return snapshot
+
+    async def _abuild_cold(self) -> Dict:
+        deadline = time.monotonic() + self.BUILD_WAIT_SECONDS
+        delay = self.BUILD_POLL_INTERVAL
+        while True:
+            async with acache_lock(self.lock_key, timeout=self.BUILD_WAIT_SECONDS * 4) as acquired:
+                if acquired:
+                    snapshot = await cache.aget(self.cache_key)
+                    return snapshot if snapshot is not None else await self.arefresh()
+
+            if time.monotonic() >= deadline:
+                logger.warning(f'[CATALOG CACHE {self.name}] Timed out waiting for snapshot')
+                raise CatalogBuildTimeout(self.name, self.BUILD_RETRY_AFTER)
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.BUILD_POLL_MAX_INTERVAL)
+            snapshot = await cache.aget(self.cache_key)
+            if snapshot is not None:
+                return snapshot
+
+    def _revalidate_in_background(self) -> None:
+        # Не плодим фоновые потоки внутри одного процесса
+        if not self._local_refresh.acquire(blocking=False):
+            return
+
+        thread = threading.Thread(
+            target=self._revalidate,
+            name=f'catalog-cache-{self.name}',
+            daemon=True,
+        )
+        thread.start()
+
+    def _revalidate(self) -> None:
+        try:
+            with cache_lock(self.lock_key, timeout=self.BUILD_WAIT_SECONDS * 4) as acquired:
+                if not acquired:
+                    return
+
+                snapshot = cache.get(self.cache_key)
+                if snapshot is not None and self.is_fresh(snapshot):
+                    return
+
+                self.refresh()
+        except CircuitOpenError as e:
+            # Posiflora недоступна: продолжаем отдавать устаревший снимок
+            logger.info(f'[CATALOG CACHE {self.name}] Refresh skipped: {e}')
+        except Exception as e:
+            logger.error(f'[CATALOG CACHE {self.name}] Background refresh failed: {e}')
+        finally:
+            self._local_refresh.release()
+            connection.close()
+
+
+def _build_specifications() -> Dict:
+    from .catalog_store import has_synced_catalog, load_specifications
+    from .products import get_product_service
+
+    # Если фоновая синхронизация уже наполнила локальные таблицы - читаем из БД
+    if has_synced_catalog():
+        return load_specifications()
+    return get_product_service().fetch_specifications()
+
+
+async def _abuild_specifications() -> Dict:
+    from .async_products import get_async_product_service
+    from .catalog_store import has_synced_catalog, load_specifications
+
+    if await sync_to_async(has_synced_catalog)():
+        return await sync_to_async(load_specifications)()
+    return await get_async_product_service().fetch_specifications()
+
+
+specifications_cache = CatalogCache(
+    'specifications',
+    _build_specifications,
+    async_builder=_abuild_specifications,
+    renderer=render_specifications,
+)
+
+
+def _build_bouquets() -> List[Dict]:
+    from .catalog_store import has_synced_catalog, load_bouquets
+    from .products import get_product_service
+
+    if has_synced_catalog():
+        return load_bouquets()
+    return get_product_service().fetch_bouquets()
+
+
+async def _abuild_bouquets() -> List[Dict]:
+    from .async_products import get_async_product_service
+    from .catalog_store import has_synced_catalog, load_bouquets
+
+    if await sync_to_async(has_synced_catalog)():
+        return await sync_to_async(load_bouquets)()
+    return await get_async_product_service().fetch_bouquets()
+
+
+bouquets_cache = CatalogCache(
+    'bouquets',
+    _build_bouquets,
+    async_builder=_abuild_bouquets,
+    renderer=render_bouquets,
+)
+
+
+def find_in_snapshots(product_id: str) -> Optional[Tuple[Dict, float]]:
+    """
+    Найти товар в последних сохраненных снимках каталога
+
+    Используется, когда Posiflora недоступна: карточка отдается из
+    снимка, даже если он устарел.
+
+    Returns:
+        (данные продукта, built_at снимка) или None
+    """
+    from .products import PosifloraProductService
+
+    snapshot = specifications_cache.peek()
+    if snapshot is not None:
+        for category in snapshot['data'].get('categories', []):
+            for product in category.get('products', []):
+                if product.get('id') == product_id:
+                    return product, snapshot['built_at']
+
+    snapshot = bouquets_cache.peek()
+    if snapshot is not None:
+        for bouquet in snapshot['data']:
+            if bouquet.get('id') == product_id:
+                return PosifloraProductService._bouquet_to_product(bouquet), snapshot['built_at']
+
+    return None
@@ -0,0 +1,154 @@
+import math
+import threading
+from typing import Dict, List, Optional, Sequence
+
+SORT_DEFAULT = 'default'
+SORT_PRICE_ASC = 'price'
+SORT_PRICE_DESC = '-price'
+SORT_TITLE = 'title'
+
+SORT_CHOICES = (SORT_DEFAULT, SORT_PRICE_ASC, SORT_PRICE_DESC, SORT_TITLE)
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class _Entry:
+    __slots__ = ('position', 'product', 'category_id', 'prices', 'prices_by_size')
+
+    def __init__(self, position: int, product: Dict, category_id: str):
+        self.position = position
+        self.product = product
+        self.category_id = category_id
+
+        variants = product.get('variants') or []
+        if variants:
+            self.prices_by_size = {v['size']: v['price'] for v in variants}
+            self.prices = list(self.prices_by_size.values())
+        else:
+            self.prices_by_size = {}
+            price = product.get('price')
+            self.prices = [price] if price is not None else []
+
+    def matches_price(self, size: Optional[str], price_min, price_max) -> bool:
+        prices = [self.prices_by_size[size]] if size else self.prices
+        return any(
+            (price_min is None or price >= price_min) and (price_max is None or price <= price_max)
+            for price in prices
+        )
+
+
+class CatalogQueryIndex:
+    """
+    Индекс снимка каталога для фильтрации, сортировки и пагинации
+
+    Строится один раз на версию снимка: товары раскладываются в плоский
+    список с предвычисленными ценами и размерами, индексами по категории
+    и размеру и готовыми порядками сортировки. Запрос затем выполняется
+    пересечением индексов и срезом страницы, без обхода всего каталога
+    в сериализаторах.
+    """
+
+    def __init__(self, version: str, data: Dict):
+        self.version = version
+        self.entries: List[_Entry] = []
+        self.by_category: Dict[str, List[int]] = {}
+        self.by_size: Dict[str, List[int]] = {}
+
+        for category in data.get('categories', []):
+            category_id = category.get('id') or ''
+            for product in category.get('products', []):
+                entry = _Entry(len(self.entries), product, category_id)
+                self.entries.append(entry)
+                self.by_category.setdefault(category_id, []).append(entry.position)
+                for size in entry.prices_by_size:
+                    self.by_size.setdefault(size, []).append(entry.position)
+
+        positions = range(len(self.entries))
+        self.orderings: Dict[str, Sequence[int]] = {
+            SORT_DEFAULT: positions,
+            SORT_PRICE_ASC: sorted(positions, key=lambda i: min(self.entries[i].prices, default=0)),
+            SORT_PRICE_DESC: sorted(positions, key=lambda i: max(self.entries[i].prices, default=0), reverse=True),
+            SORT_TITLE: sorted(positions, key=lambda i: (self.entries[i].product.get('title') or '').lower()),
+        }
+        # Позиция товара в каждом порядке - для сортировки небольших выборок
+        self.ranks: Dict[str, List[int]] = {}
+        for sort, ordering in self.orderings.items():
+            rank = [0] * len(self.entries)
+            for place, position in enumerate(ordering):
+                rank[position] = place
+            self.ranks[sort] = rank
+
+    def query(
+        self,
+        category: Optional[str] = None,
+        size: Optional[str] = None,
+        price_min=None,
+        price_max=None,
+        sort: str = SORT_DEFAULT,
+        page: int = 1,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Dict:
+        """
+        Выполнить запрос к каталогу
+
+        Args:
+            category: ID категории
+            size: Размер (S/M/L), который должен быть у товара
+            price_min, price_max: Диапазон цены (для size - цена этого размера)
+            sort: Ключ сортировки из SORT_CHOICES
+            page, page_size: Номер и размер страницы
+
+        Returns:
+            {"count", "page", "page_size", "num_pages", "products"}
+        """
+        candidates = None
+        if category is not None:
+            candidates = set(self.by_category.get(category, ()))
+        if size is not None:
+            sized = set(self.by_size.get(size, ()))
+            candidates = sized if candidates is None else candidates & sized
+
+        filter_price = price_min is not None or price_max is not None
+
+        if candidates is None:
+            ordered = self.orderings[sort]
+        else:
+            ordered = sorted(candidates, key=self.ranks[sort].__getitem__)
+
+        if filter_price:
+            matched = [
+                position for position in ordered
+                if self.entries[position].matches_price(size, price_min, price_max)
+            ]
+        else:
+            matched = ordered
+
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        start = (page - 1) * page_size
+
+        return {
+            'count': len(matched),
+            'page': page,
+            'page_size': page_size,
+            'num_pages': math.ceil(len(matched) / page_size),
+            'products': [self.entries[i].product for i in matched[start:start + page_size]],
+        }
+
+
+_indexes: Dict[str, CatalogQueryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_query_index(name: str, snapshot: Dict) -> CatalogQueryIndex:
+    """Индекс для снимка; перестраивается только при смене версии снимка"""
+    index = _indexes.get(name)
+    if index is not None and index.version == snapshot['version']:
+        return index
+
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None or index.version != snapshot['version']:
+            index = CatalogQueryIndex(snapshot['version'], snapshot['data'])
+            _indexes[name] = index
+        return index
@@ -0,0 +1,161 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from ..models import CatalogProduct, CatalogSync
+from .images import image_entry
+from .jsonapi import SIZE_ORDER
+from .products import category_sort_key, get_product_price
+
+NO_CATEGORY = "Без категории"
+
+
+def _to_number(value: Optional[Decimal]):
+    """Decimal из БД -> int/float, как в ответах Posiflora"""
+    if value is None:
+        return None
+    if value == value.to_integral_value():
+        return int(value)
+    return float(value)
+
+
+def has_synced_catalog() -> bool:
+    """
+    Есть ли в БД хотя бы одна успешная полная синхронизация каталога
+
+    Частичные синхронизации не учитываются: до первой полной в таблицах
+    только товары из уведомлений, а не весь каталог.
+    """
+    return CatalogSync.objects.filter(
+        status=CatalogSync.STATUS_SUCCESS,
+        mode=CatalogSync.MODE_FULL,
+    ).exists()
+
+
+def _active_products(kind: str):
+    return (
+        CatalogProduct.objects
+        .filter(kind=kind, is_active=True)
+        .select_related('category')
+        .prefetch_related('variants', 'images')
+    )
+
+
+def _images(product: CatalogProduct) -> List[Dict]:
+    return [
+        image_entry(full=image.url, medium=image.medium_url, thumb=image.thumb_url)
+        for image in product.images.all()
+    ]
+
+
+def _product_to_dict(product: CatalogProduct) -> Dict:
+    images = _images(product)
+    product_dict = {
+        "id": product.posiflora_id,
+        "title": product.title,
+        "description": product.description,
+        "image_urls": [image["full"] for image in images],
+        "images": images,
+    }
+
+    variants = [
+        {"size": variant.size, "price": _to_number(variant.price)}
+        for variant in product.variants.all()
+    ]
+
+    if variants:
+        product_dict["variants"] = sorted(
+            variants,
+            key=lambda v: SIZE_ORDER.get(v["size"], 999)
+        )
+    elif product.price is not None:
+        product_dict["price"] = _to_number(product.price)
+
+    return product_dict
+
+
+def load_specifications() -> Dict:
+    """
+    Собрать каталог спецификаций из локальных таблиц
+
+    Returns:
+        Словарь в том же формате, что и PosifloraProductService.fetch_specifications
+    """
+    categories_dict = defaultdict(list)
+    category_ids = {}
+
+    for product in _active_products(CatalogProduct.KIND_SPECIFICATION):
+        if product.category:
+            category_name = product.category.title
+            category_ids[category_name] = product.category.posiflora_id
+        else:
+            category_name = NO_CATEGORY
+        categories_dict[category_name].append(_product_to_dict(product))
+
+    result_categories = [
+        {
+            "id": category_ids.get(category_name, ""),
+            "name": category_name,
+            "products": sorted(products, key=get_product_price, reverse=True)
+        }
+        for category_name, products in categories_dict.items()
+    ]
+
+    result_categories.sort(key=category_sort_key)
+
+    return {"categories": result_categories}
+
+
+def load_bouquets() -> List[Dict]:
+    """Список букетов из локальных таблиц в формате fetch_bouquets"""
+    result = []
+
+    for product in _active_products(CatalogProduct.KIND_BOUQUET):
+        images = _images(product)
+        result.append({
+            "id": product.posiflora_id,
+            "title": product.title,
+            "description": product.description,
+            "image_urls": [image["full"] for image in images],
+            "images": images,
+            "price": _to_number(product.price) or 0,
+        })
+
+    return sorted(result, key=lambda b: b.get("price") or 0, reverse=True)
+
+
+def load_products(product_ids: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Найти товары по ID в локальных таблицах одним запросом
+
+    Спецификации имеют приоритет над букетами, как и в get_specification_by_id.
+
+    Returns:
+        {ID: данные продукта в формате CategoryProductSerializer} для найденных ID
+    """
+    by_id = {}
+    for product in (
+        CatalogProduct.objects
+        .filter(posiflora_id__in=list(product_ids), is_active=True)
+        .prefetch_related('variants', 'images')
+    ):
+        current = by_id.get(product.posiflora_id)
+        if current is None or product.kind == CatalogProduct.KIND_SPECIFICATION:
+            by_id[product.posiflora_id] = product
+
+    result = {}
+    for product_id, product in by_id.items():
+        product_dict = _product_to_dict(product)
+        if product.kind == CatalogProduct.KIND_BOUQUET:
+            product_dict.setdefault("price", 0)
+        result[product_id] = product_dict
+    return result
+
+
+def load_product(product_id: str) -> Optional[Dict]:
+    """
+    Найти товар по ID в локальных таблицах
+
+    Returns:
+        Данные продукта в формате CategoryProductSerializer или None
+    """
+    return load_products([product_id]).get(product_id)
@@ -0,0 +1,598 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.common.cache_lock import cache_lock, wait_cache_lock
+from ..models import (
+    CatalogCategory,
+    CatalogImage,
+    CatalogProduct,
+    CatalogSync,
+    CatalogVariant,
+)
+from .catalog_cache import bouquets_cache, specifications_cache
+from .catalog_store import has_synced_catalog, load_bouquets, load_specifications
+from .product_index import product_index
+from .products import get_product_service
+
+logger = logging.getLogger(__name__)
+
+# Запас по времени при запросе изменений: часы Posiflora и наши могут расходиться
+INCREMENTAL_OVERLAP_SECONDS = 120
+
+PENDING_KEY = 'posiflora:catalog:pending'
+PENDING_LOCK_KEY = 'posiflora:catalog:pending:lock'
+PENDING_TTL = 24 * 60 * 60
+PENDING_ATTEMPTS_KEY = 'posiflora:catalog:pending:attempts'
+PENDING_MAX_ATTEMPTS = 3
+PARKED_KEY = 'posiflora:catalog:parked'
+SYNC_LOCK_KEY = 'posiflora:catalog:sync:lock'
+# Блокировка живет дольше самой долгой полной синхронизации
+SYNC_LOCK_TIMEOUT = 30 * 60
+SYNC_LOCK_WAIT = 10 * 60
+
+
+class CatalogSyncAborted(RuntimeError):
+    """Синхронизация прервана, локальный каталог оставлен без изменений"""
+
+
+def _content_hash(product: Dict, category_title: Optional[str]) -> str:
+    raw = json.dumps(
+        {"product": product, "category": category_title},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _flatten_specifications(specifications: Dict) -> List[Tuple[Dict, Dict]]:
+    """Развернуть {"categories": [...]} в список пар (категория, товар)"""
+    return [
+        (category, product)
+        for category in specifications.get("categories", [])
+        for product in category.get("products", [])
+    ]
+
+
+def _sync_categories(specifications: Dict) -> Dict[str, CatalogCategory]:
+    categories = {}
+    for category in specifications.get("categories", []):
+        obj, _ = CatalogCategory.objects.update_or_create(
+            title=category["name"],
+            defaults={"posiflora_id": category.get("id") or ""},
+        )
+        categories[obj.title] = obj
+    return categories
+
+
+def _write_children(product_obj: CatalogProduct, product: Dict) -> None:
+    product_obj.variants.all().delete()
+    product_obj.images.all().delete()
+
+    CatalogVariant.objects.bulk_create([
+        CatalogVariant(product=product_obj, size=variant["size"], price=variant["price"])
+        for variant in product.get("variants", [])
+    ])
+    images = product.get("images") or [{"full": url} for url in product.get("image_urls", [])]
+    CatalogImage.objects.bulk_create([
+        CatalogImage(
+            product=product_obj,
+            url=image["full"],
+            medium_url=image.get("medium") or "",
+            thumb_url=image.get("thumb") or "",
+            position=position,
+        )
+        for position, image in enumerate(images)
+    ])
+
+
+def _apply_products(
+    kind: str,
+    items: List[Tuple[Optional[CatalogCategory], Dict]],
+    max_removal_ratio: float = 0.5,
+    removed_ids: Optional[List[str]] = None,
+) -> Dict[str, List[str]]:
+    """
+    Применить полученные товары одного вида к локальным таблицам
+
+    Args:
+        items: Пары (категория, товар)
+        max_removal_ratio: Полная синхронизация - товары, которых нет в items,
+            снимаются с витрины, если их доля не превышает порог
+        removed_ids: Частичная синхронизация - items содержит только изменившиеся
+            товары, снимаются только перечисленные ID
+
+    Returns:
+        Диф вида {"added": [...], "updated": [...], "removed": [...]}
+    """
+    incoming_ids = {product["id"] for _, product in items}
+    partial = removed_ids is not None
+
+    queryset = CatalogProduct.objects.filter(kind=kind)
+    if partial:
+        queryset = queryset.filter(posiflora_id__in=incoming_ids | set(removed_ids))
+    existing = {product.posiflora_id: product for product in queryset}
+
+    if partial:
+        removed_ids = [
+            posiflora_id
+            for posiflora_id in removed_ids
+            if posiflora_id not in incoming_ids
+            and posiflora_id in existing and existing[posiflora_id].is_active
+        ]
+    else:
+        active_before = sum(1 for product in existing.values() if product.is_active)
+        removed_ids = [
+            posiflora_id
+            for posiflora_id, product in existing.items()
+            if product.is_active and posiflora_id not in incoming_ids
+        ]
+
+        # Защита от частичного сбоя Posiflora: не гасим витрину пустым/урезанным ответом
+        if active_before and len(removed_ids) > active_before * max_removal_ratio:
+            raise CatalogSyncAborted(
+                f'{kind}: {len(removed_ids)} of {active_before} products would be removed, '
+                f'limit is {max_removal_ratio:.0%}'
+            )
+
+    diff = {"added": [], "updated": [], "removed": removed_ids}
+
+    for category, product in items:
+        category_title = category.title if category else None
+        content_hash = _content_hash(product, category_title)
+        product_obj = existing.get(product["id"])
+
+        fields = {
+            "category": category,
+            "title": product.get("title") or "",
+            "description": product.get("description") or "",
+            "price": product.get("price"),
+            "is_active": True,
+            "content_hash": content_hash,
+        }
+
+        if product_obj is None:
+            product_obj = CatalogProduct.objects.create(
+                posiflora_id=product["id"],
+                kind=kind,
+                **fields
+            )
+            diff["added"].append(product["id"])
+        elif product_obj.content_hash != content_hash or not product_obj.is_active:
+            for name, value in fields.items():
+                setattr(product_obj, name, value)
+            product_obj.save()
+            diff["updated"].append(product["id"])
+        else:
+            continue
+
+        _write_children(product_obj, product)
+
+    if removed_ids:
+        CatalogProduct.objects.filter(kind=kind, posiflora_id__in=removed_ids).update(
+            is_active=False,
+            updated_at=timezone.now(),
+        )
+
+    return diff
+
+
+def sync_lock():
+    """
+    Общая для всех режимов синхронизации блокировка (с ожиданием)
+
+    Полная, инкрементальная и по уведомлениям синхронизации выполняются
+    строго по очереди: иначе они создают один и тот же товар одновременно
+    или применяют загруженные раньше данные поверх более новых.
+
+    Raises:
+        CacheLockTimeout: Другая синхронизация не закончилась за SYNC_LOCK_WAIT секунд
+    """
+    return wait_cache_lock(SYNC_LOCK_KEY, timeout=SYNC_LOCK_TIMEOUT, wait=SYNC_LOCK_WAIT, poll_interval=1)
+
+
+def sync_catalog(max_removal_ratio: float = 0.5) -> CatalogSync:
+    """
+    Синхронизировать спецификации и букеты Posiflora в локальные таблицы
+
+    Данные сначала полностью скачиваются, и только потом применяются в одной
+    транзакции. При любой ошибке загрузки или подозрительно большом числе
+    удалений локальный каталог остается прежним. Выполняется под sync_lock.
+
+    Args:
+        max_removal_ratio: Максимальная доля активных товаров, которую можно
+            снять с витрины за одну синхронизацию
+
+    Returns:
+        Запись журнала CatalogSync
+
+    Raises:
+        CacheLockTimeout: Другая синхронизация не закончилась за SYNC_LOCK_WAIT секунд
+    """
+    with sync_lock():
+        return _sync_catalog(max_removal_ratio)
+
+
+def _sync_catalog(max_removal_ratio: float = 0.5) -> CatalogSync:
+    sync = CatalogSync.objects.create()
+    # Отложенные до начала загрузки ID покрываются этой синхронизацией
+    parked_before = get_parked_changes()
+    service = get_product_service()
+
+    try:
+        specifications = service.fetch_specifications()
+        bouquets = service.fetch_bouquets()
+
+        with transaction.atomic():
+            categories = _sync_categories(specifications)
+
+            spec_items = [
+                (categories.get(category["name"]), product)
+                for category, product in _flatten_specifications(specifications)
+            ]
+            bouquet_items = [(None, bouquet) for bouquet in bouquets]
+
+            diff = {
+                CatalogProduct.KIND_SPECIFICATION: _apply_products(
+                    CatalogProduct.KIND_SPECIFICATION, spec_items, max_removal_ratio
+                ),
+                CatalogProduct.KIND_BOUQUET: _apply_products(
+                    CatalogProduct.KIND_BOUQUET, bouquet_items, max_removal_ratio
+                ),
+            }
+
+    except Exception as e:
+        logger.error(f'[CATALOG SYNC] Sync #{sync.id} failed: {e}')
+        sync.status = CatalogSync.STATUS_FAILED
+        sync.error = str(e)
+        sync.finished_at = timezone.now()
+        sync.save(update_fields=['status', 'error', 'finished_at'])
+        return sync
+
+    sync.status = CatalogSync.STATUS_SUCCESS
+    sync.diff = diff
+    sync.stats = {
+        kind: {change: len(ids) for change, ids in kind_diff.items()}
+        for kind, kind_diff in diff.items()
+    }
+    sync.finished_at = timezone.now()
+    sync.save(update_fields=['status', 'diff', 'stats', 'finished_at'])
+
+    logger.info(f'[CATALOG SYNC] Sync #{sync.id} finished: {sync.stats}')
+
+    specifications_cache.store(load_specifications())
+    bouquets_cache.store(load_bouquets())
+    product_index.invalidate()
+    _unpark(parked_before)
+
+    return sync
+
+
+def _incremental_watermark() -> Optional[datetime]:
+    """
+    Момент, начиная с которого нужно запросить изменения (с запасом)
+
+    Учитываются только полные синхронизации и выборки по дате: синхронизация
+    по ID из уведомления не означает, что остальные изменения уже загружены.
+    """
+    last_sync = (
+        CatalogSync.objects
+        .filter(status=CatalogSync.STATUS_SUCCESS)
+        .exclude(mode=CatalogSync.MODE_PRODUCTS)
+        .first()
+    )
+    if last_sync is None:
+        return None
+    return last_sync.started_at - timedelta(seconds=INCREMENTAL_OVERLAP_SECONDS)
+
+
+def _fetch_payload_in_worker(service, product_id: str) -> Optional[Dict]:
+    """fetch_specification_payload в потоке пула; соединение с БД потока закрывается"""
+    try:
+        return service.fetch_specification_payload(product_id)
+    finally:
+        connection.close()
+
+
+def _fetch_changed_specifications(
+    service,
+    product_ids: Optional[List[str]],
+    since: Optional[datetime],
+) -> Tuple[Dict, List[Dict], List[str]]:
+    """
+    Загрузить изменившиеся спецификации
+
+    Returns:
+        (ответ /categories, страницы спецификаций, ID не найденных спецификаций)
+    """
+    if product_ids is None:
+        since_filter = getattr(settings, 'POSIFLORA_UPDATED_SINCE_FILTER', 'filter[updatedAt][gte]')
+        categories_payload, page_payloads = service.fetch_specification_payloads(
+            {since_filter: since.astimezone(dt_timezone.utc).isoformat()}
+        )
+        return categories_payload, page_payloads, []
+
+    concurrency = max(1, getattr(settings, 'POSIFLORA_FETCH_CONCURRENCY', 4))
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='posiflora-sync') as executor:
+        categories_future = executor.submit(service._get_json_in_worker, service._build_url("/categories"))
+        payloads = list(executor.map(lambda product_id: _fetch_payload_in_worker(service, product_id), product_ids))
+        categories_payload = categories_future.result()
+
+    page = {"data": [], "included": []}
+    missing_ids = []
+    for product_id, payload in zip(product_ids, payloads):
+        if payload is None:
+            missing_ids.append(product_id)
+            continue
+        page["data"].append(payload["data"])
+        page["included"].extend(payload.get("included", []))
+
+    return categories_payload, [page], missing_ids
+
+
+def sync_changed_specifications(
+    product_ids: Optional[List[str]] = None,
+    since: Optional[datetime] = None,
+) -> CatalogSync:
+    """
+    Инкрементальная синхронизация спецификаций под sync_lock
+
+    См. _sync_changed_specifications.
+
+    Raises:
+        CacheLockTimeout: Другая синхронизация не закончилась за SYNC_LOCK_WAIT секунд
+    """
+    with sync_lock():
+        return _sync_changed_specifications(product_ids, since)
+
+
+def _sync_changed_specifications(
+    product_ids: Optional[List[str]] = None,
+    since: Optional[datetime] = None,
+) -> CatalogSync:
+    """
+    Инкрементальная синхронизация спецификаций
+
+    Загружаются только изменившиеся спецификации: перечисленные product_ids
+    (уведомление Posiflora) или измененные после since (по умолчанию - с
+    начала последней успешной синхронизации). В локальных таблицах
+    обновляются только эти товары; спецификации, которые по ID больше не
+    находятся, снимаются с витрины. Выключенные в Posiflora товары в
+    выборку по дате не попадают и снимаются очередной полной синхронизацией.
+
+    Если полной синхронизации еще не было, выполняется полная: иначе
+    локальный каталог состоял бы только из измененных товаров.
+
+    Returns:
+        Запись журнала CatalogSync
+    """
+    if not has_synced_catalog():
+        return _sync_catalog()
+
+    if product_ids is None and since is None:
+        since = _incremental_watermark()
+
+    mode = CatalogSync.MODE_INCREMENTAL if product_ids is None else CatalogSync.MODE_PRODUCTS
+    sync = CatalogSync.objects.create(mode=mode)
+    service = get_product_service()
+
+    try:
+        categories_payload, page_payloads, missing_ids = _fetch_changed_specifications(
+            service, product_ids, since
+        )
+        specifications = service._build_specifications(
+            categories_payload, page_payloads, update_index=False
+        )
+
+        with transaction.atomic():
+            categories = _sync_categories(specifications)
+
+            spec_items = [
+                (categories.get(category["name"]), product)
+                for category, product in _flatten_specifications(specifications)
+            ]
+
+            diff = {
+                CatalogProduct.KIND_SPECIFICATION: _apply_products(
+                    CatalogProduct.KIND_SPECIFICATION, spec_items, removed_ids=missing_ids
+                ),
+            }
+
+    except Exception as e:
+        logger.error(f'[CATALOG SYNC] Incremental sync #{sync.id} failed: {e}')
+        sync.status = CatalogSync.STATUS_FAILED
+        sync.error = str(e)
+        sync.finished_at = timezone.now()
+        sync.save(update_fields=['status', 'error', 'finished_at'])
+        return sync
+
+    sync.status = CatalogSync.STATUS_SUCCESS
+    sync.diff = diff
+    sync.stats = {
+        kind: {change: len(ids) for change, ids in kind_diff.items()}
+        for kind, kind_diff in diff.items()
+    }
+    sync.finished_at = timezone.now()
+    sync.save(update_fields=['status', 'diff', 'stats', 'finished_at'])
+
+    logger.info(f'[CATALOG SYNC] Incremental sync #{sync.id} finished: {sync.stats}')
+
+    if any(diff[CatalogProduct.KIND_SPECIFICATION].values()):
+        # Снимок пересобирается из БД; неизменные категории не перерендериваются
+        specifications_cache.store(load_specifications())
+        product_index.invalidate()
+
+    return sync
+
+
+def enqueue_changed_specifications(product_ids: List[str]) -> None:
+    """
+    Поставить ID изменившихся спецификаций в общую для воркеров очередь
+
+    Raises:
+        CacheLockTimeout: очередь слишком долго занята другим процессом
+    """
+    with wait_cache_lock(PENDING_LOCK_KEY, timeout=10):
+        pending = set(cache.get(PENDING_KEY) or ())
+        pending.update(product_ids)
+        cache.set(PENDING_KEY, sorted(pending), PENDING_TTL)
+
+
+def _drain_pending() -> List[str]:
+    with wait_cache_lock(PENDING_LOCK_KEY, timeout=10):
+        pending = cache.get(PENDING_KEY) or []
+        cache.delete(PENDING_KEY)
+    return pending
+
+
+def _record_failures(product_ids: List[str]) -> Tuple[List[str], List[str]]:
+    """
+    Увеличить счетчики неудачных попыток синхронизации
+
+    Returns:
+        (ID для повторной попытки, ID, исчерпавшие попытки)
+    """
+    with wait_cache_lock(PENDING_LOCK_KEY, timeout=10):
+        attempts = cache.get(PENDING_ATTEMPTS_KEY) or {}
+        retry_ids, parked_ids = [], []
+        for product_id in product_ids:
+            attempts[product_id] = attempts.get(product_id, 0) + 1
+            if attempts[product_id] >= PENDING_MAX_ATTEMPTS:
+                attempts.pop(product_id)
+                parked_ids.append(product_id)
+            else:
+                retry_ids.append(product_id)
+        cache.set(PENDING_ATTEMPTS_KEY, attempts, PENDING_TTL)
+
+        if parked_ids:
+            parked = set(cache.get(PARKED_KEY) or ())
+            parked.update(parked_ids)
+            cache.set(PARKED_KEY, sorted(parked), PENDING_TTL)
+
+    return retry_ids, parked_ids
+
+
+def _reset_failures(product_ids: List[str]) -> None:
+    with wait_cache_lock(PENDING_LOCK_KEY, timeout=10):
+        attempts = cache.get(PENDING_ATTEMPTS_KEY)
+        if not attempts:
+            return
+        for product_id in product_ids:
+            attempts.pop(product_id, None)
+        cache.set(PENDING_ATTEMPTS_KEY, attempts, PENDING_TTL)
+
+
+def _sync_pending(product_ids: List[str]) -> Optional[CatalogSync]:
+    try:
+        return _sync_changed_specifications(product_ids=product_ids)
+    except Exception as e:
+        logger.error(f'[CATALOG SYNC] Sync of {len(product_ids)} pending products failed: {e}')
+        return None
+
+
+def _succeeded(sync: Optional[CatalogSync]) -> bool:
+    return sync is not None and sync.status == CatalogSync.STATUS_SUCCESS
+
+
+def get_parked_changes() -> List[str]:
+    """ID спецификаций, которые не удалось синхронизировать за PENDING_MAX_ATTEMPTS попыток"""
+    return cache.get(PARKED_KEY) or []
+
+
+def _unpark(product_ids: List[str]) -> None:
+    """Снять отложенные ID, обработанные полной синхронизацией (отложенные позже остаются)"""
+    if not product_ids:
+        return
+    with wait_cache_lock(PENDING_LOCK_KEY, timeout=10):
+        parked = set(cache.get(PARKED_KEY) or ()) - set(product_ids)
+        if parked:
+            cache.set(PARKED_KEY, sorted(parked), PENDING_TTL)
+        else:
+            cache.delete(PARKED_KEY)
+
+
+def process_pending_changes() -> List[CatalogSync]:
+    """
+    Синхронизировать спецификации из очереди уведомлений
+
+    Очередь обрабатывается под sync_lock, но без ожидания: если идет
+    другая синхронизация, ID остаются в очереди до следующего запуска.
+    ID, пришедшие во время обработки, забираются следующим проходом цикла. Если пачка не
+    синхронизировалась, каждый ID повторяется отдельно, чтобы один
+    проблемный товар не блокировал остальные. Неудачные ID возвращаются в
+    очередь до следующего запуска, а после PENDING_MAX_ATTEMPTS попыток
+    откладываются (get_parked_changes) - их подхватит полная синхронизация.
+
+    Returns:
+        Записи журнала выполненных синхронизаций
+    """
+    syncs = []
+    # Не ждем: очередь заберет текущий владелец или следующий запуск
+    with cache_lock(SYNC_LOCK_KEY, timeout=SYNC_LOCK_TIMEOUT) as acquired:
+        if not acquired:
+            return syncs
+
+        while True:
+            product_ids = _drain_pending()
+            if not product_ids:
+                return syncs
+
+            sync = _sync_pending(product_ids)
+            if sync is not None:
+                syncs.append(sync)
+            if _succeeded(sync):
+                _reset_failures(product_ids)
+                continue
+
+            if len(product_ids) == 1 or (sync is not None and sync.mode == CatalogSync.MODE_FULL):
+                # Полная синхронизация (каталог еще не загружен) по одному ID не повторяется
+                failed_ids = product_ids
+            else:
+                failed_ids = []
+                for product_id in product_ids:
+                    sync = _sync_pending([product_id])
+                    if sync is not None:
+                        syncs.append(sync)
+                    if not _succeeded(sync):
+                        failed_ids.append(product_id)
+                _reset_failures([product_id for product_id in product_ids if product_id not in failed_ids])
+
+            retry_ids, parked_ids = _record_failures(failed_ids)
+            if parked_ids:
+                logger.error(
+                    f'[CATALOG SYNC] Parked {len(parked_ids)} products after '
+                    f'{PENDING_MAX_ATTEMPTS} failed attempts: {parked_ids}'
+                )
+            if retry_ids:
+                enqueue_changed_specifications(retry_ids)
+            # Повтор - при следующем запуске, а не в этом же цикле
+            return syncs
+
+
+def process_pending_changes_in_background() -> None:
+    """
+    Запустить обработку очереди уведомлений в фоновом потоке
+
+    Поток не запускается, пока идет другая синхронизация: владелец
+    блокировки (или следующий запуск) заберет ID из очереди сам.
+    """
+    if cache.get(SYNC_LOCK_KEY) is not None:
+        return
+
+    def run():
+        try:
+            process_pending_changes()
+        except Exception as e:
+            logger.error(f'[CATALOG SYNC] Processing pending changes failed: {e}')
+        finally:
+            connection.close()
+
+    threading.Thread(target=run, name='catalog-sync-pending', daemon=True).start()
@@ -0,0 +1,175 @@
+import logging
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Запрос не отправлен: Posiflora недоступна и circuit breaker открыт"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f'Posiflora circuit "{name}" is open, retry after {retry_after}s')
+        self.name = name
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Ошибка передается между воркерами через кэш (single_flight)
+        return type(self), (self.name, self.retry_after)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker для запросов к эндпоинту Posiflora, общий для всех воркеров
+
+    Состояние хранится в Django cache:
+        - счетчик ошибок подряд (сбрасывается успешным ответом) за окно
+          POSIFLORA_BREAKER_WINDOW секунд;
+        - момент открытия цепи (после POSIFLORA_BREAKER_FAILURES ошибок);
+          ключ не истекает сам, его удаляет только успешный пробный запрос;
+        - блокировка пробного запроса в полуоткрытом состоянии.
+
+    Пока цепь открыта, запросы сразу завершаются CircuitOpenError вместо
+    ожидания таймаута. Через POSIFLORA_BREAKER_OPEN_SECONDS после открытия
+    ровно один воркер отправляет пробный запрос: успех закрывает цепь,
+    ошибка снова ее открывает.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @property
+    def failures_key(self) -> str:
+        return f'posiflora:breaker:{self.name}:failures'
+
+    @property
+    def open_key(self) -> str:
+        return f'posiflora:breaker:{self.name}:opened_at'
+
+    @property
+    def probe_key(self) -> str:
+        return f'posiflora:breaker:{self.name}:probe'
+
+    @property
+    def threshold(self) -> int:
+        return getattr(settings, 'POSIFLORA_BREAKER_FAILURES', 5)
+
+    @property
+    def window(self) -> int:
+        return getattr(settings, 'POSIFLORA_BREAKER_WINDOW', 30)
+
+    @property
+    def open_seconds(self) -> int:
+        return getattr(settings, 'POSIFLORA_BREAKER_OPEN_SECONDS', 30)
+
+    def state(self) -> str:
+        """Текущее состояние цепи (для диагностики и представлений)"""
+        opened_at = cache.get(self.open_key)
+        if opened_at is None:
+            return STATE_CLOSED
+        if self._remaining(opened_at) > 0:
+            return STATE_OPEN
+        return STATE_HALF_OPEN
+
+    def is_open(self) -> bool:
+        return self.state() == STATE_OPEN
+
+    def before_request(self) -> bool:
+        """
+        Проверить, можно ли отправить запрос
+
+        Returns:
+            True, если запрос пробный (цепь полуоткрыта)
+
+        Raises:
+            CircuitOpenError: Цепь открыта или пробный запрос уже отправлен другим воркером
+        """
+        opened_at = cache.get(self.open_key)
+        if opened_at is None:
+            return False
+        self._raise_if_open(opened_at)
+        return self._probe_acquired(cache.add(self.probe_key, 1, self._probe_ttl()))
+
+    async def abefore_request(self) -> bool:
+        """Асинхронный before_request"""
+        opened_at = await cache.aget(self.open_key)
+        if opened_at is None:
+            return False
+        self._raise_if_open(opened_at)
+        return self._probe_acquired(await cache.aadd(self.probe_key, 1, self._probe_ttl()))
+
+    def record_success(self, probe: bool) -> None:
+        if probe:
+            cache.delete_many([self.open_key, self.probe_key, self.failures_key])
+            logger.info(f'[BREAKER {self.name}] Probe succeeded, circuit closed')
+        else:
+            # Цепь открывают только ошибки подряд, а не накопленные за окно
+            cache.delete(self.failures_key)
+
+    async def arecord_success(self, probe: bool) -> None:
+        if probe:
+            await cache.adelete_many([self.open_key, self.probe_key, self.failures_key])
+            logger.info(f'[BREAKER {self.name}] Probe succeeded, circuit closed')
+        else:
+            await cache.adelete(self.failures_key)
+
+    def record_failure(self, probe: bool) -> None:
+        if probe:
+            self._open('probe failed')
+            return
+
+        cache.add(self.failures_key, 0, self.window)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            # Счетчик истек или сброшен успехом между add и incr - начинаем новое окно
+            cache.add(self.failures_key, 1, self.window)
+            failures = 1
+
+        if failures >= self.threshold:
+            self._open(f'{failures} failures in {self.window}s')
+
+    async def arecord_failure(self, probe: bool) -> None:
+        await sync_to_async(self.record_failure)(probe)
+
+    def _remaining(self, opened_at: float) -> float:
+        return opened_at + self.open_seconds - time.time()
+
+    def _raise_if_open(self, opened_at: float) -> None:
+        remaining = self._remaining(opened_at)
+        if remaining > 0:
+            raise CircuitOpenError(self.name, max(1, int(remaining)))
+
+    def _probe_acquired(self, acquired: bool) -> bool:
+        # Полуоткрытое состояние: пробный запрос отправляет только один воркер
+        if not acquired:
+            raise CircuitOpenError(self.name, 1)
+        logger.info(f'[BREAKER {self.name}] Sending probe request')
+        return True
+
+    def _probe_ttl(self) -> int:
+        # Пробный запрос ограничен собственным таймаутом; блокировка переживает его
+        return max(self.open_seconds, 60)
+
+    def _open(self, reason: str) -> None:
+        # Без TTL: истекший ключ закрыл бы цепь без пробного запроса
+        cache.set(self.open_key, time.time(), None)
+        cache.delete_many([self.probe_key, self.failures_key])
+        logger.warning(f'[BREAKER {self.name}] Circuit opened for {self.open_seconds}s: {reason}')
+
+
+_breakers = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Circuit breaker эндпоинта Posiflora (см. client.breaker_name)"""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
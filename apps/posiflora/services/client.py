@@ -0,0 +1,146 @@
+import os
+import threading
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from .circuit_breaker import get_breaker
+
+# Префикс пути API, не входящий в имя эндпоинта
+API_PATH_PREFIX = ('api', 'v1')
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Имя эндпоинта Posiflora для бюджета времени (POSIFLORA_ENDPOINT_TIMEOUTS)
+
+    /api/v1/specifications -> specifications, /api/v1/specifications/<id> -> specification,
+    /api/v1/sessions/refresh -> sessions
+    """
+    segments = [segment for segment in urlparse(url).path.split('/') if segment]
+    if tuple(segments[:len(API_PATH_PREFIX)]) == API_PATH_PREFIX:
+        segments = segments[len(API_PATH_PREFIX):]
+    if not segments:
+        return 'default'
+    if segments[0] == 'specifications' and len(segments) > 1:
+        return 'specification'
+    return segments[0]
+
+
+def endpoint_read_timeout(url: str, default: float) -> float:
+    """Таймаут чтения для эндпоинта, иначе общий POSIFLORA_READ_TIMEOUT"""
+    timeouts = getattr(settings, 'POSIFLORA_ENDPOINT_TIMEOUTS', {})
+    return timeouts.get(endpoint_name(url), default)
+
+
+def breaker_name(url: str) -> str:
+    """
+    Имя circuit breaker'а для URL: хост и эндпоинт
+
+    Отказ одного эндпоинта (например, медленный /bouquets) не блокирует
+    запросы к остальным.
+    """
+    return f'{urlparse(url).hostname or "default"}:{endpoint_name(url)}'
+
+
+def is_upstream_failure(status_code: int) -> bool:
+    """Ответ, который считается отказом Posiflora для circuit breaker"""
+    return status_code >= 500 or status_code == 429
+
+
+class PosifloraClient:
+    """
+    HTTP-клиент Posiflora с пулом keep-alive соединений
+
+    Все запросы к Posiflora идут через один requests.Session на процесс,
+    поэтому постраничная выгрузка каталога и запросы карточек товаров
+    переиспользуют TCP/TLS соединения вместо нового рукопожатия на каждый вызов.
+    """
+
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+    ):
+        pool_size = pool_size or getattr(settings, 'POSIFLORA_POOL_SIZE', 10)
+        self.timeout: Tuple[float, float] = (
+            connect_timeout or getattr(settings, 'POSIFLORA_CONNECT_TIMEOUT', 3.05),
+            read_timeout or getattr(settings, 'POSIFLORA_READ_TIMEOUT', 30),
+        )
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_size,
+            max_retries=0,
+        )
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Выполнить запрос через пул соединений и circuit breaker эндпоинта
+
+        Таймаут по умолчанию - бюджет эндпоинта из POSIFLORA_ENDPOINT_TIMEOUTS.
+        Ошибки соединения, таймауты, 5xx и 429 учитываются circuit breaker'ом.
+
+        Raises:
+            CircuitOpenError: Эндпоинт недоступен, запрос не отправлялся
+        """
+        connect_timeout, read_timeout = self.timeout
+        kwargs.setdefault('timeout', (connect_timeout, endpoint_read_timeout(url, read_timeout)))
+
+        breaker = get_breaker(breaker_name(url))
+        probe = breaker.before_request()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            breaker.record_failure(probe)
+            raise
+
+        if is_upstream_failure(response.status_code):
+            breaker.record_failure(probe)
+        else:
+            breaker.record_success(probe)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request('PATCH', url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_client: Optional[PosifloraClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PosifloraClient:
+    """
+    Получить клиент Posiflora текущего процесса
+
+    Клиент создается заново после fork, чтобы gunicorn-воркеры
+    не делили сокеты родительского процесса.
+    """
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = PosifloraClient()
+            _client_pid = pid
+        return _client
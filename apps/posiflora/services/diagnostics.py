@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import random
+import time
+from collections import Counter
+from typing import Any, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def should_sample() -> bool:
+    """Попадает ли текущий запрос в выборку подробного логирования"""
+    rate = getattr(settings, 'POSIFLORA_LOG_SAMPLE_RATE', 0.0)
+    return rate > 0 and random.random() < rate
+
+
+class ParseStats:
+    """
+    Счетчики одного разбора ответа Posiflora
+
+    Вместо строки лога на каждый товар и изображение за запрос пишется
+    одна итоговая строка. Подробные логи по товарам (detailed) включаются
+    только на уровне DEBUG и только для доли запросов
+    POSIFLORA_LOG_SAMPLE_RATE.
+    """
+
+    def __init__(self, operation: str, log: logging.Logger):
+        self.operation = operation
+        self.log = log
+        self.counters = Counter()
+        self.detailed = log.isEnabledFor(logging.DEBUG) and should_sample()
+        self._started = time.perf_counter()
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def debug(self, msg: str, *args) -> None:
+        """Подробный лог, форматируется только для запросов из выборки"""
+        if self.detailed:
+            self.log.debug(msg, *args)
+
+    def log_summary(self) -> None:
+        if not self.log.isEnabledFor(logging.INFO):
+            return
+        elapsed_ms = (time.perf_counter() - self._started) * 1000
+        self.log.info(
+            '[%s] %s (%.1f ms)',
+            self.operation,
+            ' '.join(f'{name}={value}' for name, value in sorted(self.counters.items())),
+            elapsed_ms,
+        )
+
+
+def capture_payload(kind: str, payload: Any, key: Optional[str] = None) -> Optional[str]:
+    """
+    Сохранить сырой ответ Posiflora на диск для отладки
+
+    Работает только если задан POSIFLORA_CAPTURE_DIR; в остальных случаях
+    payload не сериализуется вовсе.
+
+    Returns:
+        Путь к сохраненному файлу или None
+    """
+    capture_dir = getattr(settings, 'POSIFLORA_CAPTURE_DIR', None)
+    if not capture_dir:
+        return None
+
+    name = '-'.join(part for part in (kind, key, str(time.time_ns())) if part)
+    path = os.path.join(capture_dir, f'{name}.json')
+
+    try:
+        os.makedirs(capture_dir, exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning('Failed to capture Posiflora payload %s: %s', kind, e)
+        return None
+
+    return path
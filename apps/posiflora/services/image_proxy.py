@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import os
+import uuid
+from io import BytesIO
+from urllib.parse import urlparse
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from .client import get_client
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow необязателен: без него прокси выключен
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_WIDTHS = (160, 320, 640, 960)
+
+MAX_SOURCE_BYTES = 20 * 1024 * 1024
+JPEG_QUALITY = 82
+
+# После очистки кэш занимает не больше этой доли лимита, чтобы не чистить на каждой записи
+EVICTION_TARGET_RATIO = 0.9
+EVICTION_KEY = 'posiflora:images:eviction'
+
+
+class ImageProxyError(Exception):
+    """Ошибка прокси изображений с HTTP-статусом для ответа"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def is_enabled() -> bool:
+    return bool(getattr(settings, 'POSIFLORA_IMAGE_PROXY_ENABLED', False)) and Image is not None
+
+
+def _cache_dir() -> str:
+    return getattr(settings, 'POSIFLORA_IMAGE_CACHE_DIR', '/tmp/floricraft_images')
+
+
+def _allowed_hosts():
+    return set(getattr(settings, 'POSIFLORA_IMAGE_HOSTS', ['cdn.posiflora.online']))
+
+
+def _validate(url: str, width: int) -> None:
+    if width not in ALLOWED_WIDTHS:
+        raise ImageProxyError(f'Width must be one of {ALLOWED_WIDTHS}')
+
+    parsed = urlparse(url or '')
+    if parsed.scheme != 'https' or parsed.hostname not in _allowed_hosts():
+        raise ImageProxyError('Image host is not allowed')
+
+
+def _cache_path(url: str, width: int) -> str:
+    key = hashlib.sha256(f'{width}:{url}'.encode('utf-8')).hexdigest()
+    return os.path.join(_cache_dir(), key[:2], f'{key}.jpg')
+
+
+def _download(url: str) -> bytes:
+    """
+    Скачать оригинал, не читая в память больше MAX_SOURCE_BYTES
+
+    Редиректы не выполняются: допустимость хоста проверена только для
+    исходного URL.
+
+    Raises:
+        ImageProxyError: Ошибка загрузки, редирект или слишком большой файл
+    """
+    try:
+        response = get_client().get(url, stream=True, allow_redirects=False)
+    except Exception as e:
+        raise ImageProxyError(f'Failed to fetch image: {e}', status=502)
+
+    with response:
+        if response.status_code != 200:
+            raise ImageProxyError(f'Failed to fetch image: HTTP {response.status_code}', status=502)
+
+        try:
+            declared = int(response.headers.get('Content-Length', 0))
+        except ValueError:
+            declared = 0
+        if declared > MAX_SOURCE_BYTES:
+            raise ImageProxyError('Source image is too large', status=502)
+
+        content = bytearray()
+        try:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                content.extend(chunk)
+                if len(content) > MAX_SOURCE_BYTES:
+                    raise ImageProxyError('Source image is too large', status=502)
+        except requests.exceptions.RequestException as e:
+            raise ImageProxyError(f'Failed to fetch image: {e}', status=502)
+
+    return bytes(content)
+
+
+def get_resized_image(url: str, width: int) -> str:
+    """
+    Уменьшенная копия изображения Posiflora из дискового кэша
+
+    При промахе оригинал скачивается через общий HTTP-клиент, уменьшается
+    до ширины width и сохраняется. Время доступа к файлу обновляется при
+    каждом попадании, по нему кэш вытесняет давно не запрошенные файлы.
+    Обход каталога кэша для вытеснения выполняется не чаще раза в
+    POSIFLORA_IMAGE_EVICTION_INTERVAL секунд на все воркеры.
+
+    Returns:
+        Путь к JPEG-файлу
+
+    Raises:
+        ImageProxyError: Недопустимые параметры или ошибка загрузки
+    """
+    if not is_enabled():
+        raise ImageProxyError('Image proxy is disabled', status=404)
+
+    _validate(url, width)
+    path = _cache_path(url, width)
+
+    if os.path.exists(path):
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass  # файл вытеснен другим воркером между проверкой и обновлением
+
+    content = _download(url)
+
+    try:
+        image = Image.open(BytesIO(content))
+        image.thumbnail((width, width * 4))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        image.save(tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        # DecompressionBombError - изображение с огромным числом пикселей
+        raise ImageProxyError(f'Failed to resize image: {e}', status=502)
+
+    _evict_periodically()
+    return path
+
+
+def _evict_periodically() -> None:
+    # Обход всего каталога стоит O(размер кэша): между проходами кэш может
+    # превысить лимит на объем копий, записанных за интервал
+    interval = getattr(settings, 'POSIFLORA_IMAGE_EVICTION_INTERVAL', 300)
+    if cache.add(EVICTION_KEY, True, interval):
+        evict_if_needed()
+
+
+def evict_if_needed() -> int:
+    """
+    Вытеснить давно не запрошенные файлы, если кэш превысил лимит
+
+    Returns:
+        Количество удаленных файлов
+    """
+    max_bytes = getattr(settings, 'POSIFLORA_IMAGE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+
+    files = []
+    total = 0
+    for root, _, names in os.walk(_cache_dir()):
+        for name in names:
+            if name.endswith('.tmp'):
+                continue
+            full_path = os.path.join(root, name)
+            try:
+                stat = os.stat(full_path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, full_path))
+            total += stat.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    target = max_bytes * EVICTION_TARGET_RATIO
+    for _, size, full_path in sorted(files):
+        if total <= target:
+            break
+        try:
+            os.remove(full_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+
+    logger.info('Image cache eviction: removed %d files', removed)
+    return removed
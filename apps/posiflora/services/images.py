@@ -0,0 +1,75 @@
+from typing import Dict, Iterable, List, Optional
+
+SIZE_THUMB = "thumb"
+SIZE_MEDIUM = "medium"
+SIZE_FULL = "full"
+
+# Поля Posiflora с размерами изображения: объект images и атрибуты logo* товара
+IMAGE_FIELDS = {SIZE_FULL: "file", SIZE_MEDIUM: "fileMedium", SIZE_THUMB: "fileShop"}
+LOGO_FIELDS = {SIZE_FULL: "logo", SIZE_MEDIUM: "logoMedium", SIZE_THUMB: "logoShop"}
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    """Привести URL изображения к абсолютному https-виду"""
+    if not url or not isinstance(url, str):
+        return None
+    url = url.strip()
+    if not url:
+        return None
+    if url.startswith("//"):
+        return f"https:{url}"
+    if url.startswith("http://"):
+        return f"https://{url[len('http://'):]}"
+    return url
+
+
+def image_entry(full: Optional[str] = None, medium: Optional[str] = None, thumb: Optional[str] = None) -> Optional[Dict]:
+    """
+    Запись изображения {thumb, medium, full}
+
+    Отсутствующий размер заменяется ближайшим доступным: для превью
+    берется сначала средний размер, для полного - сначала средний.
+
+    Returns:
+        Запись или None, если нет ни одного URL
+    """
+    full, medium, thumb = normalize_url(full), normalize_url(medium), normalize_url(thumb)
+    if not (full or medium or thumb):
+        return None
+    return {
+        SIZE_THUMB: thumb or medium or full,
+        SIZE_MEDIUM: medium or full or thumb,
+        SIZE_FULL: full or medium or thumb,
+    }
+
+
+def entry_from_attributes(attributes: Dict, fields: Dict[str, str] = IMAGE_FIELDS) -> Optional[Dict]:
+    """Запись изображения из атрибутов объекта Posiflora"""
+    return image_entry(
+        full=attributes.get(fields[SIZE_FULL]),
+        medium=attributes.get(fields[SIZE_MEDIUM]),
+        thumb=attributes.get(fields[SIZE_THUMB]),
+    )
+
+
+def logo_entries(attributes: Dict) -> List[Dict]:
+    """Логотип товара как одно изображение (logo/logoMedium/logoShop - его размеры)"""
+    entry = entry_from_attributes(attributes, LOGO_FIELDS)
+    return [entry] if entry else []
+
+
+def dedupe(entries: Iterable[Optional[Dict]]) -> List[Dict]:
+    """Убрать пустые записи и повторы одного и того же изображения"""
+    result = []
+    seen = set()
+    for entry in entries:
+        if not entry or entry[SIZE_FULL] in seen:
+            continue
+        seen.add(entry[SIZE_FULL])
+        result.append(entry)
+    return result
+
+
+def image_urls(entries: Iterable[Dict]) -> List[str]:
+    """Плоский список URL полного размера (поле image_urls)"""
+    return [entry[SIZE_FULL] for entry in entries]
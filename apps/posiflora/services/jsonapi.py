@@ -0,0 +1,144 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from .images import dedupe, entry_from_attributes
+
+SIZE_ORDER = {"S": 0, "M": 1, "L": 2}
+
+ResourceKey = Tuple[Optional[str], Optional[str]]
+
+
+class IncludedResolver:
+    """
+    Разрешение связей JSON:API через индекс included
+
+    Индекс (type, id) -> объект строится один раз на payload, после чего
+    все связи (изображения, категории, specVariants, варианты, цены)
+    разрешаются за O(1) вместо линейного прохода по included.
+    """
+
+    __slots__ = ("_index",)
+
+    def __init__(self, included: Optional[Iterable[Dict]] = None):
+        self._index: Dict[ResourceKey, Dict] = {
+            (item.get("type"), item.get("id")): item
+            for item in (included or ())
+        }
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, ref: Optional[Dict]) -> Optional[Dict]:
+        """Объект included по ссылке вида {"type": ..., "id": ...}"""
+        if not ref:
+            return None
+        return self._index.get((ref.get("type"), ref.get("id")))
+
+    @staticmethod
+    def relationship(resource: Dict, name: str):
+        """Содержимое relationships.<name>.data (ссылка или список ссылок)"""
+        return ((resource.get("relationships") or {}).get(name) or {}).get("data")
+
+    def related(self, resource: Dict, name: str) -> Optional[Dict]:
+        """Связанный объект для to-one связи"""
+        return self.get(self.relationship(resource, name))
+
+    def related_many(self, resource: Dict, name: str) -> List[Dict]:
+        """Связанные объекты для to-many связи (отсутствующие в included пропускаются)"""
+        result = []
+        for ref in self.relationship(resource, name) or ():
+            obj = self.get(ref)
+            if obj is not None:
+                result.append(obj)
+        return result
+
+    # --- Изображения ---
+
+    def images(self, resource: Dict, logo_first: bool = False) -> List[Dict]:
+        """
+        Объекты изображений товара
+
+        Args:
+            logo_first: Поставить главное изображение (relationships.logo) первым
+        """
+        refs = [ref for ref in self.relationship(resource, "images") or () if ref]
+
+        if logo_first:
+            logo_id = (self.relationship(resource, "logo") or {}).get("id", "")
+            refs = sorted(refs, key=lambda ref: ref.get("id") != logo_id)
+
+        result = []
+        for ref in refs:
+            obj = self.get(ref)
+            if obj is not None:
+                result.append(obj)
+        return result
+
+    def image_entries(self, resource: Dict, logo_first: bool = False) -> List[Dict]:
+        """Изображения товара со всеми размерами: [{"thumb", "medium", "full"}, ...]"""
+        return dedupe(
+            entry_from_attributes(image.get("attributes") or {})
+            for image in self.images(resource, logo_first=logo_first)
+        )
+
+    def image_urls(self, resource: Dict, logo_first: bool = False) -> List[str]:
+        """URL изображений товара в полном размере"""
+        return [entry["full"] for entry in self.image_entries(resource, logo_first=logo_first)]
+
+    def logo_url(self, resource: Dict) -> Optional[str]:
+        """URL логотипа товара из relationships.logo"""
+        logo = self.related(resource, "logo")
+        if logo is None:
+            return None
+        attrs = logo.get("attributes") or {}
+        return attrs.get("url") or attrs.get("original") or attrs.get("path")
+
+    # --- Категории ---
+
+    def category(self, resource: Dict) -> Optional[Dict]:
+        return self.related(resource, "category")
+
+    def category_title(self, resource: Dict) -> Optional[str]:
+        category = self.category(resource)
+        if category is None:
+            return None
+        return (category.get("attributes") or {}).get("title", "")
+
+    # --- Варианты и цены ---
+
+    def spec_variants(self, resource: Dict) -> List[Dict]:
+        return self.related_many(resource, "specVariants")
+
+    def variant(self, spec_variant: Dict) -> Optional[Dict]:
+        return self.related(spec_variant, "variant")
+
+    def prices(self, spec_variant: Dict) -> List[Dict]:
+        return self.related_many(spec_variant, "specVariantPrices")
+
+    def active_price(self, spec_variant: Dict):
+        """Цена первой активной (status == "on") specVariantPrice"""
+        for price_obj in self.prices(spec_variant):
+            attrs = price_obj.get("attributes") or {}
+            if attrs.get("status") == "on":
+                return attrs.get("priceValue") or attrs.get("compositionPrice")
+        return None
+
+    def size_variants(self, resource: Dict) -> List[Dict]:
+        """
+        Варианты размеров спецификации, отсортированные S, M, L
+
+        Returns:
+            [{"size": "S", "price": 4050}, ...]
+        """
+        variants = []
+        for spec_variant in self.spec_variants(resource):
+            variant = self.variant(spec_variant)
+            if variant is None:
+                continue
+
+            size = (variant.get("attributes") or {}).get("title", "")
+            price = self.active_price(spec_variant)
+
+            if price is not None and size:
+                variants.append({"size": size, "price": price})
+
+        variants.sort(key=lambda v: SIZE_ORDER.get(v["size"], 999))
+        return variants
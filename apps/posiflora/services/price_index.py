@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+from .catalog_cache import bouquets_cache, specifications_cache
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogPriceIndex:
+    """
+    Индекс (ID товара, размер) -> текущая цена по снимкам каталога
+
+    Товар с вариантами доступен только в размерах своих вариантов, товар
+    без вариантов и букет - с пустым размером. Отсутствие ключа или
+    нулевая цена означают, что товар сейчас недоступен.
+    """
+
+    def __init__(self, version: Tuple, specifications: Dict, bouquets: Iterable[Dict]):
+        self.version = version
+        self.prices: Dict[Tuple[str, str], Decimal] = {}
+
+        for bouquet in bouquets:
+            self._add(bouquet.get('id'), '', bouquet.get('price'))
+
+        # Спецификации добавляются последними и имеют приоритет над букетами
+        for category in specifications.get('categories', []):
+            for product in category.get('products', []):
+                variants = product.get('variants') or []
+                for variant in variants:
+                    self._add(product.get('id'), variant.get('size') or '', variant.get('price'))
+                if not variants:
+                    self._add(product.get('id'), '', product.get('price'))
+
+    def _add(self, product_id: Optional[str], size: str, price) -> None:
+        if product_id and price:
+            self.prices[(product_id, size)] = Decimal(str(price))
+
+    def price(self, product_id: str, size: Optional[str]) -> Optional[Decimal]:
+        """Текущая цена или None, если товар в этом размере недоступен"""
+        return self.prices.get((product_id, size or ''))
+
+
+# Снимки каталога большие, поэтому проверка их версии делается не чаще раза в N секунд
+RECHECK_SECONDS = 30
+
+_index: Optional[CatalogPriceIndex] = None
+_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _snapshots(build: bool) -> Optional[Tuple[Dict, Dict]]:
+    if not build:
+        specifications = specifications_cache.peek()
+        bouquets = bouquets_cache.peek()
+        if specifications is None or bouquets is None:
+            return None
+        return specifications, bouquets
+
+    try:
+        # Пустой кэш собирается загрузчиками снимков: из БД, если каталог синхронизирован
+        return specifications_cache.get_snapshot(), bouquets_cache.get_snapshot()
+    except Exception as e:
+        logger.warning(f'[PRICE INDEX] Catalog is unavailable: {e}')
+        return None
+
+
+def get_price_index(build: bool = False) -> Optional[CatalogPriceIndex]:
+    """
+    Индекс цен по последним снимкам каталога
+
+    По умолчанию снимки читаются без построения (peek), и вызов никогда
+    не идет в Posiflora. Индекс перестраивается только при смене версии снимков.
+
+    Args:
+        build: Построить отсутствующие снимки (для проверок, которые нельзя
+            пропустить, например цен заказа)
+
+    Returns:
+        Индекс или None, если снимков спецификаций и букетов нет в кэше
+        (а при build - их не удалось построить)
+    """
+    global _index, _checked_at
+
+    if _index is not None and time.monotonic() - _checked_at < RECHECK_SECONDS:
+        return _index
+
+    with _index_lock:
+        if _index is not None and time.monotonic() - _checked_at < RECHECK_SECONDS:
+            return _index
+
+        # Без одного из снимков товары другого источника выглядели бы недоступными
+        snapshots = _snapshots(build)
+        if snapshots is None:
+            return None
+        specifications, bouquets = snapshots
+
+        version = (specifications['version'], bouquets['version'])
+        if _index is None or _index.version != version:
+            _index = CatalogPriceIndex(version, specifications['data'], bouquets['data'])
+        _checked_at = time.monotonic()
+        return _index
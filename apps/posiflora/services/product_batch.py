@@ -0,0 +1,83 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+from django.conf import settings
+from django.db import connection
+from .catalog_cache import bouquets_cache, specifications_cache
+from .catalog_store import load_products
+from .product_index import product_index
+from .products import PosifloraProductService, get_product_service
+
+logger = logging.getLogger(__name__)
+
+
+def _snapshot_products() -> Dict[str, Dict]:
+    """Товары последних снимков каталога по ID (спецификации важнее букетов)"""
+    products = {}
+
+    snapshot = bouquets_cache.peek()
+    if snapshot is not None:
+        for bouquet in snapshot['data']:
+            products[bouquet.get('id')] = PosifloraProductService._bouquet_to_product(bouquet)
+
+    snapshot = specifications_cache.peek()
+    if snapshot is not None:
+        for category in snapshot['data'].get('categories', []):
+            for product in category.get('products', []):
+                products[product.get('id')] = product
+
+    return products
+
+
+def _fetch_upstream(product_id: str):
+    try:
+        return get_product_service().get_specification_by_id(product_id)
+    except Exception as e:
+        logger.info(f'[BATCH] Product {product_id} not resolved: {e}')
+        return None
+    finally:
+        connection.close()
+
+
+def get_products_batch(product_ids: Iterable[str]) -> Tuple[List[Dict], List[str]]:
+    """
+    Найти несколько товаров за один вызов
+
+    Порядок поиска как у карточки товара: локальные таблицы (один запрос),
+    затем индекс товаров процесса и снимки каталога. Оставшиеся ID
+    запрашиваются у Posiflora параллельно, не больше
+    POSIFLORA_BATCH_CONCURRENCY запросов одновременно.
+
+    Returns:
+        (товары в порядке запрошенных ID, ненайденные ID)
+    """
+    product_ids = list(dict.fromkeys(product_ids))
+    found = load_products(product_ids)
+
+    pending = [product_id for product_id in product_ids if product_id not in found]
+    for product_id in pending:
+        product = product_index.get(product_id)
+        if product is not None:
+            found[product_id] = product
+
+    pending = [product_id for product_id in pending if product_id not in found]
+    if pending:
+        snapshot_products = _snapshot_products()
+        for product_id in pending:
+            if product_id in snapshot_products:
+                found[product_id] = snapshot_products[product_id]
+
+    pending = [
+        product_id for product_id in pending
+        if product_id not in found and not product_index.is_missing(product_id)
+    ]
+    if pending:
+        workers = min(getattr(settings, 'POSIFLORA_BATCH_CONCURRENCY', 4), len(pending))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for product_id, product in zip(pending, executor.map(_fetch_upstream, pending)):
+                if product is not None:
+                    found[product_id] = product
+
+    products = [found[product_id] for product_id in product_ids if product_id in found]
+    missing = [product_id for product_id in product_ids if product_id not in found]
+    return products, missing
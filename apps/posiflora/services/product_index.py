@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from django.conf import settings
+
+
+class ProductIndex:
+    """
+    In-process индекс товаров id -> данные продукта
+
+    Наполняется результатами последних fetch_bouquets / fetch_specifications,
+    чтобы поиск товара по ID не требовал повторной выгрузки каталога.
+    Каждый источник хранится отдельно и устаревает по своему TTL.
+    Неизвестные ID кэшируются как отрицательный результат.
+    """
+
+    SOURCE_SPECIFICATIONS = 'specifications'
+    SOURCE_BOUQUETS = 'bouquets'
+
+    MAX_NEGATIVE_ENTRIES = 10000
+
+    def __init__(self, ttl: Optional[int] = None, negative_ttl: Optional[int] = None):
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Dict] = {}
+        self._negative: OrderedDict = OrderedDict()
+
+    @property
+    def ttl(self) -> int:
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'POSIFLORA_PRODUCT_INDEX_TTL', 600)
+
+    @property
+    def negative_ttl(self) -> int:
+        if self._negative_ttl is not None:
+            return self._negative_ttl
+        return getattr(settings, 'POSIFLORA_PRODUCT_INDEX_NEGATIVE_TTL', 300)
+
+    def update(self, source: str, products: Iterable[Dict]) -> None:
+        """Полностью заменить содержимое источника"""
+        products_by_id = {product["id"]: product for product in products if product.get("id")}
+        with self._lock:
+            self._sources[source] = {
+                "built_at": time.monotonic(),
+                "products": products_by_id,
+            }
+            for product_id in products_by_id:
+                self._negative.pop(product_id, None)
+
+    def is_fresh(self, source: str) -> bool:
+        entry = self._sources.get(source)
+        return entry is not None and time.monotonic() - entry["built_at"] < self.ttl
+
+    def get(self, product_id: str, source: Optional[str] = None) -> Optional[Dict]:
+        """
+        Найти товар в свежих источниках
+
+        Args:
+            product_id: ID товара
+            source: Искать только в указанном источнике
+
+        Returns:
+            Данные продукта или None
+        """
+        sources = [source] if source else [self.SOURCE_SPECIFICATIONS, self.SOURCE_BOUQUETS]
+        for name in sources:
+            if not self.is_fresh(name):
+                continue
+            product = self._sources[name]["products"].get(product_id)
+            if product is not None:
+                return product
+        return None
+
+    def mark_missing(self, product_id: str) -> None:
+        with self._lock:
+            self._negative[product_id] = time.monotonic() + self.negative_ttl
+            self._negative.move_to_end(product_id)
+            while len(self._negative) > self.MAX_NEGATIVE_ENTRIES:
+                self._negative.popitem(last=False)
+
+    def is_missing(self, product_id: str) -> bool:
+        expires_at = self._negative.get(product_id)
+        if expires_at is None:
+            return False
+        if time.monotonic() >= expires_at:
+            with self._lock:
+                self._negative.pop(product_id, None)
+            return False
+        return True
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._sources.clear()
+            self._negative.clear()
+
+
+product_index = ProductIndex()
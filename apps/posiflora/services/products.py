@@ -1,17 +1,83 @@
 from collections import defaultdict
-import json
+from concurrent.futures import ThreadPoolExecutor
+import math
 import re
 import requests
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from django.conf import settings
-from .tokens import make_request_with_retry
+from django.db import connection
+from .diagnostics import ParseStats, capture_payload
+from .images import image_urls as full_image_urls, logo_entries
+from .client import endpoint_read_timeout
+from .jsonapi import IncludedResolver
+from .product_index import product_index
+from .single_flight import single_flight
+from .tokens import get_access_token, make_request_with_retry
 
 logger = logging.getLogger(__name__)
 
 
+class MissingSpecificationData(ValueError):
+    """Ответ /specifications/{id} без data: спецификации с таким ID нет"""
+
+
+class ProductNotFound(RuntimeError):
+    """Товара с таким ID нет ни среди спецификаций, ни среди букетов Posiflora"""
+
+    def __init__(self, product_id: str):
+        super().__init__(f"Product with id {product_id} not found")
+        self.product_id = product_id
+
+    def __reduce__(self):
+        # Ошибка передается между воркерами через кэш (single_flight)
+        return type(self), (self.product_id,)
+
+
 SIZE_PATTERN = re.compile(r"\s(S|M|L)$")
-SIZE_ORDER = {"S": 0, "M": 1, "L": 2}
+
+SPECIFICATIONS_INCLUDE = "category,specVariants.variant,specVariants.variant.tags,specVariants.specVariantPrices,images"
+
+SPECIFICATIONS_PARAMS = {
+    "include": SPECIFICATIONS_INCLUDE,
+    "filter[activeVariants]": "true",
+    "filter[status]": "on",
+    "page[size]": 100,
+}
+
+BOUQUETS_URL = "https://floricraft.posiflora.com/api/v1/bouquets"
+BOUQUETS_PARAMS = {
+    "page[number]": 1,
+    "page[size]": 100,
+    "filter[statuses]": "demonstrated,edited",
+    "include": "images",
+}
+
+CATEGORY_ORDER = [
+    "сборные букеты",
+    "моно/дуо-букеты",
+    "композиции",
+    "вазы",
+    "свечи/ароматы",
+    "аксессуары",
+]
+
+
+def get_product_price(product: Dict):
+    """Цена товара для сортировки: максимальная цена варианта или цена товара"""
+    if "variants" in product:
+        return max(v["price"] for v in product["variants"])
+    return product.get("price") or 0
+
+
+def category_sort_key(item: Dict) -> int:
+    """Порядок категории в каталоге согласно CATEGORY_ORDER"""
+    name_lower = item["name"].lower()
+    for i, ordered_name in enumerate(CATEGORY_ORDER):
+        if name_lower == ordered_name:
+            return i
+    return len(CATEGORY_ORDER)
+
 
 class PosifloraProductService:
     """Сервис для работы с товарами через Posiflora API (без пагинации)"""
@@ -37,87 +103,6 @@ class PosifloraProductService:
         base_url = getattr(settings, 'POSIFLORA_SHOP_URL', 'https://floricraft.posiflora.com')
         return f"{base_url}{self.SHOP_API_BASE}{path}"
 
-    def _get_image_url_from_included(
-        self, product_data: Dict, included: Optional[List[Dict]] = None
-    ) -> Optional[str]:
-        """Извлечь URL изображения из relationships -> logo -> included"""
-        if not included:
-            return None
-
-        relationships = product_data.get("relationships", {})
-        logo_rel = relationships.get("logo", {}).get("data")
-        if not logo_rel:
-            return None
-
-        logo_id = logo_rel.get("id")
-        logo_type = logo_rel.get("type")
-
-        for inc in included:
-            if inc.get("type") == logo_type and inc.get("id") == logo_id:
-                attrs = inc.get("attributes", {})
-                return (
-                    attrs.get("url")
-                    or attrs.get("original")
-                    or attrs.get("path")
-                )
-
-        return None
-
-    def _get_category_from_included(
-        self, product_data: Dict, included: Optional[List[Dict]] = None
-    ) -> Optional[str]:
-        """Извлечь название категории из relationships -> category -> included"""
-        if not included:
-            return None
-
-        relationships = product_data.get("relationships", {})
-        category_rel = relationships.get("category", {}).get("data")
-        if not category_rel:
-            return None
-
-        cat_id = category_rel.get("id")
-        cat_type = category_rel.get("type")
-
-        for inc in included:
-            if inc.get("type") == cat_type and inc.get("id") == cat_id:
-                return inc.get("attributes", {}).get("title")
-
-        return None
-
-    def _parse_product(self, product_data: Dict, included: Optional[List[Dict]] = None) -> Dict:
-        """Парсинг данных букета из формата JSON:API в удобный формат"""
-        attributes = product_data.get("attributes", {})
-        product_id = product_data.get("id")
-
-        image_url = self._get_image_url_from_included(product_data, included)
-        category_name = self._get_category_from_included(product_data, included)
-
-        sku = attributes.get("docNo") or product_id
-
-        price = attributes.get("trueSaleAmount") or attributes.get("saleAmount") or attributes.get("amount")
-
-        available = bool(attributes.get("public", False))
-
-        return {
-            "id": product_id,
-            "name": attributes.get("title", "") or "",
-            "description": attributes.get("description") or "",
-            "sku": sku,
-            "price": price,
-            "currency": "RUB",
-            "available": available,
-            "image_url": image_url,
-            "category": category_name or "",
-            "item_type": "bouquet",
-            "price_min": price,
-            "price_max": price,
-            "amount": attributes.get("amount"),
-            "sale_amount": attributes.get("saleAmount"),
-            "true_sale_amount": attributes.get("trueSaleAmount"),
-            "status": attributes.get("status"),
-        }
-
-
     def fetch_bouquets(self) -> List[Dict]:
         """
         Получить все букеты в простом формате для фронтенда
@@ -134,83 +119,36 @@ class PosifloraProductService:
                 }
             ]
         """
-        url = "https://floricraft.posiflora.com/api/v1/bouquets"
-        params = {
-            "page[number]": 1,
-            "page[size]": 100,
-            "filter[statuses]": "demonstrated,edited",
-            "include": "images",
-        }
-
-        response = make_request_with_retry(
-            'GET',
-            url,
-            headers=self._get_headers(),
-            params=params,
-            timeout=30
-        )
-        payload = response.json()
+        payload = self._get_json(BOUQUETS_URL, BOUQUETS_PARAMS)
+        capture_payload("bouquets", payload)
+        return self._build_bouquets(payload)
 
+    def _build_bouquets(self, payload: Dict) -> List[Dict]:
+        """Разобрать ответ /bouquets и обновить индекс товаров"""
         bouquets_data = payload.get("data", [])
         included = payload.get("included", [])
 
-        logger.info(f"[FETCH BOUQUETS] Total bouquets: {len(bouquets_data)}")
-        logger.info(f"[FETCH BOUQUETS] Total included items: {len(included)}")
-
-        included_index = {}
-        for item in included:
-            key = (item.get("type"), item.get("id"))
-            included_index[key] = item
+        stats = ParseStats("FETCH BOUQUETS", logger)
+        stats.incr("bouquets", len(bouquets_data))
+        stats.incr("included", len(included))
 
+        resolver = IncludedResolver(included)
         result = []
 
         for bouquet in bouquets_data:
             bouquet_id = bouquet.get("id")
             attributes = bouquet.get("attributes", {})
-            relationships = bouquet.get("relationships", {})
 
             title = attributes.get("title", "")
             description = attributes.get("description", "")
 
-            logger.info(f"[BOUQUET {bouquet_id}] Title: {title}")
-            
-            logo_rel = relationships.get("logo") or {}
-            logo_data = logo_rel.get("data") or {}
-            main_image_id = logo_data.get("id", "")
+            images = resolver.image_entries(bouquet, logo_first=True)
+            if not images:
+                stats.incr("logo_fallbacks")
+                images = logo_entries(attributes)
 
-            images_rel = relationships.get("images") or {}
-            images_list = images_rel.get("data") or []
-
-            images_data = sorted(
-                images_list,
-                key=lambda img: (img.get("id") if img else "") != main_image_id
-            )
-
-            image_urls = []
-
-            if images_data:
-                logger.info(f"[BOUQUET {bouquet_id}] Found {len(images_data)} images in relationships")
-                for img_ref in images_data:
-                    img_key = (img_ref.get("type"), img_ref.get("id"))
-                    img_obj = included_index.get(img_key)
-                    if img_obj:
-                        img_attrs = img_obj.get("attributes", {})
-                        logger.info(f"[BOUQUET {bouquet_id}] Image attributes: {img_attrs}")
-                        img_url = img_attrs.get("file") or img_attrs.get("fileMedium") or img_attrs.get("fileShop")
-                        if img_url:
-                            image_urls.append(img_url)
-                            logger.info(f"[BOUQUET {bouquet_id}] Added image: {img_url}")
-
-            if not image_urls:
-                logger.info(f"[BOUQUET {bouquet_id}] No images in relationships, checking attributes")
-                if attributes.get("logo"):
-                    image_urls.append(attributes["logo"])
-                if attributes.get("logoMedium"):
-                    image_urls.append(attributes["logoMedium"])
-                if attributes.get("logoShop"):
-                    image_urls.append(attributes["logoShop"])
-
-            logger.info(f"[BOUQUET {bouquet_id}] Final image_urls: {image_urls}")
+            stats.incr("images", len(images))
+            stats.debug("[BOUQUET %s] %s: images=%s", bouquet_id, title, images)
 
             price = attributes.get("trueSaleAmount") or attributes.get("saleAmount") or attributes.get("amount") or 0
 
@@ -218,14 +156,95 @@ class PosifloraProductService:
                 "id": bouquet_id,
                 "title": title,
                 "description": description,
-                "image_urls": image_urls,
+                "image_urls": full_image_urls(images),
+                "images": images,
                 "price": price
             })
 
         result = sorted(result, key=lambda b: b.get("price") or 0, reverse=True)
+        stats.log_summary()
+
+        product_index.update(
+            product_index.SOURCE_BOUQUETS,
+            (self._bouquet_to_product(bouquet) for bouquet in result)
+        )
+
         return result
 
+    @staticmethod
+    def _bouquet_to_product(bouquet: Dict) -> Dict:
+        """Привести букет к формату CategoryProductSerializer"""
+        return {
+            "id": bouquet.get("id"),
+            "title": bouquet.get("title", ""),
+            "description": bouquet.get("description", ""),
+            "image_urls": bouquet.get("image_urls", []),
+            "images": bouquet.get("images", []),
+            "price": bouquet.get("price", 0)
+        }
+
+
+
+    def _get_json(self, url: str, params: Optional[Dict] = None) -> Dict:
+        """GET-запрос к Posiflora API с разбором JSON ответа"""
+        response = make_request_with_retry(
+            'GET',
+            url,
+            headers=self._get_headers(),
+            params=params
+        )
+        return response.json()
+
+    def _get_json_in_worker(self, url: str, params: Optional[Dict] = None) -> Dict:
+        """
+        _get_json для потока пула
+
+        Обновление токена (401) читает и пишет сессию в БД; соединение потока
+        пула никто, кроме него самого, не закроет.
+        """
+        try:
+            return self._get_json(url, params)
+        finally:
+            connection.close()
+
+    def _fetch_specification_pages(
+        self, executor: ThreadPoolExecutor, url: str, base_params: Dict
+    ) -> List[Dict]:
+        """
+        Загрузить все страницы /specifications
+
+        Первая страница сообщает meta.total, после чего остальные страницы
+        запрашиваются параллельно через executor. Если total неизвестен,
+        страницы читаются последовательно до неполной страницы.
 
+        Returns:
+            Ответы API по страницам в порядке номеров страниц
+        """
+        page_size = base_params["page[size]"]
+
+        first_page = self._get_json(url, {**base_params, "page[number]": 1})
+        page_payloads = [first_page]
+
+        meta = first_page.get("meta", {})
+        total = meta.get("total") or meta.get("count")
+
+        if total is not None:
+            pages_count = max(1, math.ceil(int(total) / page_size))
+            futures = [
+                executor.submit(self._get_json_in_worker, url, {**base_params, "page[number]": page_number})
+                for page_number in range(2, pages_count + 1)
+            ]
+            # Результаты собираются в порядке страниц, а не в порядке завершения
+            page_payloads.extend(future.result() for future in futures)
+            return page_payloads
+
+        page_number = 1
+        while len(page_payloads[-1].get("data", [])) >= page_size:
+            page_number += 1
+            payload = self._get_json(url, {**base_params, "page[number]": page_number})
+            page_payloads.append(payload)
+
+        return page_payloads
 
     def fetch_specifications(self) -> Dict:
         """
@@ -259,214 +278,100 @@ class PosifloraProductService:
                 ]
             }
         """
-        categories_url = self._build_url("/categories")
-        categories_response = make_request_with_retry(
-            'GET',
-            categories_url,
-            headers=self._get_headers(),
-            timeout=30
-        )
-        categories_payload = categories_response.json()
+        categories_payload, page_payloads = self.fetch_specification_payloads()
+        return self._build_specifications(categories_payload, page_payloads)
 
-        category_name_to_id = {}
-        for cat in categories_payload.get("data", []):
-            cat_title = cat.get("attributes", {}).get("title", "")
-            cat_id = cat.get("id", "")
-            if cat_title and cat_id:
-                category_name_to_id[cat_title] = cat_id
+    def fetch_specification_payloads(self, extra_params: Optional[Dict] = None) -> Tuple[Dict, List[Dict]]:
+        """
+        Загрузить сырые ответы /categories и всех страниц /specifications
 
-        logger.info(f"[FETCH SPECS] Loaded {len(category_name_to_id)} categories: {category_name_to_id}")
+        Args:
+            extra_params: Дополнительные параметры запроса (например, фильтр по дате изменения)
 
+        Returns:
+            (ответ /categories, ответы страниц /specifications)
+        """
+        categories_url = self._build_url("/categories")
         url = self._build_url("/specifications")
-        base_params = {
-            "include": "category,specVariants.variant,specVariants.variant.tags,specVariants.specVariantPrices,images",
-            "filter[activeVariants]": "true",
-            "filter[status]": "on",
-            "page[size]": 100,
-        }
-
-        specifications_data = []
-        included = []
-        page_number = 1
+        base_params = {**SPECIFICATIONS_PARAMS, **(extra_params or {})}
 
-        while True:
-            params = {**base_params, "page[number]": page_number}
-            response = make_request_with_retry(
-                'GET',
-                url,
-                headers=self._get_headers(),
-                params=params,
-                timeout=30
-            )
-            payload = response.json()
+        # Токен получаем заранее, чтобы потоки пула не ходили в БД за сессией
+        get_access_token()
 
-            page_data = payload.get("data", [])
-            page_included = payload.get("included", [])
+        concurrency = max(1, getattr(settings, 'POSIFLORA_FETCH_CONCURRENCY', 4))
 
-            specifications_data.extend(page_data)
-            included.extend(page_included)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='posiflora-fetch') as executor:
+            # /categories загружается параллельно с первой страницей спецификаций
+            categories_future = executor.submit(self._get_json_in_worker, categories_url)
+            page_payloads = self._fetch_specification_pages(executor, url, base_params)
+            categories_payload = categories_future.result()
 
-            logger.info(f"[FETCH SPECS] Page {page_number}: got {len(page_data)} items")
+        capture_payload("specifications", {"categories": categories_payload, "pages": page_payloads})
 
-            meta = payload.get("meta", {})
-            total = meta.get("total") or meta.get("count")
-            if total is not None:
-                if len(specifications_data) >= int(total):
-                    break
-            elif len(page_data) < base_params["page[size]"]:
-                break
+        return categories_payload, page_payloads
 
-            page_number += 1
+    def fetch_specification_payload(self, product_id: str) -> Optional[Dict]:
+        """
+        Загрузить сырой ответ /specifications/{id}
 
-        logger.info(f"[FETCH SPECS] Total specifications: {len(specifications_data)}")
-        logger.info(f"[FETCH SPECS] Total included items: {len(included)}")
+        Returns:
+            Ответ API или None, если спецификация не найдена
+        """
+        url = self._build_url(f"/specifications/{product_id}")
+        try:
+            payload = self._get_json(url, {"include": SPECIFICATIONS_INCLUDE})
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
 
-        included_types = {}
-        for item in included:
-            item_type = item.get("type")
-            included_types[item_type] = included_types.get(item_type, 0) + 1
-        logger.info(f"[FETCH SPECS] Included types: {included_types}")
+        capture_payload("specification", payload, key=product_id)
+        return payload if payload.get("data") else None
 
-        if specifications_data:
-            logger.info(f"[FETCH SPECS] First specification (full): {json.dumps(specifications_data[0], indent=2, ensure_ascii=False)}")
+    def _build_specifications(
+        self, categories_payload: Dict, page_payloads: List[Dict], update_index: bool = True
+    ) -> Dict:
+        """
+        Собрать каталог по категориям из ответов /categories и страниц /specifications
 
-        included_index = {}
-        for item in included:
-            key = (item.get("type"), item.get("id"))
-            included_index[key] = item
+        Args:
+            update_index: Заменить спецификации в индексе товаров результатом.
+                Отключается для частичных выборок (инкрементальная синхронизация).
 
-        categories_dict = defaultdict(list)
+        Returns:
+            Словарь в формате fetch_specifications
+        """
+        category_name_to_id = {}
+        for cat in categories_payload.get("data", []):
+            cat_title = cat.get("attributes", {}).get("title", "")
+            cat_id = cat.get("id", "")
+            if cat_title and cat_id:
+                category_name_to_id[cat_title] = cat_id
 
-        for spec in specifications_data:
-            spec_id = spec.get("id")
-            attributes = spec.get("attributes", {})
-            relationships = spec.get("relationships", {})
+        specifications_data = []
+        included = []
+        for payload in page_payloads:
+            specifications_data.extend(payload.get("data", []))
+            included.extend(payload.get("included", []))
 
-            title = attributes.get("title", "")
-            description = attributes.get("description", "")
+        stats = ParseStats("FETCH SPECS", logger)
+        stats.incr("pages", len(page_payloads))
+        stats.incr("categories", len(category_name_to_id))
+        stats.incr("specs", len(specifications_data))
+        stats.incr("included", len(included))
 
-            logger.info(f"[SPEC {spec_id}] Title: {title}")
-            logger.info(f"[SPEC {spec_id}] Attributes keys: {list(attributes.keys())}")
-            logger.info(f"[SPEC {spec_id}] Relationships keys: {list(relationships.keys())}")
+        resolver = IncludedResolver(included)
+        categories_dict = defaultdict(list)
 
-            category_data = relationships.get("category", {}).get("data")
-            if category_data:
-                category_key = (category_data.get("type"), category_data.get("id"))
-                category_obj = included_index.get(category_key)
-                category_name = category_obj.get("attributes", {}).get("title", "") if category_obj else "Без категории"
-            else:
+        for spec in specifications_data:
+            category_name = resolver.category_title(spec)
+            if category_name is None:
+                stats.incr("uncategorized")
                 category_name = "Без категории"
 
-            logo_rel = relationships.get("logo") or {}
-            logo_data = logo_rel.get("data") or {}
-            main_image_id = logo_data.get("id", "")
-
-            images_rel = relationships.get("images") or {}
-            images_list = images_rel.get("data") or []
-
-            images_data = sorted(
-                images_list,
-                key=lambda img: (img.get("id") if img else "") != main_image_id
-            )
-
-            logger.info(f"[SPEC {spec_id}] Images in relationships: {images_data}")
-
-            image_urls = []
-            for img_ref in images_data:
-                img_key = (img_ref.get("type"), img_ref.get("id"))
-                img_obj = included_index.get(img_key)
-                logger.info(f"[SPEC {spec_id}] Looking for image {img_key}, found: {img_obj is not None}")
-                if img_obj:
-                    img_attrs = img_obj.get("attributes", {})
-                    logger.info(f"[SPEC {spec_id}] Image attributes: {img_attrs}")
-                    img_url = img_attrs.get("file") or img_attrs.get("fileMedium") or img_attrs.get("fileShop")
-                    if img_url:
-                        image_urls.append(img_url)
-
-            logger.info(f"[SPEC {spec_id}] Final image_urls: {image_urls}")
-
-            spec_variants_data = relationships.get("specVariants", {}).get("data", [])
-            variants = []
-
-            for spec_variant_ref in spec_variants_data:
-                spec_variant_key = (spec_variant_ref.get("type"), spec_variant_ref.get("id"))
-                spec_variant_obj = included_index.get(spec_variant_key)
-
-                if not spec_variant_obj:
-                    continue
-
-                spec_variant_rels = spec_variant_obj.get("relationships", {})
-
-                variant_data = spec_variant_rels.get("variant", {}).get("data")
-                if variant_data:
-                    variant_key = (variant_data.get("type"), variant_data.get("id"))
-                    variant_obj = included_index.get(variant_key)
-                    if variant_obj:
-                        size = variant_obj.get("attributes", {}).get("title", "")
-                    else:
-                        continue
-                else:
-                    continue
-
-                spec_variant_prices_data = spec_variant_rels.get("specVariantPrices", {}).get("data", [])
-                price = None
-
-                for price_ref in spec_variant_prices_data:
-                    price_key = (price_ref.get("type"), price_ref.get("id"))
-                    price_obj = included_index.get(price_key)
-                    if price_obj:
-                        price_attrs = price_obj.get("attributes", {})
-                        if price_attrs.get("status") == "on":
-                            price = price_attrs.get("priceValue") or price_attrs.get("compositionPrice")
-                            break
-
-                if price is not None and size:
-                    variants.append({
-                        "size": size,
-                        "price": price
-                    })
-
-            product_dict = {
-                "id": spec_id,
-                "title": title,
-                "description": description,
-                "image_urls": image_urls
-            }
-
-            if variants:
-                product_dict["variants"] = sorted(
-                    variants,
-                    key=lambda v: SIZE_ORDER.get(v["size"], 999)
-                )
-            else:
-                min_price = attributes.get("minPrice")
-                max_price = attributes.get("maxPrice")
-                if min_price is not None or max_price is not None:
-                    product_dict["price"] = min_price if min_price is not None else (max_price or 0)
-
+            product_dict = self._parse_specification(spec, resolver, logo_first=True, stats=stats)
             categories_dict[category_name].append(product_dict)
 
-        def get_product_price(product):
-            if "variants" in product:
-                return max(v["price"] for v in product["variants"])
-            return product.get("price") or 0
-
-        CATEGORY_ORDER = [
-            "сборные букеты",
-            "моно/дуо-букеты",
-            "композиции",
-            "вазы",
-            "свечи/ароматы",
-            "аксессуары",
-        ]
-
-        def category_sort_key(item):
-            name_lower = item["name"].lower()
-            for i, ordered_name in enumerate(CATEGORY_ORDER):
-                if name_lower == ordered_name:
-                    return i
-            return len(CATEGORY_ORDER)
-
         result_categories = [
             {
                 "id": category_name_to_id.get(category_name, ""),
@@ -477,6 +382,13 @@ class PosifloraProductService:
         ]
 
         result_categories.sort(key=category_sort_key)
+        stats.log_summary()
+
+        if update_index:
+            product_index.update(
+                product_index.SOURCE_SPECIFICATIONS,
+                (product for category in result_categories for product in category["products"])
+            )
 
         return {"categories": result_categories}
 
@@ -491,116 +403,69 @@ class PosifloraProductService:
             Словарь с данными продукта
 
         Raises:
-            ValueError: Если data отсутствует или равен null
+            MissingSpecificationData: Если data отсутствует или равен null
         """
         spec = payload.get("data")
 
         if spec is None:
-            raise ValueError("Invalid API response: 'data' is null or missing")
-        included = payload.get("included", [])
+            raise MissingSpecificationData("Invalid API response: 'data' is null or missing")
 
-        logger.info(f"[PARSE RESPONSE] Total included items: {len(included)}")
+        resolver = IncludedResolver(payload.get("included", []))
 
+        stats = ParseStats("PARSE RESPONSE", logger)
+        stats.incr("included", len(resolver))
+
+        product_dict = self._parse_specification(spec, resolver, stats=stats)
+
+        if not product_dict["images"]:
+            stats.incr("logo_fallbacks")
+            product_dict["images"] = logo_entries(spec.get("attributes", {}))
+            product_dict["image_urls"] = full_image_urls(product_dict["images"])
+
+        stats.log_summary()
+        return product_dict
+
+    def _parse_specification(
+        self,
+        spec: Dict,
+        resolver: IncludedResolver,
+        logo_first: bool = False,
+        stats: Optional[ParseStats] = None,
+    ) -> Dict:
+        """
+        Разобрать спецификацию в формат CategoryProductSerializer
+
+        Args:
+            spec: Объект спецификации из data
+            resolver: Индекс included того же payload
+            logo_first: Поставить главное изображение первым
+            stats: Счетчики текущего разбора
+        """
         spec_id = spec.get("id")
         attributes = spec.get("attributes", {})
-        relationships = spec.get("relationships", {})
-
-        title = attributes.get("title", "")
-        description = attributes.get("description", "")
-
-        logger.info(f"[SINGLE SPEC {spec_id}] Title: {title}")
-        logger.info(f"[SINGLE SPEC {spec_id}] Attributes keys: {list(attributes.keys())}")
-        logger.info(f"[SINGLE SPEC {spec_id}] Relationships keys: {list(relationships.keys())}")
-
-        included_index = {}
-        for item in included:
-            key = (item.get("type"), item.get("id"))
-            included_index[key] = item
-
-        images_data = relationships.get("images", {}).get("data", [])
-        logger.info(f"[SINGLE SPEC {spec_id}] Images in relationships: {images_data}")
-
-        image_urls = []
-        for img_ref in images_data:
-            img_key = (img_ref.get("type"), img_ref.get("id"))
-            img_obj = included_index.get(img_key)
-            logger.info(f"[SINGLE SPEC {spec_id}] Looking for image {img_key}, found: {img_obj is not None}")
-            if img_obj:
-                img_attrs = img_obj.get("attributes", {})
-                logger.info(f"[SINGLE SPEC {spec_id}] Image attributes: {img_attrs}")
-                img_url = img_attrs.get("file") or img_attrs.get("fileMedium") or img_attrs.get("fileShop")
-                if img_url:
-                    image_urls.append(img_url)
-
-        if not image_urls:
-            logger.info(f"[SINGLE SPEC {spec_id}] No images from relationships, checking attributes")
-            logger.info(f"[SINGLE SPEC {spec_id}] logo: {attributes.get('logo')}")
-            logger.info(f"[SINGLE SPEC {spec_id}] logoMedium: {attributes.get('logoMedium')}")
-            logger.info(f"[SINGLE SPEC {spec_id}] logoShop: {attributes.get('logoShop')}")
-
-            if attributes.get("logo"):
-                image_urls.append(attributes["logo"])
-            if attributes.get("logoMedium"):
-                image_urls.append(attributes["logoMedium"])
-            if attributes.get("logoShop"):
-                image_urls.append(attributes["logoShop"])
-
-        logger.info(f"[SINGLE SPEC {spec_id}] Final image_urls: {image_urls}")
-
-        spec_variants_data = relationships.get("specVariants", {}).get("data", [])
-        variants = []
-
-        for spec_variant_ref in spec_variants_data:
-            spec_variant_key = (spec_variant_ref.get("type"), spec_variant_ref.get("id"))
-            spec_variant_obj = included_index.get(spec_variant_key)
-
-            if not spec_variant_obj:
-                continue
-
-            spec_variant_rels = spec_variant_obj.get("relationships", {})
-
-            variant_data = spec_variant_rels.get("variant", {}).get("data")
-            if variant_data:
-                variant_key = (variant_data.get("type"), variant_data.get("id"))
-                variant_obj = included_index.get(variant_key)
-                if variant_obj:
-                    size = variant_obj.get("attributes", {}).get("title", "")
-                else:
-                    continue
-            else:
-                continue
-
-            spec_variant_prices_data = spec_variant_rels.get("specVariantPrices", {}).get("data", [])
-            price = None
-
-            for price_ref in spec_variant_prices_data:
-                price_key = (price_ref.get("type"), price_ref.get("id"))
-                price_obj = included_index.get(price_key)
-                if price_obj:
-                    price_attrs = price_obj.get("attributes", {})
-                    if price_attrs.get("status") == "on":
-                        price = price_attrs.get("priceValue") or price_attrs.get("compositionPrice")
-                        break
-
-            if price is not None and size:
-                variants.append({
-                    "size": size,
-                    "price": price
-                })
+
+        images = resolver.image_entries(spec, logo_first=logo_first)
 
         product_dict = {
             "id": spec_id,
-            "title": title,
-            "description": description,
-            "image_urls": image_urls
+            "title": attributes.get("title", ""),
+            "description": attributes.get("description", ""),
+            "image_urls": full_image_urls(images),
+            "images": images,
         }
 
-        if variants:
-            sorted_variants = sorted(
-                variants,
-                key=lambda v: SIZE_ORDER.get(v["size"], 999)
+        variants = resolver.size_variants(spec)
+
+        if stats is not None:
+            stats.incr("images", len(images))
+            stats.incr("variants", len(variants))
+            stats.debug(
+                "[SPEC %s] %s: image_urls=%s variants=%s",
+                spec_id, product_dict["title"], product_dict["image_urls"], variants
             )
-            product_dict["variants"] = sorted_variants
+
+        if variants:
+            product_dict["variants"] = variants
         else:
             min_price = attributes.get("minPrice")
             max_price = attributes.get("maxPrice")
@@ -638,73 +503,55 @@ class PosifloraProductService:
                 "image_urls": ["url1"],
                 "price": 4500
             }
-        """
-        logger.info(f"[GET SPEC BY ID] Requesting product_id: {product_id}")
-
-        try:
-            url = self._build_url(f"/specifications/{product_id}")
-            params = {
-                "include": "category,specVariants.variant,specVariants.variant.tags,specVariants.specVariantPrices,images",
-            }
-
-            response = make_request_with_retry(
-                'GET',
-                url,
-                headers=self._get_headers(),
-                params=params,
-                timeout=30
-            )
-            payload = response.json()
-            logger.info(f"[GET SPEC BY ID] Received payload keys: {list(payload.keys())}")
-            logger.info(f"[GET SPEC BY ID] Full payload: {json.dumps(payload, indent=2, ensure_ascii=False)}")
 
-            return self._parse_product_response(payload)
+        Raises:
+            ProductNotFound: Товара нет ни в /specifications, ни в /bouquets
+        """
+        if product_index.is_missing(product_id):
+            raise ProductNotFound(product_id)
+
+        # Одновременные запросы одного товара (в том числе из разных воркеров)
+        # делят один запрос к Posiflora и один разобранный результат
+        return single_flight.do(
+            f"specification:{product_id}",
+            lambda: self._load_specification_by_id(product_id),
+            wait=self._specification_read_timeout(product_id),
+        )
 
-        except ValueError:
-            try:
-                bouquets = self.fetch_bouquets()
+    def _specification_read_timeout(self, product_id: str) -> float:
+        url = self._build_url(f"/specifications/{product_id}")
+        return endpoint_read_timeout(url, getattr(settings, 'POSIFLORA_READ_TIMEOUT', 30))
 
-                for bouquet in bouquets:
-                    if bouquet.get("id") == product_id:
-                        return {
-                            "id": bouquet.get("id"),
-                            "title": bouquet.get("title", ""),
-                            "description": bouquet.get("description", ""),
-                            "image_urls": bouquet.get("image_urls", []),
-                            "price": bouquet.get("price", 0)
-                        }
+    def _load_specification_by_id(self, product_id: str) -> Dict:
+        # Ошибки запроса и разбора ответа (в том числе не-JSON) - сбой Posiflora, а не 404
+        payload = self.fetch_specification_payload(product_id)
+        if payload is None:
+            return self._find_bouquet_by_id(product_id)
+        return self._parse_product_response(payload)
 
-                raise RuntimeError(f"Product with id {product_id} not found")
+    def _find_bouquet_by_id(self, product_id: str) -> Dict:
+        """
+        Найти букет по ID через индекс товаров
 
-            except RuntimeError:
-                raise
-            except Exception:
-                raise RuntimeError(f"Product with id {product_id} not found")
+        Полная выгрузка букетов делается только если индекс букетов устарел.
+        Ненайденный ID запоминается, чтобы перебор случайных ID не приводил
+        к повторной выгрузке каталога.
 
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 404:
-                try:
-                    bouquets = self.fetch_bouquets()
-
-                    for bouquet in bouquets:
-                        if bouquet.get("id") == product_id:
-                            return {
-                                "id": bouquet.get("id"),
-                                "title": bouquet.get("title", ""),
-                                "description": bouquet.get("description", ""),
-                                "image_urls": bouquet.get("image_urls", []),
-                                "price": bouquet.get("price", 0)
-                            }
-
-                    raise RuntimeError(f"Product with id {product_id} not found")
+        Raises:
+            ProductNotFound: Если букет не найден
+        """
+        product = product_index.get(product_id, product_index.SOURCE_BOUQUETS)
 
-                except RuntimeError:
-                    raise
-                except Exception:
-                    raise RuntimeError(f"Product with id {product_id} not found")
+        if product is None and not product_index.is_fresh(product_index.SOURCE_BOUQUETS):
+            # Ошибки загрузки (в том числе CircuitOpenError) - это сбой Posiflora, а не 404
+            self.fetch_bouquets()
+            product = product_index.get(product_id, product_index.SOURCE_BOUQUETS)
 
+        if product is None:
+            product_index.mark_missing(product_id)
+            raise ProductNotFound(product_id)
 
-            raise 
+        return product
 
 
 
@@ -0,0 +1,80 @@
+import gzip
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаются только gzip и identity
+    brotli = None
+
+ENCODING_IDENTITY = 'identity'
+ENCODING_GZIP = 'gzip'
+ENCODING_BROTLI = 'br'
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def render_json(data: Any) -> bytes:
+    """JSON-байты в том же виде, что отдает DRF JSONRenderer"""
+    return JSONRenderer().render(data)
+
+
+# Отрендеренные категории последнего снимка: при инкрементальном обновлении
+# заново сериализуются только изменившиеся категории
+_category_fragments: Dict[str, bytes] = {}
+_fragments_lock = threading.Lock()
+
+
+def render_specifications(data: Dict) -> bytes:
+    """
+    JSON каталога, собранный из отрендеренных по отдельности категорий
+
+    Результат побайтово совпадает с рендером CategorizedProductsSerializer.
+    """
+    global _category_fragments
+    from ..serializers import CategorySerializer
+
+    with _fragments_lock:
+        previous = _category_fragments
+        fragments = {}
+        parts = []
+
+        for category in data.get("categories", []):
+            key = hashlib.sha256(
+                json.dumps(category, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+            ).hexdigest()
+            fragment = previous.get(key) or fragments.get(key)
+            if fragment is None:
+                fragment = render_json(CategorySerializer(category).data)
+            fragments[key] = fragment
+            parts.append(fragment)
+
+        _category_fragments = fragments
+
+    return b'{"categories":[' + b",".join(parts) + b"]}"
+
+
+def render_bouquets(data: List[Dict]) -> bytes:
+    from ..serializers import BouquetSerializer
+    return render_json(BouquetSerializer(data, many=True).data)
+
+
+def encode_body(body: bytes) -> Dict[str, bytes]:
+    """
+    Подготовить тело ответа во всех поддерживаемых кодировках
+
+    Returns:
+        {"identity": ..., "gzip": ..., "br": ...} (br - только при установленном brotli)
+    """
+    encoded = {
+        ENCODING_IDENTITY: body,
+        # mtime=0 делает результат детерминированным для одинаковых данных
+        ENCODING_GZIP: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+    }
+    if brotli is not None:
+        encoded[ENCODING_BROTLI] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return encoded
@@ -0,0 +1,200 @@
+import bisect
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"[0-9a-zа-я]+")
+
+# Окончания русских существительных и прилагательных (от длинных к коротким).
+# Глагольные окончания не отбрасываются: в названиях товаров они дают ложные
+# совпадения ("букет" -> "бук").
+RUSSIAN_ENDINGS = sorted([
+    "иями", "ями", "ами", "иях", "иям", "ием", "ией",
+    "ого", "его", "ому", "ему", "ыми", "ими",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ую", "юю",
+    "ых", "их", "ым", "им", "ом", "ем", "ам", "ям", "ах", "ях",
+    "ов", "ев", "ью", "ию", "ия", "ии", "ья",
+    "ы", "и", "а", "я", "о", "е", "у", "ю", "ь", "й",
+], key=len, reverse=True)
+
+MIN_STEM_LENGTH = 3
+
+# Вес совпадения в зависимости от поля товара
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "category": 2.0,
+    "description": 1.0,
+}
+
+
+def stem(word: str) -> str:
+    """Упрощенный стемминг: отбрасывание самого длинного русского окончания"""
+    for ending in RUSSIAN_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Разбить текст на стеммированные термы"""
+    if not text:
+        return []
+    return [stem(token) for token in TOKEN_PATTERN.findall(text.lower().replace("ё", "е"))]
+
+
+class SearchIndex:
+    """
+    In-process инвертированный индекс по спецификациям каталога
+
+    Индексируются название, категория и описание товара. Индекс
+    обновляется инкрементально при смене версии снимка каталога:
+    перетокенизируются только новые и изменившиеся товары, удаленные
+    исключаются из постингов.
+    """
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Tuple[tuple, Dict[str, float]]] = {}
+        self._products: Dict[str, Dict] = {}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._terms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def ensure_version(self, snapshot: Dict) -> None:
+        """Привести индекс к версии снимка (инкрементально)"""
+        if self.version == snapshot["version"]:
+            return
+        with self._lock:
+            if self.version != snapshot["version"]:
+                self.update(snapshot["data"])
+                self.version = snapshot["version"]
+
+    def update(self, data: Dict) -> Dict[str, int]:
+        """
+        Применить новое содержимое каталога
+
+        Returns:
+            Счетчики изменений: added, changed, removed
+        """
+        seen = set()
+        stats = Counter()
+
+        for category in data.get("categories", []):
+            category_name = category.get("name", "")
+            for product in category.get("products", []):
+                product_id = product.get("id")
+                if not product_id or product_id in seen:
+                    continue
+                seen.add(product_id)
+                self._products[product_id] = product
+
+                signature = (product.get("title"), product.get("description"), category_name)
+                current = self._docs.get(product_id)
+                if current is not None and current[0] == signature:
+                    continue
+
+                if current is not None:
+                    self._remove_postings(product_id, current[1])
+                    stats["changed"] += 1
+                else:
+                    stats["added"] += 1
+
+                weights = self._term_weights(*signature)
+                self._docs[product_id] = (signature, weights)
+                for term, weight in weights.items():
+                    self._postings.setdefault(term, {})[product_id] = weight
+
+        for product_id in [pid for pid in self._docs if pid not in seen]:
+            self._remove_postings(product_id, self._docs.pop(product_id)[1])
+            self._products.pop(product_id, None)
+            stats["removed"] += 1
+
+        if stats:
+            self._terms = sorted(self._postings)
+        return dict(stats)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Найти товары по запросу
+
+        Все слова запроса должны совпасть; последнее слово ищется по
+        префиксу, чтобы поиск работал по мере набора. Результаты
+        ранжируются по сумме весов полей с учетом редкости терма (idf).
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # Обновление индекса и поиск не должны пересекаться между потоками
+        with self._lock:
+            return self._search(terms, limit)
+
+    def _search(self, terms: List[str], limit: int) -> List[Dict]:
+        total = max(1, len(self._docs))
+        scores: Optional[Dict[str, float]] = None
+
+        for i, term in enumerate(terms):
+            is_last = i == len(terms) - 1
+            term_scores: Dict[str, float] = {}
+            for matched_term in self._expand(term, prefix=is_last):
+                postings = self._postings[matched_term]
+                idf = math.log(1 + total / len(postings))
+                for product_id, weight in postings.items():
+                    score = weight * idf
+                    if score > term_scores.get(product_id, 0.0):
+                        term_scores[product_id] = score
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    product_id: score + term_scores[product_id]
+                    for product_id, score in scores.items()
+                    if product_id in term_scores
+                }
+            if not scores:
+                return []
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (-item[1], (self._products[item[0]].get("title") or "").lower())
+        )
+        return [self._products[product_id] for product_id, _ in ranked[:limit]]
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [term] if term in self._postings else []
+
+        matched = []
+        position = bisect.bisect_left(self._terms, term)
+        while position < len(self._terms) and self._terms[position].startswith(term):
+            matched.append(self._terms[position])
+            position += 1
+        return matched
+
+    def _remove_postings(self, product_id: str, weights: Dict[str, float]) -> None:
+        for term in weights:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+
+    @staticmethod
+    def _term_weights(title: Optional[str], description: Optional[str], category: Optional[str]) -> Dict[str, float]:
+        weights: Dict[str, float] = {}
+        for field, text in (("title", title), ("category", category), ("description", description)):
+            field_weight = FIELD_WEIGHTS[field]
+            for term in tokenize(text):
+                if field_weight > weights.get(term, 0.0):
+                    weights[term] = field_weight
+        return weights
+
+
+search_index = SearchIndex()
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import pickle
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from apps.common.cache_lock import acache_lock, cache_lock
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.05
+
+
+def _result_ttl() -> int:
+    return getattr(settings, 'POSIFLORA_COALESCE_TTL', 5)
+
+
+def _failure_ttl() -> int:
+    return getattr(settings, 'POSIFLORA_COALESCE_FAILURE_TTL', 1)
+
+
+def _wait_seconds() -> float:
+    return getattr(settings, 'POSIFLORA_COALESCE_WAIT', 10)
+
+
+def _follower_wait(wait: Optional[float]) -> float:
+    """Ожидание ведомого: не дольше POSIFLORA_COALESCE_WAIT и таймаута чтения запроса"""
+    return _wait_seconds() if wait is None else min(_wait_seconds(), wait)
+
+
+def _result_key(key: str) -> str:
+    return f'posiflora:flight:{key}'
+
+
+def _lock_key(key: str) -> str:
+    return f'posiflora:flight:{key}:lock'
+
+
+class SingleFlightTimeout(RuntimeError):
+    """Ведущий воркер не отдал результат за время ожидания"""
+
+
+class _Failure:
+    """Ошибка ведущего воркера, которую ведомые получают из кэша"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def _failure(error: Exception) -> _Failure:
+    # В кэш попадает только ошибка, которую можно восстановить из pickle
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        error = RuntimeError(f'{type(error).__name__}: {error}')
+    return _Failure(error)
+
+
+def _shared_result(result: Any) -> Any:
+    if isinstance(result, _Failure):
+        raise result.error
+    return result
+
+
+class SingleFlight:
+    """
+    Объединение одновременных одинаковых запросов к Posiflora (single-flight)
+
+    Внутри процесса первый вызов с данным ключом выполняет loader, а
+    остальные потоки ждут его Future и получают тот же результат или
+    исключение. Между воркерами запрос выполняет тот, кто захватил
+    короткую блокировку в кэше; он же кладет результат в кэш на
+    POSIFLORA_COALESCE_TTL секунд, а остальные воркеры читают его оттуда.
+    Ошибку ведущий кладет на POSIFLORA_COALESCE_FAILURE_TTL секунд, и
+    ведомые пробрасывают ее, а не повторяют запрос к Posiflora.
+
+    wait - таймаут чтения запроса loader'а: дольше него ведомые не ждут.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Future] = {}
+
+    def do(self, key: str, loader: Callable[[], Any], wait: Optional[float] = None) -> Any:
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._flights[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(_load_shared(key, loader, wait))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+        return future.result()
+
+
+def _load_shared(key: str, loader: Callable[[], Any], wait: Optional[float]) -> Any:
+    """
+    Выполнить loader в одном воркере; остальные ждут результат в кэше
+
+    Raises:
+        SingleFlightTimeout: Ведущий воркер не отдал результат за время ожидания
+    """
+    result = cache.get(_result_key(key))
+    if result is not None:
+        return _shared_result(result)
+
+    with cache_lock(_lock_key(key), timeout=int(_wait_seconds()) + 1) as acquired:
+        if acquired:
+            try:
+                result = loader()
+            except Exception as e:
+                cache.set(_result_key(key), _failure(e), _failure_ttl())
+                raise
+            cache.set(_result_key(key), result, _result_ttl())
+            return result
+
+    deadline = time.monotonic() + _follower_wait(wait)
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        result = cache.get(_result_key(key))
+        if result is not None:
+            return _shared_result(result)
+        if cache.get(_lock_key(key)) is None:
+            break
+
+    logger.debug(f'[SINGLE FLIGHT] No shared result for {key}')
+    raise SingleFlightTimeout(f'No shared result for {key}')
+
+
+class AsyncSingleFlight:
+    """
+    Асинхронный SingleFlight
+
+    Загрузка выполняется в отдельной задаче event loop, а все вызовы с
+    данным ключом ждут ее через asyncio.shield: отмена одного вызова
+    (клиент отключился) не отменяет загрузку и не ломает остальные.
+    """
+
+    def __init__(self):
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]], wait: Optional[float] = None) -> Any:
+        loop = asyncio.get_running_loop()
+        flights = self._flights.setdefault(loop, {})
+
+        task = flights.get(key)
+        if task is None:
+            task = loop.create_task(_aload_shared(key, loader, wait))
+            flights[key] = task
+            task.add_done_callback(lambda done: self._finish(flights, key, done))
+
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finish(flights: Dict[str, asyncio.Task], key: str, task: asyncio.Task) -> None:
+        if flights.get(key) is task:
+            del flights[key]
+        # Ошибку забираем сами: если все вызовы отменены, ее никто не прочитает
+        if not task.cancelled():
+            task.exception()
+
+
+async def _aload_shared(key: str, loader: Callable[[], Awaitable[Any]], wait: Optional[float]) -> Any:
+    result = await cache.aget(_result_key(key))
+    if result is not None:
+        return _shared_result(result)
+
+    async with acache_lock(_lock_key(key), timeout=int(_wait_seconds()) + 1) as acquired:
+        if acquired:
+            try:
+                result = await loader()
+            except Exception as e:
+                await cache.aset(_result_key(key), _failure(e), _failure_ttl())
+                raise
+            await cache.aset(_result_key(key), result, _result_ttl())
+            return result
+
+    deadline = time.monotonic() + _follower_wait(wait)
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        result = await cache.aget(_result_key(key))
+        if result is not None:
+            return _shared_result(result)
+        if await cache.aget(_lock_key(key)) is None:
+            break
+
+    logger.debug(f'[SINGLE FLIGHT] No shared result for {key}')
+    raise SingleFlightTimeout(f'No shared result for {key}')
+
+
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
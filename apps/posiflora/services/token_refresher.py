@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from django.utils import timezone
+from ..models import PosifloraSession
+from .tokens import get_session, token_holder
+
+logger = logging.getLogger(__name__)
+
+
+METRICS_KEY_PREFIX = 'posiflora:token_refresher:'
+
+COUNTER_FIELDS = ('success_count', 'failure_count')
+VALUE_FIELDS = ('last_latency_ms', 'last_success_at', 'last_failure_at', 'last_error', 'last_checked_at')
+
+
+def _metric_key(field: str) -> str:
+    return f'{METRICS_KEY_PREFIX}{field}'
+
+
+def get_refresh_metrics() -> Dict:
+    """
+    Метрики фонового обновления токена (общие для всех воркеров)
+
+    Каждое поле хранится в отдельном ключе: счетчики увеличиваются через
+    cache.incr (атомарно в Redis), остальные поля перезаписываются
+    последним записавшим.
+
+    Returns:
+        Словарь с ключами success_count, failure_count, last_latency_ms,
+        last_success_at, last_failure_at, last_error, last_checked_at
+    """
+    fields = COUNTER_FIELDS + VALUE_FIELDS
+    stored = cache.get_many([_metric_key(field) for field in fields])
+    metrics = {field: stored.get(_metric_key(field)) for field in fields}
+    for field in COUNTER_FIELDS:
+        metrics[field] = metrics[field] or 0
+    return metrics
+
+
+def _increment(field: str) -> None:
+    key = _metric_key(field)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ удален между add и incr
+        cache.add(key, 1, None)
+
+
+def _record(success: bool, latency_ms: Optional[float] = None, error: Optional[str] = None) -> None:
+    now = timezone.now().isoformat()
+
+    if success:
+        _increment('success_count')
+        values = {'last_success_at': now, 'last_latency_ms': latency_ms}
+    else:
+        _increment('failure_count')
+        values = {'last_failure_at': now, 'last_error': error}
+
+    cache.set_many({_metric_key(field): value for field, value in values.items()}, None)
+
+
+def _mark_checked() -> None:
+    cache.set(_metric_key('last_checked_at'), timezone.now().isoformat(), None)
+
+
+def refresh_if_needed(margin_minutes: Optional[int] = None) -> bool:
+    """
+    Обновить сессию заранее, если до истечения осталось меньше margin_minutes
+
+    Срабатывает задолго до PosifloraSession.is_expired (буфер 15 минут),
+    поэтому пользовательские запросы не упираются в обновление токена.
+
+    Returns:
+        True, если сессия была обновлена или создана
+    """
+    if margin_minutes is None:
+        margin_minutes = getattr(settings, 'POSIFLORA_TOKEN_REFRESH_MARGIN_MINUTES', 60)
+
+    session = PosifloraSession.objects.first()
+    _mark_checked()
+
+    if session is not None and session.time_until_expiry() > timedelta(minutes=margin_minutes):
+        return False
+
+    started = time.monotonic()
+    try:
+        stale_token = session.access_token if session else None
+        new_session = get_session(force_refresh=True, stale_token=stale_token)
+    except Exception as e:
+        logger.error(f'[TOKEN REFRESHER] Failed to refresh Posiflora session: {e}')
+        _record(success=False, error=str(e))
+        return False
+
+    latency_ms = round((time.monotonic() - started) * 1000, 1)
+    token_holder.set(new_session)
+    _record(success=True, latency_ms=latency_ms)
+    logger.info(
+        f'[TOKEN REFRESHER] Posiflora session refreshed in {latency_ms} ms, '
+        f'expires at {new_session.expires_at}'
+    )
+    return True
+
+
+class TokenRefresher(threading.Thread):
+    """Фоновый поток, периодически продлевающий сессию Posiflora"""
+
+    def __init__(self, interval: Optional[int] = None):
+        super().__init__(name='posiflora-token-refresher', daemon=True)
+        self.interval = interval or getattr(settings, 'POSIFLORA_TOKEN_REFRESH_INTERVAL', 300)
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            close_old_connections()
+            try:
+                refresh_if_needed()
+            except Exception as e:
+                logger.error(f'[TOKEN REFRESHER] Unexpected error: {e}')
+            finally:
+                connection.close()
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_refresher: Optional[TokenRefresher] = None
+_refresher_lock = threading.Lock()
+
+
+def start_token_refresher() -> TokenRefresher:
+    """Запустить фоновое обновление токена в текущем процессе (однократно)"""
+    global _refresher
+
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = TokenRefresher()
+            _refresher.start()
+        return _refresher
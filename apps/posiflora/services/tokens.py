@@ -1,13 +1,74 @@
 import requests
+import threading
 import time
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.common.cache_lock import cache_lock
 from ..models import PosifloraSession
+from .client import get_client
 
 logger = logging.getLogger(__name__)
 
 
+SESSION_LOCK_KEY = 'posiflora:session:lock'
+SESSION_LOCK_TIMEOUT = 60
+SESSION_LOCK_WAIT_SECONDS = 15
+
+
+class TokenHolder:
+    """
+    Process-local кэш access token Posiflora
+
+    Держит токен и время истечения в памяти, чтобы не читать
+    PosifloraSession из БД перед каждым запросом к API.
+    """
+
+    def __init__(self, buffer_minutes: int = 15):
+        self.buffer = timedelta(minutes=buffer_minutes)
+        self._lock = threading.Lock()
+        self._access_token: Optional[str] = None
+        self._expires_at: Optional[datetime] = None
+
+    def get(self) -> Optional[str]:
+        """Токен из памяти или None, если его нет или он скоро истечет"""
+        with self._lock:
+            if not self._access_token or not self._expires_at:
+                return None
+            if timezone.now() >= self._expires_at - self.buffer:
+                return None
+            return self._access_token
+
+    def set(self, session: PosifloraSession) -> None:
+        with self._lock:
+            self._access_token = session.access_token
+            self._expires_at = session.expires_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._access_token = None
+            self._expires_at = None
+
+
+token_holder = TokenHolder()
+
+
+def _parse_expire_at(expire_at) -> datetime:
+    """Разобрать expireAt из ответа Posiflora (по умолчанию +24 часа)"""
+    if expire_at and isinstance(expire_at, str):
+        try:
+            expires_at = datetime.fromisoformat(expire_at)
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=dt_timezone.utc)
+            return expires_at
+        except ValueError:
+            pass
+    return timezone.now() + timedelta(hours=24)
+
+
 def create_new_session() -> PosifloraSession:
     """
     Создать новую сессию Posiflora через API
@@ -18,10 +79,6 @@ def create_new_session() -> PosifloraSession:
     Raises:
         RuntimeError: Если не удалось создать сессию
     """
-    from django.conf import settings
-    from datetime import datetime, timedelta
-    from django.utils import timezone
-
     username = getattr(settings, 'POSIFLORA_USER', None)
     password = getattr(settings, 'POSIFLORA_PASSWORD', None)
 
@@ -41,7 +98,7 @@ def create_new_session() -> PosifloraSession:
     logger.info('Creating new Posiflora session...')
 
     try:
-        response = requests.post(
+        response = get_client().post(
             sessions_url,
             headers={
                 'Content-Type': 'application/vnd.api+json',
@@ -70,23 +127,16 @@ def create_new_session() -> PosifloraSession:
         if not access_token or not refresh_token:
             raise RuntimeError('Invalid response from Posiflora API (missing tokens)')
 
-        if expire_at and isinstance(expire_at, str):
-            try:
-                expires_at = datetime.fromisoformat(expire_at)
-                if expires_at.tzinfo is None:
-                    expires_at = timezone.make_aware(expires_at, timezone.utc)
-            except (ValueError, AttributeError):
-                expires_at = timezone.now() + timedelta(hours=24)
-        else:
-            expires_at = timezone.now() + timedelta(hours=24)
-
-        PosifloraSession.objects.all().delete()
-
-        session = PosifloraSession.objects.create(
-            access_token=access_token,
-            refresh_token=refresh_token,
-            expires_at=expires_at,
-        )
+        expires_at = _parse_expire_at(expire_at)
+
+        with transaction.atomic():
+            PosifloraSession.objects.all().delete()
+
+            session = PosifloraSession.objects.create(
+                access_token=access_token,
+                refresh_token=refresh_token,
+                expires_at=expires_at,
+            )
 
         logger.info('New Posiflora session created successfully')
         return session
@@ -96,12 +146,53 @@ def create_new_session() -> PosifloraSession:
         raise RuntimeError(f'Failed to create Posiflora session: {e}') from e
 
 
-def get_session(force_refresh: bool = False) -> PosifloraSession:
+def _needs_renewal(
+    session: Optional[PosifloraSession],
+    force_refresh: bool,
+    stale_token: Optional[str],
+) -> bool:
+    if session is None:
+        return True
+    if force_refresh:
+        # Токен уже обновлен другим воркером - повторно не обновляем
+        return stale_token is None or session.access_token == stale_token
+    return session.is_expired()
+
+
+def _renew_session(session: Optional[PosifloraSession], max_retries: int = 3) -> PosifloraSession:
+    if session is None:
+        logger.info('No Posiflora session found, creating new one...')
+        return create_new_session()
+
+    try:
+        return refresh_session(session, max_retries=max_retries)
+    except RuntimeError as e:
+        if 'Refresh token истек' in str(e):
+            logger.warning('Refresh token expired, creating new session...')
+            return create_new_session()
+        raise
+
+
+def get_session(
+    force_refresh: bool = False,
+    stale_token: Optional[str] = None,
+    blocking: bool = True,
+    max_retries: int = 3,
+) -> PosifloraSession:
     """
     Получить актуальную сессию Posiflora с автоматическим созданием при необходимости
 
+    Обновление и создание сессии выполняются под межпроцессной блокировкой,
+    поэтому несколько gunicorn-воркеров не обновляют токен одновременно:
+    остальные дожидаются результата и читают новую сессию из БД.
+
     Args:
         force_refresh: Принудительно обновить сессию, даже если не истекла
+        stale_token: Токен, получивший 401; если в БД уже другой токен,
+            повторное обновление не выполняется
+        blocking: Ждать, пока другой процесс обновляет сессию. Без ожидания
+            возвращается текущая сессия, если ее токен еще не истек
+        max_retries: Количество попыток refresh (с паузами между ними)
 
     Returns:
         Актуальная сессия
@@ -110,21 +201,60 @@ def get_session(force_refresh: bool = False) -> PosifloraSession:
         RuntimeError: Если не удалось получить/создать сессию
     """
     session = PosifloraSession.objects.first()
+    if not _needs_renewal(session, force_refresh, stale_token):
+        return session
 
-    if not session:
-        logger.info('No Posiflora session found, creating new one...')
-        return create_new_session()
+    deadline = time.monotonic() + SESSION_LOCK_WAIT_SECONDS
 
-    if force_refresh or session.is_expired():
-        try:
-            session = refresh_session(session)
-        except RuntimeError as e:
-            if 'Refresh token истек' in str(e):
-                logger.warning('Refresh token expired, creating new session...')
-                return create_new_session()
-            raise
+    while True:
+        with cache_lock(SESSION_LOCK_KEY, timeout=SESSION_LOCK_TIMEOUT) as acquired:
+            if acquired:
+                session = PosifloraSession.objects.first()
+                if not _needs_renewal(session, force_refresh, stale_token):
+                    return session
+                return _renew_session(session, max_retries=max_retries)
+
+        if not blocking:
+            # Сессию обновляет другой процесс; токен с буфером до истечения еще рабочий
+            if session is not None and session.time_until_expiry().total_seconds() > 0:
+                return session
+            raise RuntimeError('Posiflora session renewal is in progress')
+
+        if time.monotonic() >= deadline:
+            raise RuntimeError('Timed out waiting for Posiflora session renewal')
 
-    return session
+        time.sleep(0.1)
+
+        session = PosifloraSession.objects.first()
+        if not _needs_renewal(session, force_refresh, stale_token):
+            return session
+
+
+def get_access_token(force_refresh: bool = False, stale_token: Optional[str] = None) -> str:
+    """
+    Получить access token, по возможности без обращения к БД
+
+    Args:
+        force_refresh: Токен отклонен API (401), нужно перечитать/обновить сессию
+        stale_token: Отклоненный токен
+
+    Returns:
+        Актуальный access token
+    """
+    if not force_refresh:
+        access_token = token_holder.get()
+        if access_token:
+            return access_token
+
+    # Путь пользовательского запроса: без ожидания чужой блокировки и без пауз между retry
+    session = get_session(
+        force_refresh=force_refresh,
+        stale_token=stale_token,
+        blocking=False,
+        max_retries=1,
+    )
+    token_holder.set(session)
+    return session.access_token
 
 
 def make_request_with_retry(
@@ -140,7 +270,7 @@ def make_request_with_retry(
         method: HTTP метод (GET, POST, etc.)
         url: URL для запроса
         headers: Заголовки запроса
-        **kwargs: Дополнительные параметры для requests
+        **kwargs: Дополнительные параметры для requests (timeout по умолчанию из настроек клиента)
 
     Returns:
         Response объект
@@ -148,21 +278,22 @@ def make_request_with_retry(
     Raises:
         RuntimeError: Если запрос провалился после retry
     """
-    session = get_session()
+    access_token = get_access_token()
 
     if headers is None:
         headers = {}
-    headers['Authorization'] = f'Bearer {session.access_token}'
+    headers['Authorization'] = f'Bearer {access_token}'
 
-    response = requests.request(method, url, headers=headers, **kwargs)
+    response = get_client().request(method, url, headers=headers, **kwargs)
 
     if response.status_code == 401:
         logger.info('Токен истек во время запроса, обновляем сессию...')
 
-        session = get_session(force_refresh=True)
-        headers['Authorization'] = f'Bearer {session.access_token}'
+        token_holder.clear()
+        access_token = get_access_token(force_refresh=True, stale_token=access_token)
+        headers['Authorization'] = f'Bearer {access_token}'
 
-        response = requests.request(method, url, headers=headers, **kwargs)
+        response = get_client().request(method, url, headers=headers, **kwargs)
 
     response.raise_for_status()
     return response
@@ -186,7 +317,7 @@ def refresh_session(session: PosifloraSession, max_retries: int = 3) -> Posiflor
 
     for attempt in range(max_retries):
         try:
-            response = requests.patch(
+            response = get_client().patch(
                 'https://floricraft.posiflora.com/api/v1/sessions',
                 headers={
                     'Content-Type': 'application/vnd.api+json',
@@ -212,7 +343,7 @@ def refresh_session(session: PosifloraSession, max_retries: int = 3) -> Posiflor
                 session.refresh_token
             )
 
-            session.expires_at = data.get('expireAt') or data.get('expireAT')
+            session.expires_at = _parse_expire_at(data.get('expireAt') or data.get('expireAT'))
 
             session.save()
 
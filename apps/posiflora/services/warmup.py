@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from typing import Dict
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+STATUS_DISABLED = 'disabled'
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+
+# Статусы, при которых процесс принимает трафик. После исчерпания попыток
+# процесс тоже готов: каталог отдается из устаревшего снимка или загружается
+# по запросу, а недоступность Posiflora не должна выводить воркеры из ротации.
+READY_STATUSES = (STATUS_DISABLED, STATUS_READY, STATUS_FAILED)
+
+_state_lock = threading.Lock()
+_state: Dict = {
+    'status': STATUS_DISABLED,
+    'attempts': 0,
+    'started_at': None,
+    'finished_at': None,
+    'error': None,
+}
+
+
+def _update_state(**changes) -> None:
+    with _state_lock:
+        _state.update(changes)
+
+
+def get_warmup_state() -> Dict:
+    """
+    Состояние прогрева текущего процесса
+
+    Returns:
+        Словарь status, attempts, started_at, finished_at, error и ready.
+        Прогрев, идущий дольше POSIFLORA_WARMUP_TIMEOUT, считается
+        завершенным, чтобы зависший Posiflora не блокировал готовность.
+    """
+    with _state_lock:
+        state = dict(_state)
+
+    timeout = getattr(settings, 'POSIFLORA_WARMUP_TIMEOUT', 60)
+    timed_out = (
+        state['status'] in (STATUS_PENDING, STATUS_RUNNING)
+        and state['started_at'] is not None
+        and time.time() - state['started_at'] > timeout
+    )
+
+    state['timed_out'] = timed_out
+    state['ready'] = state['status'] in READY_STATUSES or timed_out
+    return state
+
+
+def warm_up_catalog() -> None:
+    """
+    Загрузить снимки каталога и заполнить индексы процесса
+
+    Снимки берутся из общего кэша; если их там нет, строит их один воркер,
+    остальные дожидаются результата (CatalogCache). Затем из снимков
+    заполняются индекс товаров по ID, индекс фильтрации и поисковый индекс.
+    """
+    from .catalog_cache import bouquets_cache, specifications_cache
+    from .catalog_query import get_query_index
+    from .product_index import product_index
+    from .products import PosifloraProductService
+    from .search import search_index
+
+    specifications = specifications_cache.get_snapshot()
+    bouquets = bouquets_cache.get_snapshot()
+
+    product_index.update(
+        product_index.SOURCE_SPECIFICATIONS,
+        (product for category in specifications['data'].get('categories', []) for product in category['products'])
+    )
+    product_index.update(
+        product_index.SOURCE_BOUQUETS,
+        (PosifloraProductService._bouquet_to_product(bouquet) for bouquet in bouquets['data'])
+    )
+
+    get_query_index(specifications_cache.name, specifications)
+    search_index.ensure_version(specifications)
+
+
+def _run_warmup() -> None:
+    from .tokens import get_session
+
+    attempts = max(1, getattr(settings, 'POSIFLORA_WARMUP_ATTEMPTS', 3))
+    delay = getattr(settings, 'POSIFLORA_WARMUP_RETRY_DELAY', 5)
+
+    _update_state(status=STATUS_RUNNING)
+
+    try:
+        for attempt in range(1, attempts + 1):
+            _update_state(attempts=attempt)
+            try:
+                get_session()
+            except Exception as e:
+                # Без сессии каталог еще может прийти из общего кэша или локальных таблиц
+                logger.warning(f'[WARMUP] Posiflora session is not available: {e}')
+
+            try:
+                warm_up_catalog()
+            except Exception as e:
+                logger.warning(f'[WARMUP] Attempt {attempt}/{attempts} failed: {e}')
+                _update_state(error=str(e))
+                if attempt < attempts:
+                    time.sleep(delay * attempt)
+                continue
+
+            _update_state(status=STATUS_READY, finished_at=time.time(), error=None)
+            logger.info(f'[WARMUP] Catalog warmed up in {attempt} attempt(s)')
+            return
+
+        _update_state(status=STATUS_FAILED, finished_at=time.time())
+        logger.error('[WARMUP] Catalog warm-up failed, serving without warm caches')
+    finally:
+        connection.close()
+
+
+def start_catalog_warmup() -> threading.Thread:
+    """Запустить прогрев каталога в фоновом потоке (не блокирует старт воркера)"""
+    _update_state(status=STATUS_PENDING, attempts=0, started_at=time.time(), finished_at=None, error=None)
+
+    thread = threading.Thread(target=_run_warmup, name='posiflora-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,184 @@
+from django.test import SimpleTestCase
+from apps.posiflora.services.jsonapi import IncludedResolver
+from apps.posiflora.services.products import PosifloraProductService
+
+CATEGORIES_PAYLOAD = {
+    "data": [
+        {"type": "categories", "id": "cat-1", "attributes": {"title": "Сборные букеты"}},
+        {"type": "categories", "id": "cat-2", "attributes": {"title": "Моно/дуо-букеты"}},
+    ]
+}
+
+
+def spec_variant(spec_id: str, size: str, prices) -> list:
+    """specVariant со связанными variant и specVariantPrices: [(status, priceValue), ...]"""
+    sv_id = f"{spec_id}-sv-{size}"
+    price_refs = [{"type": "specVariantPrices", "id": f"{sv_id}-price-{n}"} for n in range(len(prices))]
+    return [
+        {
+            "type": "specVariants",
+            "id": sv_id,
+            "relationships": {
+                "variant": {"data": {"type": "variants", "id": f"variant-{size}"}},
+                "specVariantPrices": {"data": price_refs},
+            },
+        },
+        *(
+            {"type": "specVariantPrices", "id": ref["id"], "attributes": {"status": status, "priceValue": value}}
+            for ref, (status, value) in zip(price_refs, prices)
+        ),
+    ]
+
+
+def specifications_page() -> dict:
+    """
+    Страница /specifications в формате JSON:API
+
+    spec-1 - варианты в included в порядке L, S, M, у S сначала выключенная
+    цена, логотип - второе изображение; spec-2 - без вариантов и изображений,
+    только minPrice и logo* атрибуты.
+    """
+    included = [
+        {"type": "categories", "id": "cat-1", "attributes": {"title": "Сборные букеты"}},
+        {"type": "categories", "id": "cat-2", "attributes": {"title": "Моно/дуо-букеты"}},
+        *({"type": "variants", "id": f"variant-{size}", "attributes": {"title": size}} for size in "SML"),
+        {"type": "images", "id": "img-1", "attributes": {
+            "file": "https://cdn.example.com/1.jpg",
+            "fileMedium": "https://cdn.example.com/1_medium.jpg",
+        }},
+        {"type": "images", "id": "img-2", "attributes": {"file": "http://cdn.example.com/2.jpg"}},
+        *spec_variant("spec-1", "L", [("on", 5200)]),
+        *spec_variant("spec-1", "S", [("off", 1), ("on", 4050)]),
+        *spec_variant("spec-1", "M", [("on", 3150)]),
+    ]
+
+    data = [
+        {
+            "type": "specifications",
+            "id": "spec-1",
+            "attributes": {"title": "Букет Максим", "description": "Авторский", "minPrice": 3150},
+            "relationships": {
+                "category": {"data": {"type": "categories", "id": "cat-1"}},
+                "logo": {"data": {"type": "images", "id": "img-2"}},
+                "images": {"data": [
+                    {"type": "images", "id": "img-1"},
+                    {"type": "images", "id": "img-2"},
+                    {"type": "images", "id": "img-missing"},
+                ]},
+                "specVariants": {"data": [
+                    {"type": "specVariants", "id": f"spec-1-sv-{size}"} for size in "LSM"
+                ]},
+            },
+        },
+        {
+            "type": "specifications",
+            "id": "spec-2",
+            "attributes": {
+                "title": "Ваза",
+                "description": "",
+                "minPrice": 3000,
+                "logo": "//cdn.example.com/logo.jpg",
+            },
+            "relationships": {
+                "category": {"data": {"type": "categories", "id": "cat-2"}},
+                "images": {"data": []},
+                "specVariants": {"data": []},
+            },
+        },
+    ]
+    return {"data": data, "included": included}
+
+
+class IncludedResolverTests(SimpleTestCase):
+
+    def setUp(self):
+        page = specifications_page()
+        self.spec, self.vase = page["data"]
+        self.resolver = IncludedResolver(page["included"])
+
+    def test_related_many_skips_missing_references(self):
+        ids = [image["id"] for image in self.resolver.images(self.spec)]
+        self.assertEqual(ids, ["img-1", "img-2"])
+
+    def test_logo_first(self):
+        ids = [image["id"] for image in self.resolver.images(self.spec, logo_first=True)]
+        self.assertEqual(ids, ["img-2", "img-1"])
+
+    def test_size_variants_use_active_price_and_size_order(self):
+        self.assertEqual(
+            self.resolver.size_variants(self.spec),
+            [{"size": "S", "price": 4050}, {"size": "M", "price": 3150}, {"size": "L", "price": 5200}],
+        )
+
+    def test_category_title(self):
+        self.assertEqual(self.resolver.category_title(self.spec), "Сборные букеты")
+        self.assertIsNone(self.resolver.category_title({"relationships": {}}))
+
+
+class ProductParsingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.service = PosifloraProductService()
+        self.page = specifications_page()
+
+    def test_build_specifications(self):
+        result = self.service._build_specifications(CATEGORIES_PAYLOAD, [self.page], update_index=False)
+
+        self.assertEqual(
+            [(category["id"], category["name"]) for category in result["categories"]],
+            [("cat-1", "Сборные букеты"), ("cat-2", "Моно/дуо-букеты")],
+        )
+
+        bouquet = result["categories"][0]["products"][0]
+        self.assertEqual(bouquet["id"], "spec-1")
+        self.assertEqual(bouquet["title"], "Букет Максим")
+        self.assertEqual(
+            bouquet["image_urls"],
+            ["https://cdn.example.com/2.jpg", "https://cdn.example.com/1.jpg"],
+        )
+        self.assertEqual(bouquet["images"][1], {
+            "thumb": "https://cdn.example.com/1_medium.jpg",
+            "medium": "https://cdn.example.com/1_medium.jpg",
+            "full": "https://cdn.example.com/1.jpg",
+        })
+        self.assertEqual([variant["size"] for variant in bouquet["variants"]], ["S", "M", "L"])
+        self.assertNotIn("price", bouquet)
+
+        vase = result["categories"][1]["products"][0]
+        self.assertEqual(vase["price"], 3000)
+        self.assertEqual(vase["images"], [])
+
+    def test_build_specifications_merges_pages(self):
+        first = {"data": self.page["data"][:1], "included": self.page["included"]}
+        second = {"data": self.page["data"][1:], "included": []}
+
+        result = self.service._build_specifications(CATEGORIES_PAYLOAD, [first, second], update_index=False)
+
+        ids = [product["id"] for category in result["categories"] for product in category["products"]]
+        self.assertEqual(ids, ["spec-1", "spec-2"])
+
+    def test_parse_product_response(self):
+        product = self.service._parse_product_response(
+            {"data": self.page["data"][0], "included": self.page["included"]}
+        )
+
+        self.assertEqual(product["id"], "spec-1")
+        # Карточка товара сохраняет порядок изображений из relationships.images
+        self.assertEqual(
+            product["image_urls"],
+            ["https://cdn.example.com/1.jpg", "https://cdn.example.com/2.jpg"],
+        )
+        self.assertEqual(
+            product["variants"],
+            [{"size": "S", "price": 4050}, {"size": "M", "price": 3150}, {"size": "L", "price": 5200}],
+        )
+
+    def test_parse_product_response_falls_back_to_logo(self):
+        product = self.service._parse_product_response({"data": self.page["data"][1], "included": []})
+
+        self.assertEqual(product["image_urls"], ["https://cdn.example.com/logo.jpg"])
+        self.assertEqual(product["price"], 3000)
+
+    def test_parse_product_response_without_data(self):
+        with self.assertRaises(ValueError):
+            self.service._parse_product_response({"data": None})
@@ -1,14 +1,35 @@
 from django.urls import path
 from .views import (
     ProductDetailView,
+    ProductBatchView,
     BouquetListView,
     ProductsInStock,
+    ProductSearchView,
+    CatalogWebhookView,
+    ImageResizeView,
+    ReadinessView,
+)
+from .async_views import (
+    AsyncProductDetailView,
+    AsyncBouquetListView,
+    AsyncProductsInStock,
 )
 
 app_name = 'posiflora'
 
 urlpatterns = [
+    # batch/ объявлен раньше products/<id>/, иначе "batch" совпадет с ID товара
+    path('products/batch/', ProductBatchView.as_view(), name='product-batch'),
     path('products/<str:product_id>/', ProductDetailView.as_view(), name='product-detail'),
     path('bouquets/', BouquetListView.as_view(), name='bouquet-list'),
     path('specifications/', ProductsInStock.as_view(), name='specifications'),
+    path('search/', ProductSearchView.as_view(), name='search'),
+    path('webhook/', CatalogWebhookView.as_view(), name='catalog-webhook'),
+    path('images/resize/', ImageResizeView.as_view(), name='image-resize'),
+    path('ready/', ReadinessView.as_view(), name='ready'),
+
+    # Async-варианты для ASGI (uvicorn / gunicorn -k uvicorn.workers.UvicornWorker)
+    path('async/products/<str:product_id>/', AsyncProductDetailView.as_view(), name='async-product-detail'),
+    path('async/bouquets/', AsyncBouquetListView.as_view(), name='async-bouquet-list'),
+    path('async/specifications/', AsyncProductsInStock.as_view(), name='async-specifications'),
 ]
@@ -1,17 +1,63 @@
+import hmac
+import re
+from django.conf import settings
+from django.http import FileResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
-from .services.products import get_product_service
+from apps.common.cache_lock import CacheLockTimeout
+from .services.products import ProductNotFound, get_product_service
+from .services.catalog_cache import CatalogBuildTimeout, bouquets_cache, find_in_snapshots, specifications_cache
+from .services.catalog_query import get_query_index
+from .services.catalog_sync import enqueue_changed_specifications, process_pending_changes_in_background
+from .services.catalog_store import load_product
+from .services.circuit_breaker import CircuitOpenError
+from .services.image_proxy import ImageProxyError, get_resized_image
+from .services.product_batch import get_products_batch
+from .services.search import search_index
+from .services.warmup import get_warmup_state
+from .http_cache import (
+    conditional_response,
+    data_etag,
+    rendered_response,
+    set_cache_headers,
+    snapshot_etag,
+)
 from .serializers import (
     CategoryProductSerializer,
     ProductSerializer,
     BouquetSerializer,
     CategorizedProductsSerializer,
+    CatalogQuerySerializer,
+    PaginatedProductsSerializer,
+    SearchQuerySerializer,
+    SearchResultsSerializer,
+    ProductBatchRequestSerializer,
+    ProductBatchSerializer,
 )
 
 
+def is_catalog_query(query_params) -> bool:
+    """Запрошена ли фильтрация/пагинация каталога (иначе отдается весь каталог)"""
+    return any(name in query_params for name in CatalogQuerySerializer().fields)
+
+
+# Retry-After для сбоев Posiflora, когда circuit breaker еще не открыт
+UPSTREAM_RETRY_AFTER = 5
+
+
+def unavailable_response(error: Exception) -> Response:
+    """503 без ожидания таймаута, когда Posiflora недоступна и снимка нет"""
+    response = Response(
+        {'error': 'Posiflora is temporarily unavailable', 'detail': str(error)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = str(getattr(error, 'retry_after', UPSTREAM_RETRY_AFTER))
+    return response
+
+
 class ProductDetailView(APIView):
     """
     API endpoint для получения конкретного товара по ID
@@ -54,11 +100,29 @@ class ProductDetailView(APIView):
     )
     def get(self, request, product_id):
         try:
-            service = get_product_service()
-            product = service.get_specification_by_id(product_id)
+            product = load_product(product_id)
+            built_at = None
+            if product is None:
+                service = get_product_service()
+                try:
+                    product = service.get_specification_by_id(product_id)
+                except ProductNotFound:
+                    raise
+                except Exception as e:
+                    # Posiflora недоступна: отдаем карточку из последнего снимка каталога
+                    found = find_in_snapshots(product_id)
+                    if found is None:
+                        return unavailable_response(e)
+                    product, built_at = found
+
+            etag = data_etag(product)
+            not_modified = conditional_response(request, etag, built_at)
+            if not_modified is not None:
+                return not_modified
 
             serializer = CategoryProductSerializer(product)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            return set_cache_headers(response, etag, built_at)
 
         except Exception as e:
             return Response(
@@ -66,6 +130,47 @@ class ProductDetailView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+class ProductBatchView(APIView):
+    """
+    API endpoint для получения нескольких товаров по списку ID
+    """
+
+    @extend_schema(
+        summary="Получить товары по списку ID",
+        description=(
+            "Возвращает товары в формате products/<id>/ одним ответом (до 100 ID). "
+            "Товары берутся из локального каталога, отсутствующие запрашиваются "
+            "в Posiflora параллельно. Ненайденные ID перечисляются в missing"
+        ),
+        request=ProductBatchRequestSerializer,
+        responses={
+            200: ProductBatchSerializer,
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'object'}
+                }
+            }
+        },
+        tags=['Bouquets'],
+        examples=[
+            OpenApiExample(
+                'Request',
+                value={'ids': ['5b53929f-4c56-498e-8b5c-cb369ad6c7bb', 'unknown-id']},
+                request_only=True,
+            ),
+        ]
+    )
+    def post(self, request):
+        query = ProductBatchRequestSerializer(data=request.data)
+        if not query.is_valid():
+            return Response({'error': query.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        products, missing = get_products_batch(query.validated_data['ids'])
+        serializer = ProductBatchSerializer({'products': products, 'missing': missing})
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class BouquetListView(APIView):
     """
     API endpoint для получения всех букетов
@@ -110,12 +215,22 @@ class BouquetListView(APIView):
     )
     def get(self, request):
         try:
-            service = get_product_service()
-            bouquets = service.fetch_bouquets()
+            snapshot = bouquets_cache.get_snapshot()
 
-            serializer = BouquetSerializer(bouquets, many=True)
+            etag = snapshot_etag(snapshot['version'])
+            not_modified = conditional_response(request, etag, snapshot['built_at'])
+            if not_modified is not None:
+                return not_modified
 
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            response = rendered_response(request, snapshot)
+            if response is None:
+                serializer = BouquetSerializer(snapshot['data'], many=True)
+                response = Response(serializer.data, status=status.HTTP_200_OK)
+
+            return set_cache_headers(response, etag, snapshot['built_at'])
+
+        except (CircuitOpenError, CatalogBuildTimeout) as e:
+            return unavailable_response(e)
 
         except Exception as e:
             return Response(
@@ -132,9 +247,31 @@ class ProductsInStock(APIView):
 
     @extend_schema(
         summary="Получить товары с вариантами",
-        description="Возвращает спецификации из Posiflora API с вариантами размеров, сгруппированные по категориям",
+        description=(
+            "Возвращает спецификации из Posiflora API с вариантами размеров, сгруппированные по категориям. "
+            "Если передан хотя бы один параметр фильтрации, возвращается страница товаров "
+            "в формате PaginatedProducts"
+        ),
+        parameters=[
+            OpenApiParameter('category', OpenApiTypes.STR, OpenApiParameter.QUERY, description='ID категории'),
+            OpenApiParameter('price_min', OpenApiTypes.INT, OpenApiParameter.QUERY, description='Минимальная цена'),
+            OpenApiParameter('price_max', OpenApiTypes.INT, OpenApiParameter.QUERY, description='Максимальная цена'),
+            OpenApiParameter('size', OpenApiTypes.STR, OpenApiParameter.QUERY, enum=['S', 'M', 'L'],
+                             description='Только товары с этим размером (цена фильтруется по нему)'),
+            OpenApiParameter('sort', OpenApiTypes.STR, OpenApiParameter.QUERY,
+                             enum=['default', 'price', '-price', 'title'], description='Сортировка'),
+            OpenApiParameter('page', OpenApiTypes.INT, OpenApiParameter.QUERY, description='Номер страницы'),
+            OpenApiParameter('page_size', OpenApiTypes.INT, OpenApiParameter.QUERY,
+                             description='Размер страницы (до 100)'),
+        ],
         responses={
             200: CategorizedProductsSerializer,
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'object'}
+                }
+            },
             500: {
                 'type': 'object',
                 'properties': {
@@ -182,15 +319,265 @@ class ProductsInStock(APIView):
     )
     def get(self, request):
         try:
-            service = get_product_service()
-            specifications_data = service.fetch_specifications()
+            snapshot = specifications_cache.get_snapshot()
+
+            if is_catalog_query(request.query_params):
+                return self._get_page(request, snapshot)
+
+            etag = snapshot_etag(snapshot['version'])
+            not_modified = conditional_response(request, etag, snapshot['built_at'])
+            if not_modified is not None:
+                return not_modified
 
-            serializer = CategorizedProductsSerializer(specifications_data)
+            response = rendered_response(request, snapshot)
+            if response is None:
+                serializer = CategorizedProductsSerializer(snapshot['data'])
+                response = Response(serializer.data, status=status.HTTP_200_OK)
 
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return set_cache_headers(response, etag, snapshot['built_at'])
+
+        except (CircuitOpenError, CatalogBuildTimeout) as e:
+            return unavailable_response(e)
 
         except Exception as e:
             return Response(
                 {'error': 'Failed to fetch specifications', 'detail': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    def _get_page(self, request, snapshot):
+        query = CatalogQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({'error': query.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = data_etag({'version': snapshot['version'], 'query': query.validated_data})
+        not_modified = conditional_response(request, etag, snapshot['built_at'])
+        if not_modified is not None:
+            return not_modified
+
+        page = get_query_index(specifications_cache.name, snapshot).query(**query.validated_data)
+        serializer = PaginatedProductsSerializer(page)
+
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+        return set_cache_headers(response, etag, snapshot['built_at'])
+
+
+class ProductSearchView(APIView):
+    """
+    API endpoint для полнотекстового поиска по каталогу
+    """
+
+    @extend_schema(
+        summary="Поиск товаров",
+        description=(
+            "Ищет спецификации по названию, категории и описанию с учетом русских словоформ. "
+            "Последнее слово запроса ищется по префиксу"
+        ),
+        parameters=[
+            OpenApiParameter('q', OpenApiTypes.STR, OpenApiParameter.QUERY, required=True,
+                             description='Поисковый запрос'),
+            OpenApiParameter('limit', OpenApiTypes.INT, OpenApiParameter.QUERY,
+                             description='Максимальное количество результатов (до 100)'),
+        ],
+        responses={
+            200: SearchResultsSerializer,
+            400: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'object'}
+                }
+            },
+            500: {
+                'type': 'object',
+                'properties': {
+                    'error': {'type': 'string'},
+                    'detail': {'type': 'string'}
+                }
+            }
+        },
+        tags=['Bouquets'],
+    )
+    def get(self, request):
+        query = SearchQuerySerializer(data=request.query_params)
+        if not query.is_valid():
+            return Response({'error': query.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            snapshot = specifications_cache.get_snapshot()
+
+            etag = data_etag({'version': snapshot['version'], 'query': query.validated_data})
+            not_modified = conditional_response(request, etag, snapshot['built_at'])
+            if not_modified is not None:
+                return not_modified
+
+            search_index.ensure_version(snapshot)
+            products = search_index.search(query.validated_data['q'], limit=query.validated_data['limit'])
+
+            serializer = SearchResultsSerializer({
+                'query': query.validated_data['q'],
+                'count': len(products),
+                'products': products,
+            })
+
+            response = Response(serializer.data, status=status.HTTP_200_OK)
+            return set_cache_headers(response, etag, snapshot['built_at'])
+
+        except (CircuitOpenError, CatalogBuildTimeout) as e:
+            return unavailable_response(e)
+
+        except Exception as e:
+            return Response(
+                {'error': 'Failed to search products', 'detail': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+WEBHOOK_MAX_IDS = 500
+# ID попадает в путь URL Posiflora и в имя файла capture_payload
+WEBHOOK_ID_PATTERN = re.compile(r'[0-9A-Za-z-]{1,64}')
+
+
+def webhook_specification_ids(payload) -> list:
+    """
+    ID спецификаций из уведомления Posiflora
+
+    Поддерживаются JSON:API {"data": {"type": "specifications", "id": ...}}
+    (или список таких объектов) и упрощенный формат {"ids": [...]}.
+
+    Raises:
+        ValueError: ID не похож на ID Posiflora
+    """
+    if not isinstance(payload, dict):
+        return []
+
+    if isinstance(payload.get('ids'), list):
+        ids = payload['ids']
+    else:
+        data = payload.get('data')
+        resources = data if isinstance(data, list) else [data]
+        ids = [
+            resource.get('id')
+            for resource in resources
+            if isinstance(resource, dict) and resource.get('type', 'specifications') == 'specifications'
+        ]
+
+    product_ids = list(dict.fromkeys(str(product_id) for product_id in ids if product_id))[:WEBHOOK_MAX_IDS]
+    for product_id in product_ids:
+        if not WEBHOOK_ID_PATTERN.fullmatch(product_id):
+            raise ValueError(f'Invalid specification id: {product_id[:64]!r}')
+    return product_ids
+
+
+class CatalogWebhookView(APIView):
+    """
+    Уведомления Posiflora об изменении спецификаций
+
+    ID ставятся в очередь инкрементальной синхронизации, обработка идет
+    в фоне, поэтому ответ 202 возвращается сразу.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(exclude=True)
+    def post(self, request):
+        secret = getattr(settings, 'POSIFLORA_WEBHOOK_SECRET', None)
+        # Только заголовок: параметр URL попал бы в логи доступа, прокси и Referer
+        provided = request.headers.get('X-Posiflora-Secret') or ''
+
+        if not secret or not hmac.compare_digest(provided.encode(), secret.encode()):
+            return Response({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            product_ids = webhook_specification_ids(request.data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not product_ids:
+            return Response({'error': 'No specification ids in payload'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            enqueue_changed_specifications(product_ids)
+        except CacheLockTimeout:
+            # Posiflora повторит уведомление, ID не теряются
+            response = Response({'error': 'Queue is busy'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = '5'
+            return response
+        process_pending_changes_in_background()
+
+        return Response({'queued': len(product_ids)}, status=status.HTTP_202_ACCEPTED)
+
+
+class ImageResizeView(APIView):
+    """
+    API endpoint для уменьшенных копий изображений Posiflora
+
+    Работает только при POSIFLORA_IMAGE_PROXY_ENABLED и установленном Pillow.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(
+        summary="Уменьшенное изображение товара",
+        description="Возвращает JPEG-копию изображения Posiflora заданной ширины из дискового кэша",
+        parameters=[
+            OpenApiParameter('url', OpenApiTypes.URI, OpenApiParameter.QUERY, required=True,
+                             description='URL изображения Posiflora'),
+            OpenApiParameter('w', OpenApiTypes.INT, OpenApiParameter.QUERY, required=True,
+                             enum=[160, 320, 640, 960], description='Ширина в пикселях'),
+        ],
+        responses={(200, 'image/jpeg'): OpenApiTypes.BINARY},
+        tags=['Bouquets'],
+    )
+    def get(self, request):
+        try:
+            width = int(request.query_params.get('w', ''))
+        except ValueError:
+            return Response({'error': 'Parameter "w" must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        url = request.query_params.get('url', '')
+        try:
+            path = get_resized_image(url, width)
+            try:
+                image = open(path, 'rb')
+            except FileNotFoundError:
+                # Файл вытеснен другим воркером после проверки - создаем копию заново
+                path = get_resized_image(url, width)
+                image = open(path, 'rb')
+        except ImageProxyError as e:
+            return Response({'error': str(e)}, status=e.status)
+
+        response = FileResponse(image, content_type='image/jpeg')
+        # Исходные URL Posiflora содержат хэш содержимого, копия не меняется
+        response['Cache-Control'] = 'public, max-age=2592000, immutable'
+        return response
+
+
+class ReadinessView(APIView):
+    """
+    Readiness-проверка воркера: 503, пока идет прогрев каталога
+    """
+
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(
+        summary="Готовность к приему трафика",
+        description=(
+            "Возвращает 200, когда прогрев каталога завершен (успешно, исчерпав попытки "
+            "или по таймауту) или выключен, и 503, пока он идет"
+        ),
+        responses={
+            200: {'type': 'object'},
+            503: {'type': 'object'},
+        },
+        tags=['Health'],
+    )
+    def get(self, request):
+        state = get_warmup_state()
+        response = Response(
+            state,
+            status=status.HTTP_200_OK if state['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        response['Cache-Control'] = 'no-store'
+        return response